@@ -1,15 +1,28 @@
-import pandas as pd
-import numpy as np
-from statsmodels.tsa.arima.model import ARIMA
-from sklearn.metrics import mean_squared_error, r2_score
 import json
+import os
 import sys
 import warnings
-from io import StringIO
+from inferenceWorker import call_worker
 
 warnings.filterwarnings("ignore")
 
-def process_data(predicted_file, actual_file):
+# Fitted state per column and data version, kept for the life of the process (and on disk)
+_forecaster = None
+
+def get_forecaster():
+    global _forecaster
+    if _forecaster is None:
+        from arimaForecast import ArimaForecaster
+        _forecaster = ArimaForecaster(cache_dir=os.getenv('ARIMA_CACHE_DIR', os.path.join('model_cache', 'arima')) or None,
+                                      max_workers=int(os.getenv('ARIMA_WORKERS', '0')) or None,
+                                      max_disk_entries=int(os.getenv('ARIMA_CACHE_DISK_ENTRIES', '256')))
+    return _forecaster
+
+def process_data(predicted_file, actual_file, horizon=10):
+    # Heavy imports stay in here so the CLI can hand the request to a warm worker without paying for them
+    import pandas as pd
+    from soilSnapshot import dataset_version
+
     try:
         # Read predicted values
         df_predicted = pd.read_csv(predicted_file, delim_whitespace=True)
@@ -20,20 +33,15 @@ def process_data(predicted_file, actual_file):
         df_actual.set_index('Date', inplace=True)
         df_actual.sort_index(inplace=True)
 
-        # Function to fit ARIMA model and make predictions
-        def fit_arima(series, order=(1,1,1)):
-            model = ARIMA(series, order=order)
-            model_fit = model.fit()
-            return model_fit
-
-        # Fit ARIMA for Mercury and Zinc levels
-        mercury_model = fit_arima(df_actual['Mercury (%)'])
-        zinc_model = fit_arima(df_actual['Zinc (%)'])
+        # Fitted ARIMA for Mercury and Zinc levels: cached per data version, extended when rows were only
+        # appended, and fitted in parallel otherwise
+        series = {column: df_actual[column].to_numpy() for column in ('Mercury (%)', 'Zinc (%)')}
+        forecasts = get_forecaster().forecast(series, dataset_version(actual_file), steps=horizon)
 
-        # Make predictions for the next 10 days
-        future_dates = pd.date_range(start=df_actual.index[-1] + pd.Timedelta(days=1), periods=10, freq='D')
-        mercury_forecast = mercury_model.forecast(steps=10)
-        zinc_forecast = zinc_model.forecast(steps=10)
+        # Make predictions for the next days
+        future_dates = pd.date_range(start=df_actual.index[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+        mercury_forecast = forecasts['Mercury (%)']
+        zinc_forecast = forecasts['Zinc (%)']
 
         # Combine actual and forecasted data
         mineral_data = []
@@ -87,8 +95,12 @@ if __name__ == "__main__":
     try:
         predicted_file = sys.argv[1]
         actual_file = sys.argv[2]
+        horizon = int(sys.argv[3]) if len(sys.argv) > 3 else 10
 
-        result = process_data(predicted_file, actual_file)
+        # Hand the request to a warm worker when INFERENCE_SOCKET points at one, else run it here
+        result = call_worker('arima', {'predicted_file': os.path.abspath(predicted_file),
+                                       'actual_file': os.path.abspath(actual_file), 'horizon': horizon},
+                             lambda: process_data(predicted_file, actual_file, horizon))
         print(json.dumps(result), flush=True)
     except Exception as e:
         print(json.dumps({"error": str(e)}), flush=True)
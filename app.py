@@ -1,24 +1,47 @@
+# Job pool workers are spawned, and under ``python app.py`` each one re-imports this file as
+# __mp_main__ before it can unpickle a job. Those copies only run jobs, so they skip the eventlet
+# patch and leave the server's dataset cache, job pool, job board and weights cache unbuilt.
+SERVING = __name__ != '__mp_main__'
+
 import eventlet
-eventlet.monkey_patch()
-from flask import Flask
-from flask_socketio import SocketIO, emit
+if SERVING:
+    eventlet.monkey_patch()
+from flask import Flask, Response, jsonify, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import pandas as pd
 import numpy as np
-from scipy.signal import find_peaks
-from sklearn.ensemble import RandomForestRegressor
-from openai import OpenAI
-import boto3
-from botocore.exceptions import ClientError
-import io
+import importlib
 import os
+import threading
 from flask_cors import CORS
 import warnings
-from sklearn.preprocessing import MinMaxScaler
 from dotenv import load_dotenv
+from datasetCache import DatasetCache
+from datasetSource import create_s3_client, dataset_source_from_env
+from jobControl import JobBoard, JobCancelled
+from jobExecutor import JobExecutor
+from mineralWeights import WeightsCache, weights_provider_from_env
+from sustainabilityAnalysis import analysis_messages, analysis_provider_from_env, stream_analysis
+from datasetStream import dataset_header, iter_dataset_chunks, stream_options
+from chartPayload import plot_series
+from seriesPyramid import PyramidCache, range_options, range_payload
+from soilSnapshot import json_values
+from stageTimings import METRICS, Timings
+from singleFlight import SingleFlight, request_key
 
 # Load environment variables from .env file if it exists
 load_dotenv()
 
+# processPipeline (scikit-learn, scipy, joblib), openai and boto3 are imported on first use, so a
+# worker can accept connections before paying for them; warm_up() loads them up front instead.
+LAZY_MODULES = ('processPipeline', 'openai', 'boto3', 'botocore.exceptions')
+
+
+def warm_up():
+    """Import the lazily loaded modules now, e.g. once in the gunicorn master before it forks."""
+    for module in LAZY_MODULES:
+        importlib.import_module(module)
+
 # Function to validate and get AWS credentials
 def get_aws_credentials():
     # Try getting from environment variables
@@ -39,6 +62,10 @@ def get_aws_credentials():
 
 warnings.filterwarnings('ignore')
 
+# Handlers get shallow views of the cached dataset; copy-on-write keeps
+# their column edits from leaking back into the shared copy.
+pd.set_option('mode.copy_on_write', True)
+
 app = Flask(__name__)
 CORS(app, resources={
     r"/*": {
@@ -55,157 +82,97 @@ socketio = SocketIO(
     async_mode='eventlet',
     ping_timeout=60,
     ping_interval=25,
-    logger=True,
-    engineio_logger=True,
+    # Per-packet logging is costly under load; stage timings are on /metrics instead
+    logger=os.getenv('SOCKETIO_LOGGING', '0') == '1',
+    engineio_logger=os.getenv('SOCKETIO_LOGGING', '0') == '1',
     always_connect=True
 )
 
 
-def custom_percent_accuracy(y_true, y_pred):
-    y_true, y_pred = np.array(y_true), np.array(y_pred)
-    max_val = np.max(y_true)
-    return 100 * (1 - np.mean(np.abs(y_true - y_pred) / max_val))
-
-
-def analyze_peaks(data):
-    """Analyze peak characteristics of the time series."""
-    clean_data = np.nan_to_num(data, nan=np.nanmean(data))
-    peaks, _ = find_peaks(clean_data, height=np.nanmean(clean_data), distance=20)
-    if len(peaks) == 0:
-        return np.nanmean(clean_data), 20
-    peak_heights = clean_data[peaks]
-    avg_peak_height = np.nanmean(peak_heights)
-    avg_peak_distance = np.nanmean(np.diff(peaks)) if len(peaks) > 1 else 20
-    return float(avg_peak_height), float(avg_peak_distance)
+dataset_cache = DatasetCache(
+    dataset_source_from_env(client_factory=lambda: create_s3_client(get_aws_credentials())),
+    revalidate_interval=float(os.getenv('DATASET_REVALIDATE_SECONDS', '60')),
+    snapshot_root=os.getenv('DATASET_SNAPSHOT_DIR', 'snapshots')
+) if SERVING else None
 
 
-def generate_synthetic_peaks(length, avg_height, avg_distance, noise_level=0.2):
-    """Generate synthetic peaks with similar characteristics to the original data."""
-    x = np.linspace(0, length, length)
-    base_signal = np.zeros(length)
-    avg_distance = max(1, int(round(avg_distance)))
+def download_and_load_data(with_version=False):
+    """Return a read-only view of the dataset, downloading it from S3 only when it changed.
 
-    for i in range(0, length, avg_distance):
-        peak_height = avg_height * (1 + np.random.normal(0, 0.2))
-        base_signal += peak_height * np.exp(-(x - i) ** 2 / (2 * (avg_distance / 5) ** 2))
-
-    noise = np.random.normal(0, noise_level * avg_height, length)
-    return base_signal + noise
-
-
-def download_and_load_data():
-    """Function to download data from S3 and load it."""
+    With ``with_version`` the dataset version the view belongs to is returned too.
+    """
     try:
-        # Get and validate AWS credentials
-        credentials = get_aws_credentials()
-
-        s3 = boto3.client('s3',
-                          aws_access_key_id=credentials["AWS_ACCESS_KEY_ID"],
-                          aws_secret_access_key=credentials["AWS_SECRET_ACCESS_KEY"],
-                          region_name=credentials["AWS_REGION"])
-
-        bucket_name = 'aveva-csv-bucket'
-        file_key = 'SOIL DATA GR.csv'
-
-        print(f"Attempting to access S3 bucket: {bucket_name}")
-        print(f"Attempting to read file: {file_key}")
-
-        try:
-            obj = s3.get_object(Bucket=bucket_name, Key=file_key)
-            df = pd.read_csv(io.BytesIO(obj['Body'].read()))
-            print(f"Successfully loaded data from S3. DataFrame shape: {df.shape}")
-            return df
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            if error_code == 'NoSuchBucket':
-                raise Exception(f"S3 bucket '{bucket_name}' does not exist")
-            elif error_code == 'NoSuchKey':
-                raise Exception(f"File '{file_key}' not found in S3 bucket")
-            else:
-                raise Exception(f"AWS S3 error: {str(e)}")
-
+        return dataset_cache.get(with_version=with_version)
     except Exception as e:
         raise Exception(str(e))
 
 
-def get_mineral_weights(columns):
-    """Get weights for different minerals using OpenAI API"""
-    prompt = f"""
-    Given these minerals from soil data: {', '.join(columns)}
-    Provide weights (0-1) for each mineral's importance in determining mining sustainability.
-    Consider: environmental impact, economic value, scarcity, extraction difficulty, and recovery time.
-    Return only a Python dictionary with minerals as keys and weights as values.
-    Example format: {{"mineral1": 0.8, "mineral2": 0.6}}
-    """
+def create_job_executor():
+    return JobExecutor(
+        max_workers=int(os.getenv('JOB_WORKERS', '2')),
+        max_queue=int(os.getenv('JOB_QUEUE_DEPTH', '8')),
+        job_timeout=float(os.getenv('JOB_TIMEOUT_SECONDS', '120')),
+        initializer='processPipeline:init_worker',
+        initargs=(int(os.getenv('MODEL_CACHE_SIZE', '32')), os.getenv('MODEL_CACHE_DIR', 'model_cache') or None,
+                  int(os.getenv('MODEL_CACHE_DISK_ENTRIES', '256')))
+    )
 
-    try:
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert in mining sustainability and mineral importance."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
-        weights_str = response.choices[0].message.content.strip()
-        return eval(weights_str)
-    except Exception as e:
-        print(f"Error getting mineral weights: {e}")
-        return {col: 1.0 / len(columns) for col in columns}
 
+job_executor = create_job_executor() if SERVING else None
+
+# Latest model cache counters reported by each worker process
+worker_cache_stats = {}
+# Identical process_data requests in flight share one job; results go to the call's room
+process_calls = SingleFlight(prefix='process_data')
+# Cancellation flags and stage progress of the jobs running in the workers
+job_board = JobBoard(os.getenv('JOB_STATE_DIR') or None) if SERVING else None
 
-def calculate_sustainability_scores(all_predictions, historical_data, weights):
-    """
-    Calculate 25 sustainability scores, each combining 4 sequential points from predictions.
-    Returns scores on a scale of 1-10.
-    """
-    scores = []
-    points_per_score = 4  # Number of prediction points to combine for each score
-    num_scores = 25  # Total number of scores we want to generate
 
-    # Validate we have enough predictions
-    prediction_length = len(next(iter(all_predictions.values())))
-    if prediction_length < num_scores * points_per_score:
-        raise ValueError(
-            f"Need at least {num_scores * points_per_score} predictions, but only have {prediction_length}")
+def reset_worker_state():
+    """Give a process forked from a preloaded master its own job pool and job board.
 
-    for score_index in range(num_scores):
-        start_idx = score_index * points_per_score
-        end_idx = start_idx + points_per_score
-        point_score = 0
-        total_weight = 0
+    The ones built at import time belong to the master; sharing its pool
+    handle and state directory across forked workers would mix their jobs.
+    """
+    global job_executor, job_board
+    job_executor = create_job_executor()
+    job_board = JobBoard(os.getenv('JOB_STATE_DIR') or None)
 
-        for mineral, weight in weights.items():
-            if mineral not in all_predictions:
-                continue
+PROGRESS_INTERVAL = float(os.getenv('PROGRESS_INTERVAL_SECONDS', '0.25'))
+# Percent of a process_data request done when each stage starts, for progress events
+PROCESS_DATA_PROGRESS = {
+    'weights': 0, 'queued': 5, 'load': 10, 'features': 15, 'peaks': 20, 'model': 25, 'forecast': 70,
+    'chart': 75, 'other_peaks': 78, 'synthetic_peaks': 82, 'scores': 85, 'sensitivity': 90,
+    'emit': 93, 'analysis': 95, 'done': 100
+}
 
-            # Get historical stats for the mineral
-            hist_values = historical_data[mineral]
-            hist_mean = np.nanmean(hist_values)
-            hist_std = np.nanstd(hist_values)
 
-            # Average the predictions for the 4 points
-            predicted_values = all_predictions[mineral][start_idx:end_idx]
-            avg_predicted_value = np.mean(predicted_values)
+@app.route('/model_cache')
+def model_cache_stats():
+    totals = {}
+    for stats in list(worker_cache_stats.values()):
+        for name, value in stats.items():
+            totals[name] = totals.get(name, 0) + value
+    totals['workers'] = len(worker_cache_stats)
+    totals['jobs'] = job_executor.stats()
+    totals['coalescing'] = process_calls.stats()
+    return jsonify(totals)
 
-            # Calculate z-score based on historical distribution
-            z_score = abs((avg_predicted_value - hist_mean) / (hist_std if hist_std != 0 else 1))
 
-            # Convert to 1-10 scale (lower z-score means higher sustainability)
-            mineral_score = max(1, min(10, 10 * (1 - (z_score / 3))))
+@app.route('/metrics')
+def metrics():
+    """Latency histograms of the process_data stages and external calls, in Prometheus text format."""
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
 
-            point_score += mineral_score * weight
-            total_weight += weight
 
-        final_score = 10 - (point_score / total_weight) if total_weight > 0 else 1
+def record_timings(timings, **labels):
+    for stage, seconds in timings:
+        METRICS.observe('process_data_stage_seconds', seconds, stage=stage, **labels)
 
-        scores.append({
-            'time_period': score_index + 1,
-            'points_considered': f"{start_idx + 1}-{end_idx}",
-            'score': round(final_score, 2)
-        })
 
-    return scores
+def get_mineral_weights(columns):
+    """Get weights for different minerals, cached per column set"""
+    return weights_cache.get(columns)
 
 
 @socketio.on('connect')
@@ -223,16 +190,31 @@ def on_connect():
         emit('error', {'message': error_msg})
 
 
+@socketio.on('disconnect')
+def on_disconnect():
+    abandon_call(process_calls.leave(request.sid))
+    plot = session_plots.pop(request.sid, None)
+    if plot is not None:
+        pyramid_cache.discard(plot['key'])
+
+
 @socketio.on('request_full_dataset')
-def handle_dataset_request():
+def handle_dataset_request(options=None):
     print("Received request for full dataset")
     try:
         df = download_and_load_data()
+
+        if options and options.get('stream'):
+            stream_full_dataset(df, stream_options(options))
+            return
+
         df.fillna(0, inplace=True)
         # Convert DataFrame to a dictionary format suitable for JSON serialization
+        columns = df.columns.tolist()
+        values = [json_values(df[column].to_numpy()) for column in columns]
         data_dict = {
-            'columns': df.columns.tolist(),
-            'data': df.to_dict('records')  # Convert DataFrame to list of dictionaries
+            'columns': columns,
+            'data': [dict(zip(columns, row)) for row in zip(*values)]  # One dictionary per row
         }
 
         # Emit the full dataset
@@ -243,17 +225,129 @@ def handle_dataset_request():
         print(f"Error in handle_dataset_request: {error_msg}")
         emit('error', {'message': error_msg})
 
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+# Level-of-detail pyramids for dataset columns (per version) and for each session's latest plot
+pyramid_cache = PyramidCache(max_entries=int(os.getenv('PYRAMID_CACHE_SIZE', '64')))
+# sid -> {'key', 'column', 'series'} of the last new_plot sent to that session
+session_plots = {}
+
+
+@socketio.on('request_range')
+def handle_request_range(options=None):
+    """Send only the points a chart ``width`` pixels wide needs for rows ``[start, stop)``.
+
+    ``source`` is ``dataset`` (default; ``columns`` picks the series) or
+    ``plot`` for the session's last new_plot (``series`` picks among
+    actual, predicted, lower and upper).
+    """
+    try:
+        options = options or {}
+        query = range_options(options)
+        source = options.get('source', 'dataset')
+
+        if source == 'plot':
+            plot = session_plots.get(request.sid)
+            if plot is None:
+                raise Exception("No plot to query yet; run process_data first")
+            names = options.get('series') or list(plot['series'])
+            pyramids = {name: pyramid_cache.get(plot['key'], name, plot['series'][name]) for name in names}
+            label = plot['column']
+        elif source == 'dataset':
+            df, dataset_version = download_and_load_data(with_version=True)
+            names = options.get('columns') or [col for col in df.columns if col != 'ID']
+            unknown = [name for name in names if name not in df.columns]
+            if unknown:
+                raise Exception(f"Columns not found in dataset: {', '.join(unknown)}")
+            pyramids = {name: pyramid_cache.get(dataset_version, name, lambda name=name: df[name].to_numpy())
+                        for name in names}
+            label = None
+        else:
+            raise Exception(f"Unknown range source '{source}', expected 'dataset' or 'plot'")
+
+        payload = range_payload(pyramids, query['start'], query['stop'], query['width'], query['binary'])
+        payload.update(source=source, column=label)
+        emit('range_data', payload)
+    except Exception as e:
+        error_msg = str(e)
+        print(f"Error in handle_request_range: {error_msg}")
+        emit('error', {'message': error_msg})
+
+
+def stream_full_dataset(df, options):
+    """Send the dataset as start/chunk/end events, yielding to the hub between chunks."""
+    emit('full_dataset_start', dataset_header(df, version=dataset_cache.version, **options))
+
+    chunks = 0
+    for chunk in iter_dataset_chunks(df, **options):
+        emit('full_dataset_chunk', chunk)
+        chunks += 1
+        socketio.sleep(0)
+
+    emit('full_dataset_end', {'rows': len(df), 'chunks': chunks})
+    print(f"Streamed dataset with {len(df)} rows in {chunks} chunks")
+
+
+class LazyOpenAIClient:
+    """Creates the OpenAI client on first use instead of at import time."""
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(**self._kwargs)
+        return getattr(self._client, name)
+
+
+openai_client = LazyOpenAIClient(api_key=os.getenv('OPENAI_API_KEY'))
+weights_cache = WeightsCache(
+    weights_provider_from_env(openai_client),
+    path=os.getenv('WEIGHTS_CACHE_PATH', 'model_cache/mineral_weights.json'),
+    ttl=float(os.getenv('WEIGHTS_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+) if SERVING else None
+analysis_provider = analysis_provider_from_env(openai_client)
+ANALYSIS_BUDGET_SECONDS = float(os.getenv('ANALYSIS_BUDGET_SECONDS', 30))
+# sid or call room -> threading.Event that stops its running analysis stream
+analysis_cancels = {}
+
+@socketio.on('append_rows')
+def handle_append_rows(json):
+    """Append new soil samples to the in-memory dataset without re-uploading the CSV.
+
+    The next process_data on the new version updates features, statistics
+    and the model incrementally instead of retraining.
+    """
+    try:
+        rows = json.get('rows') if isinstance(json, dict) and 'rows' in json else json
+        version = dataset_cache.append(rows)
+        df = download_and_load_data()
+        added = 1 if isinstance(rows, dict) else len(rows)
+        emit('rows_appended', {'version': version, 'added': added, 'rows': df.shape[0]})
+        print(f"Appended {added} rows, dataset now has {df.shape[0]} rows")
+    except Exception as e:
+        error_message = f'Failed to append rows: {str(e)}'
+        print(f"Error in handle_append_rows: {error_message}")
+        emit('error', {'message': error_message})
+
 
 @socketio.on('process_data')
 def handle_process_data(json):
+    from processPipeline import dataset_ref, pipeline_columns, run_process_data
     try:
-        print(f"Received process_data request with data: {json}")
+        if json.get('process_all_columns'):
+            process_all_columns(json.get('target_column'), bool(json.get('timing')))
+            return
+
         target_column = json['target_column']
+        timings = Timings()
 
-        print(f"Loading data for column: {target_column}")
-        df = download_and_load_data()
-        print(f"Data loaded successfully. Shape: {df.shape}")
+        with timings.span('load_data'):
+            df, dataset_version = download_and_load_data(with_version=True)
 
         if target_column not in df.columns:
             error_msg = f"Column '{target_column}' not found in dataset."
@@ -261,209 +355,362 @@ def handle_process_data(json):
             emit('console_output', {'error': error_msg})
             return
 
-        # Store all predictions for sustainability calculation
-        all_predictions = {}
-
-        print("Processing data...")
-        # Data processing
-        df[target_column] = pd.to_numeric(df[target_column], errors='coerce')
-        df[target_column].fillna(method='ffill', inplace=True)
-        df[target_column].fillna(method='bfill', inplace=True)
-
-        print("Creating features...")
-        # Feature engineering
-        df['P_diff'] = df[target_column].diff()
-        df['P_diff'].fillna(0, inplace=True)
-
-        df['P_rolling_mean'] = df[target_column].rolling(window=5, min_periods=1).mean()
-        df['P_rolling_std'] = df[target_column].rolling(window=5, min_periods=1).std()
-        df['P_rolling_std'].fillna(df[target_column].std(), inplace=True)
-
-        print("Analyzing peaks...")
-        # Analyze peak characteristics
-        avg_peak_height, avg_peak_distance = analyze_peaks(df[target_column].values)
-
-        print("Preparing features and target...")
-        # Prepare features and target
-        features = df[['P_diff', 'P_rolling_mean', 'P_rolling_std']].values
-        target = df[target_column].values.reshape(-1, 1)
-
-        # Scale the data
-        scaler_features = MinMaxScaler()
-        scaler_target = MinMaxScaler()
-
-        features_scaled = scaler_features.fit_transform(features)
-        target_scaled = scaler_target.fit_transform(target)
-
-        print("Training model...")
-        # Train model
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(features_scaled, target_scaled.ravel())
-
-        print("Generating predictions...")
-        # Generate predictions for existing data
-        predictions_scaled = model.predict(features_scaled)
-        predictions = scaler_target.inverse_transform(predictions_scaled.reshape(-1, 1)).ravel()
-
-        print("Generating future predictions...")
-        # Generate future predictions
-        future_entries = 100
-        synthetic_data = generate_synthetic_peaks(future_entries, avg_peak_height, avg_peak_distance)
-
-        # Create features for future predictions
-        future_features = np.zeros((future_entries, 3))
-        future_features[:, 0] = np.diff(synthetic_data, prepend=target[-1])
-        future_features[:, 1] = pd.Series(synthetic_data).rolling(window=5, min_periods=1).mean()
-        future_features[:, 2] = pd.Series(synthetic_data).rolling(window=5, min_periods=1).std()
-        future_features = np.nan_to_num(future_features, nan=0)
-
-        # Scale future features and generate predictions
-        future_features_scaled = scaler_features.transform(future_features)
-        future_predictions_scaled = model.predict(future_features_scaled)
-        future_predictions = scaler_target.inverse_transform(future_predictions_scaled.reshape(-1, 1)).ravel()
-
-        # Store predictions for sustainability calculation
-        all_predictions[target_column] = future_predictions
-
-        print("Preparing chart data...")
-        # Prepare data for Recharts
-        chart_data = []
-        for i, (actual, predicted) in enumerate(zip(df[target_column], predictions)):
-            chart_data.append({
-                "entry": i + 1,
-                "actual": float(actual),
-                "predicted": float(predicted)
-            })
-
-        # Add future predictions
-        for i, future_pred in enumerate(future_predictions):
-            chart_data.append({
-                "entry": len(df) + i + 1,
-                "actual": None,
-                "predicted": float(future_pred)
-            })
-
-        # Calculate accuracy
-        mape = custom_percent_accuracy(df[target_column], predictions)
-
-        print("Calculating sustainability scores...")
-        # Get mineral columns (excluding ID)
-        mineral_columns = [col for col in df.columns if col != 'ID']
-
-        # Get weights for all minerals
-        weights = get_mineral_weights(mineral_columns)
-
-        # Process predictions for other minerals if not already processed
-        for column in mineral_columns:
-            if column not in all_predictions:
-                # Process additional columns for sustainability calculation
-                df[column] = pd.to_numeric(df[column], errors='coerce')
-                df[column].fillna(method='ffill', inplace=True)
-                df[column].fillna(method='bfill', inplace=True)
-
-                # Generate predictions using the same process
-                avg_height, avg_distance = analyze_peaks(df[column].values)
-                synthetic = generate_synthetic_peaks(future_entries, avg_height, avg_distance)
-                all_predictions[column] = synthetic
-
-        # Calculate sustainability scores
-        sustainability_scores = calculate_sustainability_scores(all_predictions, df, weights)
-
-        # Print sustainability scores
-        #print("\nSustainability Scores (Scale 1-10)")
-        #print("-" * 60)
-        #print("{:^8} | {:^20} | {:^10} | {:^10}".format("Period", "Points Considered", "Score", "Trend"))
-        #print("-" * 60)
-
-        sustainability_graph_data = []
-        prev_score = None
-        for score in sustainability_scores:
-            trend = None
-            if prev_score is not None:
-                diff = score['score'] - prev_score
-                trend = diff
-
-            graph_point = {
-                'period': score['time_period'],
-                'points': score['points_considered'],
-                'score': score['score'],
-                'trend': trend if trend is not None else 0
-            }
-            sustainability_graph_data.append(graph_point)
-            prev_score = score['score']
-
-        # Calculate overall statistics
-        avg_score = sum(s['score'] for s in sustainability_scores) / len(sustainability_scores)
-        total_trend = sustainability_scores[-1]['score'] - sustainability_scores[0]['score']
-
-        # Create metadata for the graph
-        graph_metadata = {
-            'averageScore': round(avg_score, 2),
-            'overallTrend': round(total_trend, 2),
-            'totalPeriods': len(sustainability_scores),
-            'minScore': min(s['score'] for s in sustainability_scores),
-            'maxScore': max(s['score'] for s in sustainability_scores)
-        }
+        # Identical requests already in flight are joined instead of trained again
+        options = {name: json[name] for name in ('horizon', 'ensemble', 'weight_sets', 'plot_format') if name in json}
+        call = join_call(request_key(dataset_version, target_column, options), bool(json.get('timing')))
+        if call is None:
+            return
 
-        # Emit sustainability graph data
-        emit('SustainabilityGraph', {
-            'graphData': sustainability_graph_data,
-            'metadata': graph_metadata,
-            'targetColumn': target_column
-        })
-
-        print("Emitting results...")
-        # Emit results (keeping existing emissions)
-        emit('new_plot', {'data': chart_data, 'column': target_column})
-        emit('model_mae', {'mae': float(mape)})
-        emit('console_output', {'message': f"Processing complete for column: {target_column}"})
-
-        all_columns = df.columns.tolist()
-        prompt = f"""
-                Given the following information about mining data, please assess if it is sustainable to continue mining:
-
-                Available data columns: {', '.join(all_columns)}
-                Target column analyzed: {target_column}
-                Prediction accuracy: {mape}%
-                Number of future predictions: {len(future_predictions)}
-
-                Based on the historical data and future predictions for {target_column}, analyze the environmental impact 
-                and sustainability of continuing mining operations. Consider any trends, patterns, or concerning indicators 
-                in the data. Give a definitive yes or no answer at the end if we should continue mining. You must either 
-                say yes or no, not maybe or anything like that. Keep the whole response under 200 words.
-                """
-
-        print("Process completed successfully")
-
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system",
-                 "content": "You are an AI assistant that advises on mining sustainability using provided data."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        analysis = response.choices[0].message.content
+        try:
+            # Get weights for all minerals (network I/O, so it stays on the hub)
+            report_progress(call, target_column, 'weights')
+            with timings.span('weights'):
+                weights = get_mineral_weights(pipeline_columns(df.columns))
+
+            # Training and scoring run in a worker process; results come back to the call's room
+            report_progress(call, target_column, 'queued')
+            ref = dataset_ref(df, dataset_version, dataset_cache.snapshot_dir)
+            submit_job(call, run_process_data, ref, target_column, weights, options)
+        except JobCancelled:
+            close_call(call)
+            return
+        except Exception as e:
+            fail_call(call, e, 'handle_process_data')
+            return
+        socketio.start_background_task(finish_process_data, call, target_column, timings)
 
+    except Exception as e:
+        error_message = f'Failed to process data: {str(e)}'
+        print(f"Error in handle_process_data: {error_message}")
+        emit('error', {'message': error_message})
+
+
+@socketio.on('cancel_process_data')
+def handle_cancel_process_data(json=None):
+    """Stop waiting for this session's process_data; the job itself stops if nobody else waits on it."""
+    call = process_calls.leave(request.sid)
+    if call is None:
+        return
+    leave_room(call.room)
+    abandon_call(call)
+    progress = call.progress or {'jobId': call.id, 'percent': 0}
+    emit('progress', dict(progress, stage='cancelled'))
+
+
+def join_call(key, timing=False):
+    """Put this session in the call for ``key``'s room; return the call if this session has to start it.
+
+    A session joining a running call is sent that call's latest progress.
+    """
+    call, leader, previous = process_calls.join(key, request.sid, timing)
+    if previous is not None:
+        leave_room(previous.room)
+        abandon_call(previous)
+    join_room(call.room)
+    if not leader:
+        if call.progress is not None:
+            emit('progress', call.progress)
+        return None
+    return call
+
+
+def report_progress(call, label, stage, percent=None):
+    """Send a call's stage to its room, or raise JobCancelled if nobody waits on the call any more."""
+    if call.cancelled.is_set():
+        raise JobCancelled(f"Job {call.id} was cancelled")
+    progress = {
+        'jobId': call.id,
+        'targetColumn': label,
+        'stage': stage,
+        'percent': PROCESS_DATA_PROGRESS[stage] if percent is None else percent
+    }
+    if progress != call.progress:
+        call.progress = progress
+        socketio.emit('progress', progress, to=call.room)
+
+
+def submit_job(call, fn, *args):
+    """Queue ``fn(*args, job=handle)`` for ``call``; the job's progress files go when it ends."""
+    # The worker stops itself at a checkpoint once the hub has stopped waiting for it
+    job = job_board.start(timeout=job_executor.job_timeout)
+    try:
+        future = job_executor.submit(fn, *args, job=job)
+    except Exception:
+        job_board.discard(job.job_id)
+        raise
+    future.add_done_callback(lambda _: job_board.discard(job.job_id))
+    call.jobs.append((job.job_id, future))
+    return future
+
+
+def abandon_call(call):
+    """Stop the work of a call nobody waits on any more.
+
+    Jobs still queued are dropped, running ones stop at their next
+    checkpoint, and the analysis stream (and its API usage) is cut off.
+    """
+    if call is None or not call.cancelled.is_set():
+        return
+    for job_id, future in call.jobs:
+        if not future.cancel():
+            job_board.cancel(job_id)
+    cancelled = analysis_cancels.pop(call.room, None)
+    if cancelled is not None:
+        cancelled.set()
+
+
+def fail_call(call, error, where):
+    """Send a failed call's error to every session waiting on it."""
+    error_message = f'Failed to process data: {str(error)}'
+    print(f"Error in {where}: {error_message}")
+    process_calls.finish(call)
+    # Jobs still running (e.g. past their time limit) stop at their next checkpoint
+    for job_id, _ in call.jobs:
+        job_board.cancel(job_id)
+    socketio.emit('error', {'message': error_message}, to=call.room)
+    close_call(call)
+
+
+def close_call(call):
+    process_calls.close(call)
+    socketio.close_room(call.room)
+
+
+def end_call(call, label):
+    """Report a call as done once its analysis stream has ended, then close its room."""
+    if not call.cancelled.is_set():
+        report_progress(call, label, 'done')
+    close_call(call)
+
+
+def finish_process_data(call, target_column, timings):
+    """Wait for a process_data job and emit its results to every session waiting on it.
+
+    ``timings`` holds the spans recorded on the hub so far. The worker's own
+    stage spans are added to them, everything feeds /metrics once per job,
+    and sessions that asked for it also get the breakdown as a ``timing``
+    event. The job's stages are relayed to the room as progress events.
+    """
+    job_id, future = call.jobs[0]
+
+    def poll():
+        progress = job_board.progress(job_id)
+        report_progress(call, target_column, progress['stage'] if progress else 'queued')
+
+    try:
+        with timings.span('job'):
+            result, = job_executor.results([future], poll=poll, interval=PROGRESS_INTERVAL)
+        worker_cache_stats[result['worker']] = result['modelCache']
+        # Time waiting for a worker is the job span minus what the worker spent on the stages
+        worker_seconds = sum(seconds for _, seconds in result['timings'])
+        timings.append(('queue', max(0.0, timings.pop()[1] - worker_seconds)))
+        timings.extend(result['timings'])
+
+        # Sessions joining from here on start a new job
+        sids = process_calls.finish(call)
+        report_progress(call, target_column, 'emit')
+        with timings.span('emit'):
+            # Emit sustainability graph data
+            socketio.emit('SustainabilityGraph', result['sustainability'], to=call.room)
+            if 'sensitivity' in result:
+                socketio.emit('sustainability_sensitivity', {'targetColumn': target_column, 'results': result['sensitivity']}, to=call.room)
+
+            # Emit results (keeping existing emissions)
+            socketio.emit('new_plot', result['plot'], to=call.room)
+            remember_plot(sids, target_column, result['plot'])
+            socketio.emit('model_mae', {'mae': result['mape']}, to=call.room)
+            socketio.emit('console_output', {'message': f"Processing complete for column: {target_column}"}, to=call.room)
+
+        record_timings(timings)
+        breakdown = dict(timings.breakdown(), targetColumn=target_column, sessions=len(sids))
+        for sid in call.timing & sids:
+            socketio.emit('timing', breakdown, to=sid)
+
+        # The room stays open until the analysis stream is done
+        report_progress(call, target_column, 'analysis')
+        emit_analysis(call.room, target_column, result['mape'], result['columns'], result['futureEntries'],
+                      on_done=lambda: end_call(call, target_column))
+
+    except JobCancelled:
+        close_call(call)
+    except Exception as e:
+        fail_call(call, e, 'finish_process_data')
+
+
+def remember_plot(sids, target_column, plot):
+    """Keep each session's latest plot series for request_range, dropping its previous plot's pyramids."""
+    series = plot_series(plot)
+    for sid in sids:
+        previous = session_plots.get(sid)
+        if previous is not None:
+            pyramid_cache.discard(previous['key'])
+        key = ('plot', sid, (previous['key'][2] + 1) if previous else 0)
+        session_plots[sid] = {'key': key, 'column': target_column, 'series': series}
+
+
+def emit_analysis(to, target_column, mape, all_columns, future_entries, on_done=None):
+    """Stream the LLM's sustainability verdict to a session or room in a background task.
+
+    A newer analysis for the same session or room cancels the one still
+    streaming; ``on_done`` runs once the stream has ended either way.
+    """
+    previous = analysis_cancels.pop(to, None)
+    if previous is not None:
+        previous.set()
+    cancelled = analysis_cancels[to] = threading.Event()
+    messages = analysis_messages(target_column, mape, all_columns, future_entries)
+    socketio.start_background_task(stream_sustainability_analysis, to, target_column, messages, cancelled, on_done)
+
+
+def stream_sustainability_analysis(to, target_column, messages, cancelled, on_done=None):
+    header = f"Sustainability Analysis for {target_column}:\n\n"
+    sent = {'text': ''}
+
+    def send(text, delta, status):
+        sent['text'] = text
+        message = header + text
+        if status == 'timeout':
+            message += f"\n\n[Analysis stopped after {ANALYSIS_BUDGET_SECONDS:g}s]"
+        socketio.emit('console_output', {
+            'message': message,
+            'delta': delta,
+            'stream': 'analysis',
+            'done': status is not None,
+            'status': status
+        }, to=to)
+        socketio.sleep(0)
+
+    # The provider's own timeout bounds each read; this bounds the whole stream
+    timer = eventlet.Timeout(ANALYSIS_BUDGET_SECONDS)
+    try:
+        analysis = stream_analysis(analysis_provider, messages, send, ANALYSIS_BUDGET_SECONDS, cancelled)
         print("\n=== AI Analysis ===")
         print(analysis)
         print("==================\n")
+    except eventlet.Timeout as t:
+        if t is not timer:
+            raise
+        print(f"Analysis for {target_column} exceeded {ANALYSIS_BUDGET_SECONDS:g}s")
+        send(sent['text'], '', 'timeout')
+    except Exception as e:
+        error_message = f'Failed to analyze sustainability: {str(e)}'
+        print(f"Error in stream_sustainability_analysis: {error_message}")
+        socketio.emit('console_output', {'error': error_message, 'stream': 'analysis', 'done': True}, to=to)
+    finally:
+        timer.cancel()
+        if analysis_cancels.get(to) is cancelled:
+            del analysis_cancels[to]
+        if on_done is not None:
+            on_done()
+
+
+def process_all_columns(target_column=None, timing=False):
+    """Train and forecast every mineral column in parallel, then score them together."""
+    from processPipeline import dataset_ref, forecast_columns, split_columns
+    timings = Timings()
+    with timings.span('load_data'):
+        df, dataset_version = download_and_load_data(with_version=True)
+    mineral_columns = [col for col in df.columns if col != 'ID']
+    if target_column is not None and target_column not in mineral_columns:
+        emit('console_output', {'error': f"Column '{target_column}' not found in dataset."})
+        return
+
+    call = join_call(request_key(dataset_version, None, {'process_all_columns': True, 'target_column': target_column}),
+                     timing)
+    if call is None:
+        return
+
+    label = target_column or 'All columns'
+    try:
+        report_progress(call, label, 'weights')
+        with timings.span('weights'):
+            weights = get_mineral_weights(mineral_columns)
+
+        # One job per worker, each handling a share of the columns against the same mapped snapshot
+        report_progress(call, label, 'queued')
+        ref = dataset_ref(df, dataset_version, dataset_cache.snapshot_dir)
+        groups = split_columns(mineral_columns, job_executor.max_workers)
+        for group in groups:
+            submit_job(call, forecast_columns, ref, group)
+    except JobCancelled:
+        close_call(call)
+        return
+    except Exception as e:
+        fail_call(call, e, 'process_all_columns')
+        return
+    socketio.start_background_task(finish_all_columns, call, target_column, df, dataset_version, weights, groups, timings)
 
-        emit('console_output', {
-            'message': f"""
-                    Sustainability Analysis for {target_column}:
 
-                    {analysis}
-                    """
-        })
+def finish_all_columns(call, target_column, df, dataset_version, weights, groups, timings):
+    """Collect the per-column forecasts, score them and emit the results to every waiting session.
 
-        print("Process completed successfully")
+    ``timings`` holds the hub's spans so far; the jobs run side by side, so
+    their own spans go to /metrics and into the ``timing`` event per worker
+    rather than into the hub's breakdown.
+    """
+    from processPipeline import score_forecasts
+    label = target_column or 'All columns'
+    total = sum(len(group) for group in groups)
+    start, end = PROCESS_DATA_PROGRESS['queued'], PROCESS_DATA_PROGRESS['scores']
+
+    def poll():
+        # Each job checkpoints once per column, so a running job has finished all but its latest one
+        finished = 0
+        for (job_id, future), group in zip(call.jobs, groups):
+            progress = job_board.progress(job_id)
+            finished += len(group) if future.done() else max(0, (progress or {}).get('step', 0) - 1)
+        report_progress(call, label, 'forecast', start + (end - start) * finished // total)
 
+    try:
+        with timings.span('job'):
+            results = job_executor.results([future for _, future in call.jobs], poll=poll, interval=PROGRESS_INTERVAL)
+        forecasts = {}
+        for result in results:
+            worker_cache_stats[result['worker']] = result['modelCache']
+            forecasts.update(result['forecasts'])
+        sids = process_calls.finish(call)
+
+        report_progress(call, label, 'scores')
+        with timings.span('scores'):
+            sustainability = score_forecasts(df, forecasts, weights, label, dataset_version)
+        report_progress(call, label, 'emit')
+        with timings.span('emit'):
+            socketio.emit('SustainabilityGraph', sustainability, to=call.room)
+            socketio.emit('column_forecasts', {
+                'forecasts': {
+                    column: {'future': forecast['future'].tolist(), 'accuracy': forecast['mape']}
+                    for column, forecast in forecasts.items()
+                }
+            }, to=call.room)
+
+            accuracy = forecasts[target_column]['mape'] if target_column else float(np.mean([f['mape'] for f in forecasts.values()]))
+            socketio.emit('model_mae', {'mae': accuracy}, to=call.room)
+            socketio.emit('console_output', {'message': f"Processing complete for {len(forecasts)} columns"}, to=call.room)
+
+        record_timings(timings, mode='all_columns')
+        for result in results:
+            record_timings(result['timings'], mode='all_columns')
+        breakdown = dict(timings.breakdown(), targetColumn=target_column, sessions=len(sids), workers=[
+            dict(Timings(result['timings']).breakdown(), worker=result['worker'], columns=len(result['forecasts']))
+            for result in results
+        ])
+        for sid in call.timing & sids:
+            socketio.emit('timing', breakdown, to=sid)
+
+        report_progress(call, label, 'analysis')
+        future_entries = len(next(iter(forecasts.values()))['future'])
+        emit_analysis(call.room, label, accuracy, list(forecasts), future_entries, on_done=lambda: end_call(call, label))
+
+    except JobCancelled:
+        close_call(call)
     except Exception as e:
-        error_message = f'Failed to process data: {str(e)}'
-        print(f"Error in handle_process_data: {error_message}")
-        emit('error', {'message': error_message})
+        fail_call(call, e, 'finish_all_columns')
+
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, allow_unsafe_werkzeug=True)
+    try:
+        socketio.run(app, debug=True, allow_unsafe_werkzeug=True)
+    finally:
+        # The pool's own exit hook can hang under eventlet, so shut it down explicitly
+        job_executor.shutdown()
+        job_board.close()
@@ -0,0 +1,134 @@
+"""ARIMA fits that are kept instead of redone on every call.
+
+Fitted results are cached per (column, data version) in a ModelCache, in
+memory and on disk. A series that only grew since the last fit is brought
+up to date with ``results.append(new_observations, refit=False)``, which
+runs the Kalman filter over the new points with the fitted parameters
+instead of another optimizer run. Forecasts of any horizon come straight
+from the cached state. Series that do need fitting are fitted in parallel
+worker processes.
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from modelCache import ModelCache
+
+ARIMA_ORDER = (1, 1, 1)
+
+
+def series_digest(values):
+    return hashlib.sha1(np.ascontiguousarray(values, dtype=np.float64).tobytes()).hexdigest()
+
+
+def fit_series(values, order=ARIMA_ORDER):
+    """Fit one ARIMA; module-level so worker processes can run it."""
+    import warnings
+    from statsmodels.tsa.arima.model import ARIMA
+
+    warnings.filterwarnings("ignore")
+    return ARIMA(np.asarray(values, dtype=np.float64), order=order).fit()
+
+
+class ArimaForecaster:
+    """Fitted ARIMA state per column, reused across calls and data versions.
+
+    ``results(columns)`` returns fitted results for each column of a
+    dataset version, doing the least work that gets there: a cache hit, an
+    append of the new observations onto the last fitted state of that
+    column, or a fit. Fits for several columns run in parallel in up to
+    ``max_workers`` spawned processes.
+    """
+
+    def __init__(self, order=ARIMA_ORDER, max_entries=64, cache_dir=None, max_workers=None, max_disk_entries=256):
+        self.order = tuple(order)
+        self.cache = ModelCache(max_entries=max_entries, cache_dir=cache_dir, max_disk_entries=max_disk_entries)
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._pool = None
+        self._lock = threading.Lock()
+        self._counters = {'fits': 0, 'appends': 0}
+
+    def _key(self, version, column):
+        return self.cache.key(version, column, {'model': 'ARIMA', 'order': list(self.order)})
+
+    def results(self, series, version):
+        """Fitted results for every ``{column: values}`` in ``series`` at ``version``."""
+        fitted = {}
+        to_fit = {}
+        for column, values in series.items():
+            values = np.asarray(values, dtype=np.float64)
+            entry = self.cache.get(self._key(version, column)) or self._extend(column, values, version)
+            if entry is None:
+                to_fit[column] = values
+            else:
+                fitted[column] = entry['results']
+
+        for column, results in self._fit_all(to_fit).items():
+            self._remember(column, version, to_fit[column], results)
+            fitted[column] = results
+        return fitted
+
+    def forecast(self, series, version, steps=10):
+        """``{column: forecast array}`` of ``steps`` future values from the cached state."""
+        return {column: np.asarray(results.forecast(steps=steps))
+                for column, results in self.results(series, version).items()}
+
+    def apply(self, column, version, values):
+        """Run the parameters fitted for ``column`` at ``version`` over another series, without refitting."""
+        entry = self.cache.get(self._key(version, column))
+        if entry is None:
+            raise Exception(f"No fitted ARIMA for '{column}' at version {version}")
+        return entry['results'].apply(np.asarray(values, dtype=np.float64), refit=False)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, **self.cache.stats())
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _extend(self, column, values, version):
+        """Append to the column's last fitted state when ``values`` only added observations to its series."""
+        latest = self.cache.get(self._key(None, column))
+        if latest is None:
+            return None
+        previous = self.cache.get(self._key(latest['version'], column))
+        n_obs = previous and previous['n_obs']
+        if not n_obs or n_obs > len(values) or series_digest(values[:n_obs]) != previous['digest']:
+            return None
+
+        results = previous['results']
+        if len(values) > n_obs:
+            results = results.append(values[n_obs:], refit=False)
+        with self._lock:
+            self._counters['appends'] += 1
+        return self._remember(column, version, values, results)
+
+    def _remember(self, column, version, values, results):
+        entry = {'results': results, 'n_obs': len(values), 'digest': series_digest(values)}
+        self.cache.put(self._key(version, column), entry)
+        # Pointer to the newest fitted version of the column, for the next append
+        self.cache.put(self._key(None, column), {'version': version})
+        return entry
+
+    def _fit_all(self, to_fit):
+        if not to_fit:
+            return {}
+        with self._lock:
+            self._counters['fits'] += len(to_fit)
+
+        if len(to_fit) == 1 or self.max_workers == 1:
+            return {column: fit_series(values, self.order) for column, values in to_fit.items()}
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        futures = {column: self._pool.submit(fit_series, values, self.order) for column, values in to_fit.items()}
+        return {column: future.result() for column, future in futures.items()}
@@ -0,0 +1,27 @@
+"""Atomic file replacement: readers see the old file or the new one, never a partial write."""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode='w', makedirs=True):
+    """Open a temp file next to ``path`` and move it over ``path`` once the ``with`` block succeeds.
+
+    The temp file is removed if the block or the move fails, and the error
+    propagates. With ``makedirs`` the parent directory is created first.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    if makedirs:
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
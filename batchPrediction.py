@@ -1,204 +1,246 @@
-import boto3
-import pandas as pd
-import numpy as np
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import GRU, Dense, Dropout
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.losses import Huber
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-from xgboost import XGBRegressor
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_absolute_error
-from pmdarima import auto_arima
-import matplotlib.pyplot as plt
-from dotenv import load_dotenv
-import os
-import warnings
-
-os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'  # Suppresses INFO and WARNING logs
-warnings.filterwarnings('ignore')
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Access AWS credentials
-aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-aws_region = os.getenv("AWS_REGION")
-
-# Initialize the boto3 session
-session = boto3.Session(
-    aws_access_key_id=aws_access_key_id,
-    aws_secret_access_key=aws_secret_access_key,
-    region_name=aws_region
-)
-
-# Create the S3 client
-s3 = session.client('s3')
-bucket_name = 'aveva-csv-bucket'
-file_key = 'SOIL DATA GR.csv'
-
-# Download the file from S3
-local_file_name = 'SOIL DATA GR.csv'
-s3.download_file(bucket_name, file_key, local_file_name)
-
-# Load dataset
-df = pd.read_csv(local_file_name)
-
-# Select target column
-print("Available columns:", df.columns.tolist())
-target_column = input("Enter the column you want to predict: ")
-
-if target_column not in df.columns:
-    raise ValueError(f"Column '{target_column}' not found in dataset.")
-
-# Fill missing values
-df.fillna(df.mean(), inplace=True)
-
-# Add derived features
-df['P_diff'] = df[target_column].diff().fillna(0)
-df['P_rolling_mean'] = df[target_column].rolling(window=5).mean().fillna(df[target_column])
-
-# Remove outliers using IQR
-def remove_outliers(df, column):
-    Q1 = df[column].quantile(0.25)
-    Q3 = df[column].quantile(0.75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    return df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
-
-df_no_outliers = remove_outliers(df, target_column)
-
-# Separate features and target
-target_no_outliers = df_no_outliers[[target_column]]
-features_no_outliers = df_no_outliers.drop(columns=[target_column])
-
-# Scale features and target
-scaler_X = MinMaxScaler()
-scaler_Y = MinMaxScaler()
-scaled_features_no_outliers = scaler_X.fit_transform(features_no_outliers)
-scaled_target_no_outliers = scaler_Y.fit_transform(target_no_outliers)
-
-# Create dataset with look-back sequences
-def create_dataset(features, target, look_back=30):
-    dataX, dataY = [], []
-    for i in range(len(features) - look_back):
-        dataX.append(features[i:(i + look_back)])
-        dataY.append(target[i + look_back])
-    return np.array(dataX), np.array(dataY)
-
-look_back = 50
-X_no_outliers, y_no_outliers = create_dataset(scaled_features_no_outliers, scaled_target_no_outliers, look_back)
-
-# Train/test split
-train_start = int(len(y_no_outliers) * 0.6)
-train_end = int(len(y_no_outliers) * 0.9)
-test_start = train_end
-test_end = len(y_no_outliers)
-
-trainX, trainY = X_no_outliers[train_start:train_end], y_no_outliers[train_start:train_end]
-testX, testY = X_no_outliers[test_start:test_end], y_no_outliers[test_start:test_end]
-
-# Flatten data for XGBoost and Linear Regression
-trainX_flat = trainX.reshape(trainX.shape[0], -1)
-testX_flat = testX.reshape(testX.shape[0], -1)
-
-# Define GRU model
-def create_gru_model(input_shape):
-    model = Sequential([
-        GRU(128, return_sequences=True, input_shape=input_shape),
-        Dropout(0.3),
-        GRU(64),
-        Dense(32, activation='relu'),
-        Dense(1)
-    ])
-    model.compile(optimizer=Adam(learning_rate=0.0001), loss=Huber())
-    return model
-
-# Safe MAPE calculation
-def safe_mape(y_true, y_pred):
-    y_true = np.where(y_true == 0, 1e-5, y_true)
-    return np.mean(np.abs((y_true - y_pred) / y_true)) * 100
-
-# Additional metrics
-def calculate_metrics(y_true, y_pred):
-    mae = mean_absolute_error(y_true, y_pred)
-    rmse = np.sqrt(np.mean((y_true - y_pred) ** 2))
-    return mae, rmse
-
-# Train and evaluate models
-results = {}
-
-# GRU Model
-gru_model = create_gru_model((look_back, trainX.shape[2]))
-early_stopping = EarlyStopping(monitor='val_loss', patience=50, restore_best_weights=True)
-reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-6)
-gru_model.fit(trainX, trainY, epochs=100, batch_size=64, validation_split=0.2,
-              callbacks=[early_stopping, reduce_lr], verbose=0)
-gru_predictions = scaler_Y.inverse_transform(gru_model.predict(testX))
-gru_actual = scaler_Y.inverse_transform(testY)
-gru_mape = safe_mape(gru_actual, gru_predictions)
-gru_mae, gru_rmse = calculate_metrics(gru_actual, gru_predictions)
-results['GRU'] = (100 - gru_mape, gru_predictions)
-
-xgb_model = XGBRegressor(
-    n_estimators=5000,
-    learning_rate=1,
-    max_depth=15,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    lambda_=0.5,  # Reduced L2 regularization
-    alpha=0.1,   # Reduced L1 regularization
-    objective='reg:squarederror'
-)
-# Train XGBoost
-xgb_model.fit(trainX_flat, trainY.flatten())
-
-# Make predictions
-xgb_predictions = scaler_Y.inverse_transform(xgb_model.predict(testX_flat).reshape(-1, 1))
-
-# Evaluate XGBoost
-xgb_mape = safe_mape(scaler_Y.inverse_transform(testY), xgb_predictions.flatten())
-xgb_mae, xgb_rmse = calculate_metrics(scaler_Y.inverse_transform(testY), xgb_predictions.flatten())
-results['XGBoost'] = (100 - xgb_mape, xgb_predictions)
-
-# Flatten data for Linear Regression (only the target column for y=x relationship)
-trainX_flat = scaled_features_no_outliers[train_start:train_end]
-testX_flat = scaled_features_no_outliers[test_start:test_end]
-
-# Linear Regression Model
-linear_model = LinearRegression()
-linear_model.fit(trainX_flat, trainY.flatten())  # Fit directly without look-back sequences
-linear_predictions_scaled = linear_model.predict(testX_flat).reshape(-1, 1)
-linear_predictions = scaler_Y.inverse_transform(linear_predictions_scaled)  # Reverse scaling
-linear_actual = scaler_Y.inverse_transform(testY)  # Reverse scaling for comparison
-
-# Evaluate Linear Regression
-linear_mape = safe_mape(linear_actual, linear_predictions)
-linear_mae, linear_rmse = calculate_metrics(linear_actual, linear_predictions)
-results['Linear Regression'] = (100 - linear_mape, linear_predictions)
-
-
-# Determine the best model
-best_model_name = max(results, key=lambda x: results[x][0])
-best_accuracy, best_predictions = results[best_model_name]
-
-# Print results for all models
-print(f"Best Model: {best_model_name}")
-print(f"Accuracy: {best_accuracy:.2f}%")
-print(f"Metrics (MAE, RMSE):")
-print(f"GRU: MAE={gru_mae:.4f}, RMSE={gru_rmse:.4f}")
-print(f"XGBoost: MAE={xgb_mae:.4f}, RMSE={xgb_rmse:.4f}")
-print(f"Linear Regression: MAE={linear_mae:.4f}, RMSE={linear_rmse:.4f}")
-
-# Visualization
-plt.figure(figsize=(12, 6))
-plt.plot(range(len(testY)), scaler_Y.inverse_transform(testY).flatten(), label='Actual Values', marker='o')
-plt.plot(range(len(best_predictions)), best_predictions.flatten(), label=f'Predicted Values ({best_model_name})', marker='x')
-plt.legend()
-plt.title(f"Predicted vs Actual Values for {target_column}\nBest Model: {best_model_name} | Accuracy: {best_accuracy:.2f}%")
-plt.xlabel("Time Step")
-plt.ylabel(target_column)
-plt.show()
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+from dotenv import load_dotenv
+from atomicFile import atomic_write
+from datasetSource import dataset_source_from_env
+from soilSnapshot import load_dataset
+from modelTournament import CANDIDATES, print_leaderboard, run_tournament, tournament_data
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import argparse
+import datetime
+import json
+import os
+import warnings
+
+os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'  # Suppresses INFO and WARNING logs
+warnings.filterwarnings('ignore')
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Remove outliers using IQR
+def remove_outliers(df, column):
+    Q1 = df[column].quantile(0.25)
+    Q3 = df[column].quantile(0.75)
+    IQR = Q3 - Q1
+    lower_bound = Q1 - 1.5 * IQR
+    upper_bound = Q3 + 1.5 * IQR
+    return df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
+
+
+def load_current_dataset():
+    # Load the typed snapshot of the current dataset version (S3 by default, see DATASET_SOURCE),
+    # ingesting the CSV only when this version has not been seen before
+    source = dataset_source_from_env()
+    return load_dataset(source, os.getenv('DATASET_SNAPSHOT_DIR', 'snapshots'))
+
+
+def prepare_target(df, target_column, look_back=50):
+    """Scale the dataset for ``target_column`` and split it; returns (tournament data, actual test values)."""
+    df = df.copy()
+
+    # Fill missing values
+    df.fillna(df.mean(), inplace=True)
+
+    # Add derived features
+    df['P_diff'] = df[target_column].diff().fillna(0)
+    df['P_rolling_mean'] = df[target_column].rolling(window=5).mean().fillna(df[target_column])
+
+    df_no_outliers = remove_outliers(df, target_column)
+
+    # Separate features and target
+    target_no_outliers = df_no_outliers[[target_column]]
+    features_no_outliers = df_no_outliers.drop(columns=[target_column])
+
+    # Scale features and target
+    scaler_X = MinMaxScaler()
+    scaler_Y = MinMaxScaler()
+    scaled_features_no_outliers = scaler_X.fit_transform(features_no_outliers)
+    scaled_target_no_outliers = scaler_Y.fit_transform(target_no_outliers)
+
+    # Look-back sequences are built as strided views inside each candidate process
+    windows = len(scaled_features_no_outliers) - look_back
+
+    # Train/test split
+    train_start = int(windows * 0.6)
+    train_end = int(windows * 0.9)
+    test_start = train_end
+    test_end = windows
+
+    data = tournament_data(scaled_features_no_outliers, scaled_target_no_outliers, scaler_Y, look_back,
+                           (train_start, train_end), (test_start, test_end))
+    actual = scaler_Y.inverse_transform(scaled_target_no_outliers[look_back + test_start:look_back + test_end])
+    return data, actual
+
+
+def main():
+    # Only the interactive mode plots; batch workers never load a GUI backend
+    import matplotlib.pyplot as plt
+
+    df, dataset_version = load_current_dataset()
+
+    # Select target column
+    print("Available columns:", df.columns.tolist())
+    target_column = input("Enter the column you want to predict: ")
+
+    if target_column not in df.columns:
+        raise ValueError(f"Column '{target_column}' not found in dataset.")
+
+    # Train GRU, XGBoost and Linear Regression concurrently, each with early stopping on a validation split
+    data, actual = prepare_target(df, target_column)
+    board = run_tournament(data, budget=float(os.getenv('TOURNAMENT_BUDGET_SECONDS', 300)))
+    print_leaderboard(board)
+
+    finished = [r for r in board if r['status'] == 'ok']
+    if not finished:
+        raise RuntimeError("No model finished within the time budget.")
+
+    # Determine the best model
+    best = finished[0]
+    best_model_name, best_accuracy, best_predictions = best['model'], best['accuracy'], best['predictions']
+
+    # Print results for all models
+    print(f"Best Model: {best_model_name}")
+    print(f"Accuracy: {best_accuracy:.2f}%")
+    print("Metrics (MAE, RMSE):")
+    for r in finished:
+        print(f"{r['model']}: MAE={r['mae']:.4f}, RMSE={r['rmse']:.4f}")
+
+    # Visualization
+    plt.figure(figsize=(12, 6))
+    plt.plot(range(len(actual)), actual.flatten(), label='Actual Values', marker='o')
+    plt.plot(range(len(best_predictions)), best_predictions.flatten(), label=f'Predicted Values ({best_model_name})', marker='x')
+    plt.legend()
+    plt.title(f"Predicted vs Actual Values for {target_column}\nBest Model: {best_model_name} | Accuracy: {best_accuracy:.2f}%")
+    plt.xlabel("Time Step")
+    plt.ylabel(target_column)
+    plt.show()
+
+
+def evaluate_column(df, dataset_version, target_column, budget, threads):
+    """Run the tournament for one column and return its report entry (headless, no plotting)."""
+    started = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    try:
+        data, actual = prepare_target(df, target_column)
+        board = run_tournament(data, budget=budget, threads=threads)
+    except Exception as e:
+        return {'column': target_column, 'dataset_version': dataset_version, 'status': 'error',
+                'error': str(e), 'started': started}
+
+    for r in board:
+        if 'predictions' in r:
+            r['predictions'] = [float(v) for v in r['predictions']]
+    finished = [r for r in board if r['status'] == 'ok']
+    return {
+        'column': target_column,
+        'dataset_version': dataset_version,
+        'status': 'ok' if finished else 'failed',
+        'best_model': finished[0]['model'] if finished else None,
+        'best_accuracy': finished[0]['accuracy'] if finished else None,
+        'actual': [float(v) for v in actual.ravel()],
+        'leaderboard': board,
+        'started': started,
+        'finished': datetime.datetime.now(datetime.timezone.utc).isoformat()
+    }
+
+
+def read_report(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_report(path, report):
+    """Write the JSON report atomically, so an interrupted run never leaves a half-written file."""
+    with atomic_write(path) as f:
+        json.dump(report, f, indent=2)
+
+
+def write_parquet(path, report):
+    """One row per (column, model) with the leaderboard metrics; needs pyarrow or fastparquet."""
+    rows = []
+    for entry in report['columns'].values():
+        for r in entry.get('leaderboard', []):
+            rows.append({
+                'column': entry['column'],
+                'dataset_version': entry['dataset_version'],
+                'model': r['model'],
+                'status': r['status'],
+                'best': r['model'] == entry.get('best_model'),
+                'accuracy': r.get('accuracy'),
+                'mae': r.get('mae'),
+                'rmse': r.get('rmse'),
+                'fit_seconds': r.get('fit_seconds'),
+                'predict_ms': r.get('predict_ms'),
+                'predictions': r.get('predictions')
+            })
+    pd.DataFrame(rows).to_parquet(path, index=False)
+
+
+def run_batch(columns=None, report_path='reports/batch_prediction.json', parquet_path=None,
+              workers=2, budget=300.0, resume=True):
+    """Evaluate ``columns`` (default: every column but ID) in parallel worker processes.
+
+    The report is rewritten after every column. With ``resume`` columns that
+    already finished for the current dataset version are skipped, so an
+    interrupted run picks up where it stopped.
+    """
+    df, dataset_version = load_current_dataset()
+    all_columns = [col for col in df.columns if col != 'ID']
+    columns = columns or all_columns
+    unknown = [col for col in columns if col not in all_columns]
+    if unknown:
+        raise ValueError(f"Columns not found in dataset: {', '.join(unknown)}")
+
+    report = read_report(report_path) if resume else None
+    if report is None or report.get('dataset_version') != dataset_version:
+        report = {'dataset_version': dataset_version, 'columns': {}}
+    done = {col for col, entry in report['columns'].items() if entry['status'] == 'ok'}
+    pending = [col for col in columns if col not in done]
+    print(f"Dataset version {dataset_version}: {len(columns) - len(pending)} of {len(columns)} columns already done")
+
+    # Every column runs one process per candidate model; split the CPUs between all of them
+    workers = max(1, min(workers, len(pending) or 1))
+    threads = max(1, (os.cpu_count() or 1) // (workers * len(CANDIDATES)))
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {executor.submit(evaluate_column, df, dataset_version, col, budget, threads): col for col in pending}
+        for future in as_completed(futures):
+            entry = future.result()
+            report['columns'][entry['column']] = entry
+            report['updated'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            write_report(report_path, report)
+            best = f"{entry['best_model']} ({entry['best_accuracy']:.2f}%)" if entry.get('best_model') else entry['status']
+            print(f"{entry['column']}: {best}")
+
+    if parquet_path:
+        write_parquet(parquet_path, report)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find the best prediction model per soil column.")
+    parser.add_argument('--batch', action='store_true',
+                        help="headless mode: evaluate columns without prompting or plotting")
+    parser.add_argument('--columns', help="comma-separated columns for --batch (default: all)")
+    parser.add_argument('--report', default='reports/batch_prediction.json', help="JSON report path")
+    parser.add_argument('--parquet', help="also write the metrics table as Parquet")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('BATCH_WORKERS', 2)),
+                        help="columns evaluated in parallel")
+    parser.add_argument('--budget', type=float, default=float(os.getenv('TOURNAMENT_BUDGET_SECONDS', 300)),
+                        help="wall-clock seconds per column")
+    parser.add_argument('--no-resume', action='store_true', help="re-run columns already in the report")
+    return parser.parse_args(argv)
+
+
+# Candidates run in spawned processes that re-import this module, so nothing may run at import time
+if __name__ == "__main__":
+    args = parse_args()
+    if args.batch:
+        run_batch(columns=[col.strip() for col in args.columns.split(',')] if args.columns else None,
+                  report_path=args.report, parquet_path=args.parquet, workers=args.workers,
+                  budget=args.budget, resume=not args.no_resume)
+    else:
+        main()
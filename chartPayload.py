@@ -0,0 +1,117 @@
+"""Payload formats for the new_plot chart data.
+
+``json`` is the original list of ``{entry, actual, predicted}`` points
+(plus ``lower``/``upper`` for ensemble forecasts), with ``None`` for the
+missing half of each row. ``float32`` sends the same series as one
+contiguous little-endian float32 buffer, which Socket.IO ships as a binary
+attachment, and a header giving each series' byte offset and length in it:
+
+    {'column': ..., 'encoding': 'float32', 'byteOrder': 'little',
+     'entryStart': 1, 'rows': n, 'future': m,
+     'series': {'actual': {'offset': 0, 'length': n}, ...},
+     'buffer': <bytes>}
+
+A client reads a series as ``new Float32Array(buffer, offset, length)``;
+entries of ``future``/``lower``/``upper`` follow the ``n`` history rows.
+"""
+import numpy as np
+
+from soilSnapshot import json_values
+
+PLOT_FORMATS = ('json', 'float32')
+
+
+def plot_format(options):
+    """The chart format requested in process_data options, ``json`` unless asked otherwise."""
+    fmt = (options or {}).get('plot_format', 'json')
+    if fmt not in PLOT_FORMATS:
+        raise Exception(f"Unknown plot_format '{fmt}', expected one of {', '.join(PLOT_FORMATS)}")
+    return fmt
+
+
+def chart_points(actual, predicted, future, bands=None):
+    """The original list-of-dicts chart data, built from whole-array conversions."""
+    actual = json_values(actual)
+    predicted = json_values(predicted)
+    future = json_values(future)
+
+    history = len(actual)
+    points = [{"entry": i + 1, "actual": a, "predicted": p}
+              for i, (a, p) in enumerate(zip(actual, predicted))]
+    if bands is None:
+        points.extend({"entry": history + i + 1, "actual": None, "predicted": f}
+                      for i, f in enumerate(future))
+    else:
+        lower = json_values(bands['lower'])
+        upper = json_values(bands['upper'])
+        points.extend({"entry": history + i + 1, "actual": None, "predicted": f, "lower": lo, "upper": up}
+                      for i, (f, lo, up) in enumerate(zip(future, lower, upper)))
+    return points
+
+
+def chart_buffer(column, actual, predicted, future, bands=None):
+    """The float32 payload: every series packed into one buffer with an offset header."""
+    history = min(len(actual), len(predicted))
+    series = {
+        'actual': np.asarray(actual, dtype='<f4')[:history],
+        'predicted': np.asarray(predicted, dtype='<f4')[:history],
+        'future': np.asarray(future, dtype='<f4')
+    }
+    if bands is not None:
+        series['lower'] = np.asarray(bands['lower'], dtype='<f4')
+        series['upper'] = np.asarray(bands['upper'], dtype='<f4')
+
+    offsets = {}
+    offset = 0
+    for name, values in series.items():
+        offsets[name] = {'offset': offset, 'length': len(values)}
+        offset += values.nbytes
+
+    return {
+        'column': column,
+        'encoding': 'float32',
+        'byteOrder': 'little',
+        'entryStart': 1,
+        'rows': history,
+        'future': len(series['future']),
+        'series': offsets,
+        'buffer': np.concatenate(list(series.values())).tobytes()
+    }
+
+
+def plot_payload(column, actual, predicted, future, bands=None, fmt='json'):
+    """new_plot payload for ``column`` in format ``fmt``."""
+    if fmt == 'float32':
+        return chart_buffer(column, actual, predicted, future, bands)
+    return {'data': chart_points(actual, predicted, future, bands), 'column': column}
+
+
+def plot_series(payload):
+    """Series of a new_plot payload in either format, as float arrays over history + future rows.
+
+    ``actual`` is NaN on future rows and ``lower``/``upper`` (when present)
+    on history rows; ``predicted`` runs through both.
+    """
+    if payload.get('encoding') == 'float32':
+        buffer = payload['buffer']
+        series = {name: np.frombuffer(buffer, dtype='<f4', count=s['length'], offset=s['offset']).astype(float)
+                  for name, s in payload['series'].items()}
+        rows, future = payload['rows'], payload['future']
+    else:
+        points = payload['data']
+        series = {'actual': np.array([p['actual'] for p in points], dtype=float),
+                  'predicted': np.array([p['predicted'] for p in points], dtype=float)}
+        if points and 'lower' in points[-1]:
+            series['lower'] = np.array([p.get('lower') for p in points], dtype=float)
+            series['upper'] = np.array([p.get('upper') for p in points], dtype=float)
+        return series
+
+    blank_future, blank_history = np.full(future, np.nan), np.full(rows, np.nan)
+    result = {
+        'actual': np.concatenate([series['actual'], blank_future]),
+        'predicted': np.concatenate([series['predicted'], series['future']])
+    }
+    if 'lower' in series:
+        result['lower'] = np.concatenate([blank_history, series['lower']])
+        result['upper'] = np.concatenate([blank_history, series['upper']])
+    return result
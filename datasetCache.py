@@ -0,0 +1,271 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from soilSnapshot import (append_lock, ingest_csv, is_snapshot, load_snapshot, normalize_column_name, read_appended,
+                          snapshot_path, write_appended)
+
+
+def appended_version(version, rows):
+    """Version of a dataset with ``rows`` rows appended in memory to source version ``version``."""
+    return f"{version}+{rows}" if rows else version
+
+
+def split_version(version):
+    """Inverse of appended_version(): (source version, appended row count)."""
+    base, sep, rows = str(version).rpartition('+')
+    if sep and base and rows.isdigit():
+        return base, int(rows)
+    return version, 0
+
+
+class DatasetCache:
+    """Shared in-process copy of the soil dataset, keyed by its source version (the S3 ETag).
+
+    The dataset is only read and parsed again when the source reports a new
+    version. Between revalidations (every ``revalidate_interval`` seconds)
+    the cached frame is served without touching the source at all.
+
+    With a ``snapshot_root`` each version is ingested once into a float32
+    snapshot and memory-mapped from there, so a restarted worker that finds
+    the current version on disk skips the CSV parse entirely.
+
+    Rows added with append() sit on top of the source version and are
+    dropped once the source publishes a new one. With a ``snapshot_root``
+    each append is also written next to the snapshot, so every process
+    using that directory (all gunicorn workers, and the job workers) sees
+    the same appended rows, and they survive a restart. Without one they
+    live only in this process.
+
+    Fetching, parsing and writing snapshots happen outside the lock that
+    guards the cached frame, which is only held to swap a new one in; while
+    one thread revalidates, the others keep getting the current copy.
+    """
+
+    def __init__(self, source, revalidate_interval=60.0, snapshot_root=None):
+        self.source = source
+        self.revalidate_interval = revalidate_interval
+        self.snapshot_root = snapshot_root
+
+        self._lock = threading.Lock()
+        # Held by the one thread revalidating against the source
+        self._refresh_lock = threading.Lock()
+        # Base frame plus appended rows, built on the first get() after an append
+        self._frame = None
+        self._base = None
+        self._chunks = []
+        self._appended_rows = 0
+        self._version = None
+        self._checked_at = float('-inf')
+        # Modification time of the snapshot directory when its appended rows were last read
+        self._synced_mtime = None
+
+    @property
+    def version(self):
+        """Version of the cached dataset, or None if nothing has been loaded yet."""
+        if self._version is None:
+            return None
+        return appended_version(self._version, self._appended_rows)
+
+    @property
+    def snapshot_dir(self):
+        """Snapshot directory backing the cached frame, or None when snapshots are off."""
+        if not self.snapshot_root or self._version is None:
+            return None
+        return snapshot_path(self.snapshot_root, self._version)
+
+    def get(self, with_version=False):
+        """Return a read-only view of the dataset, revalidating it if it is due.
+
+        With ``with_version`` a (view, version) pair is returned, taken under
+        the same lock so the version always matches the data.
+        """
+        self._refresh_if_due()
+        self._sync_appended()
+        with self._lock:
+            if with_version:
+                return self._view(), self.version
+            return self._view()
+
+    def append(self, rows):
+        """Append samples (dicts of column -> value) to the dataset and return its new version.
+
+        Missing values are left as NaN and missing IDs continue the numbering.
+        Only the new rows are written; the combined frame is rebuilt once, on
+        the next get().
+        """
+        self._refresh_if_due()
+        snapshot_dir = self.snapshot_dir
+        if snapshot_dir is None:
+            with self._lock:
+                return self._add_chunk(self._rows_frame(rows))
+
+        with append_lock(snapshot_dir):
+            # Take in what other processes appended first, so the new rows go after theirs
+            self._sync_appended(force=True)
+            with self._lock:
+                new_rows = self._rows_frame(rows)
+                start = self._appended_rows
+            write_appended(snapshot_dir, start, new_rows)
+            with self._lock:
+                return self._add_chunk(new_rows)
+
+    def invalidate(self):
+        """Force the next get() to revalidate against the source."""
+        with self._lock:
+            self._checked_at = float('-inf')
+
+    def _due(self):
+        with self._lock:
+            return self._base is None or time.monotonic() - self._checked_at >= self.revalidate_interval
+
+    def _refresh_if_due(self):
+        if not self._due():
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            with self._lock:
+                if self._base is not None:
+                    # Another thread is revalidating; serve the current copy meanwhile
+                    return
+            # Nothing to serve yet, so wait for the first load
+            self._refresh_lock.acquire()
+        try:
+            if self._due():
+                self._revalidate()
+        finally:
+            self._refresh_lock.release()
+
+    def _revalidate(self):
+        """Check the source for a new version; only called with the refresh lock held."""
+        with self._lock:
+            cold, version = self._base is None, self._version
+
+        if cold and self.snapshot_root and self._load_existing_snapshot():
+            return
+
+        try:
+            obj = self.source.fetch(if_none_match=version)
+        except Exception as e:
+            if cold:
+                raise
+            # Keep serving the last good copy if the source is temporarily unreachable
+            print(f"Revalidation of {self.source.name} failed, serving cached copy: {e}")
+            with self._lock:
+                self._checked_at = time.monotonic()
+            return
+
+        if obj is None:
+            with self._lock:
+                self._checked_at = time.monotonic()
+            return
+
+        try:
+            frame = self._parse(obj)
+        finally:
+            obj.body.close()
+        with self._lock:
+            if self._appended_rows:
+                print(f"Dropping {self._appended_rows} appended rows, {self.source.name} has a new version")
+            self._set_base(frame, obj.version)
+        print(f"Loaded {self.source.name} (version {obj.version}). DataFrame shape: {frame.shape}")
+
+    def _load_existing_snapshot(self):
+        version = self.source.version()
+        snapshot_dir = snapshot_path(self.snapshot_root, version)
+        if not is_snapshot(snapshot_dir):
+            return False
+        frame = load_snapshot(snapshot_dir)
+        with self._lock:
+            self._set_base(frame, version)
+        print(f"Loaded snapshot of {self.source.name} (version {version}). DataFrame shape: {frame.shape}")
+        return True
+
+    def _set_base(self, frame, version):
+        """Swap in a new source version; called with the lock held."""
+        self._frame = self._base = frame
+        self._chunks = []
+        self._appended_rows = 0
+        self._version = version
+        self._checked_at = time.monotonic()
+        self._synced_mtime = None
+
+    def _add_chunk(self, new_rows):
+        """Add appended rows and return the new version; called with the lock held."""
+        self._chunks.append(new_rows)
+        self._appended_rows += len(new_rows)
+        self._frame = None
+        print(f"Appended {len(new_rows)} rows to {self.source.name} (version {self.version})")
+        return self.version
+
+    def _sync_appended(self, force=False):
+        """Read rows other processes appended next to the snapshot since this one last looked.
+
+        One ``stat`` of the snapshot directory when nothing changed. ``force``
+        reads regardless, for callers holding the append lock.
+        """
+        snapshot_dir = self.snapshot_dir
+        if snapshot_dir is None:
+            return
+        try:
+            mtime = os.stat(snapshot_dir).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if not force and mtime == self._synced_mtime:
+                return
+            version, start = self._version, self._appended_rows
+
+        frames = read_appended(snapshot_dir, start)
+        with self._lock:
+            # Only if no new source version or append got in meanwhile
+            if (self._version, self._appended_rows) != (version, start):
+                return
+            for frame in frames:
+                self._chunks.append(frame)
+                self._appended_rows += len(frame)
+            if frames:
+                self._frame = None
+            self._synced_mtime = mtime
+
+    def _rows_frame(self, rows):
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            raise Exception("No rows to append")
+        unknown = sorted({name for row in rows for name in row} - set(self._base.columns))
+        if unknown:
+            raise Exception(f"Unknown columns: {', '.join(unknown)}")
+
+        frame = pd.DataFrame(list(rows), columns=self._base.columns).apply(pd.to_numeric, errors='coerce')
+        if 'ID' in frame.columns and frame['ID'].isna().any():
+            last_id = max((chunk['ID'].max() for chunk in [self._base] + self._chunks), default=np.nan)
+            next_ids = pd.Series(range(1, len(frame) + 1), index=frame.index) + (0 if pd.isna(last_id) else last_id)
+            frame['ID'] = frame['ID'].fillna(next_ids)
+
+        # Keep the base dtypes (float32 for snapshots) wherever the values fit
+        for column, dtype in self._base.dtypes.items():
+            if dtype.kind == 'f' or not frame[column].isna().any():
+                frame[column] = frame[column].astype(dtype)
+        return frame
+
+    def _parse(self, obj):
+        if self.snapshot_root:
+            snapshot_dir = snapshot_path(self.snapshot_root, obj.version)
+            ingest_csv(obj.body, snapshot_dir, version=obj.version)
+            return load_snapshot(snapshot_dir)
+
+        frame = pd.read_csv(obj.body)
+        frame.columns = [normalize_column_name(c) for c in frame.columns]
+        return frame
+
+    def _view(self):
+        if self._frame is None:
+            self._frame = pd.concat([self._base] + self._chunks, ignore_index=True)
+        # With copy-on-write enabled a shallow copy is free and any write by the
+        # caller materializes its own data; otherwise fall back to a deep copy.
+        if pd.options.mode.copy_on_write:
+            return self._frame.copy(deep=False)
+        return self._frame.copy()
@@ -0,0 +1,179 @@
+import hashlib
+import io
+import os
+import shutil
+import threading
+from collections import namedtuple
+
+from stageTimings import METRICS
+
+DEFAULT_BUCKET = 'aveva-csv-bucket'
+DEFAULT_KEY = 'SOIL DATA GR.csv'
+
+# body is a readable binary stream; version identifies its content (ETag for S3)
+DatasetObject = namedtuple('DatasetObject', ['body', 'version'])
+
+
+def s3_client_config():
+    """Pooled, keep-alive config for the one client shared by every S3 read in the process."""
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=int(os.getenv('S3_MAX_POOL_CONNECTIONS', '32')),
+        connect_timeout=5,
+        read_timeout=30,
+        retries={'max_attempts': 3, 'mode': 'standard'},
+        tcp_keepalive=True
+    )
+
+
+def create_s3_client(credentials=None):
+    """Create an S3 client with the pooled config, falling back to boto3's default credential chain.
+
+    boto3 is imported here rather than at module import, so processes that
+    never touch S3 (local sources, tests, the app's connect path before the
+    first fetch) do not pay for it.
+    """
+    import boto3
+    if credentials is None:
+        return boto3.client('s3', config=s3_client_config())
+    return boto3.client('s3',
+                        aws_access_key_id=credentials["AWS_ACCESS_KEY_ID"],
+                        aws_secret_access_key=credentials["AWS_SECRET_ACCESS_KEY"],
+                        region_name=credentials["AWS_REGION"],
+                        config=s3_client_config())
+
+
+class DatasetSource:
+    """Where the soil dataset CSV is read from."""
+
+    name = 'dataset'
+
+    def fetch(self, if_none_match=None):
+        """Open the dataset for streaming.
+
+        Returns a DatasetObject, or None when ``if_none_match`` equals the
+        current version and the caller's copy is still good.
+        """
+        raise NotImplementedError
+
+    def version(self):
+        """Return the current version without reading the data."""
+        raise NotImplementedError
+
+    def download(self, local_path):
+        """Stream the dataset into ``local_path`` and return its version."""
+        obj = self.fetch()
+        try:
+            with open(local_path, 'wb') as f:
+                shutil.copyfileobj(obj.body, f, 1024 * 1024)
+        finally:
+            obj.body.close()
+        return obj.version
+
+
+class S3DatasetSource(DatasetSource):
+    """Dataset stored as an object in S3, read with one long-lived client."""
+
+    def __init__(self, bucket_name=DEFAULT_BUCKET, file_key=DEFAULT_KEY, client=None, client_factory=create_s3_client):
+        self.bucket_name = bucket_name
+        self.file_key = file_key
+        self.name = file_key
+        self._client = client
+        self._client_factory = client_factory
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    def fetch(self, if_none_match=None):
+        from botocore.exceptions import ClientError
+        request = {'Bucket': self.bucket_name, 'Key': self.file_key}
+        if if_none_match is not None:
+            request['IfNoneMatch'] = if_none_match
+
+        try:
+            with METRICS.time('external_call_seconds', call='s3_get_object'):
+                obj = self.client.get_object(**request)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('304', 'NotModified'):
+                return None
+            raise self._translate_error(e)
+        return DatasetObject(obj['Body'], obj.get('ETag'))
+
+    def version(self):
+        from botocore.exceptions import ClientError
+        try:
+            with METRICS.time('external_call_seconds', call='s3_head_object'):
+                return self.client.head_object(Bucket=self.bucket_name, Key=self.file_key).get('ETag')
+        except ClientError as e:
+            raise self._translate_error(e)
+
+    def _translate_error(self, e):
+        error_code = e.response['Error']['Code']
+        if error_code == 'NoSuchBucket':
+            return Exception(f"S3 bucket '{self.bucket_name}' does not exist")
+        elif error_code in ('NoSuchKey', '404'):
+            return Exception(f"File '{self.file_key}' not found in S3 bucket")
+        else:
+            return Exception(f"AWS S3 error: {str(e)}")
+
+
+class LocalFileDatasetSource(DatasetSource):
+    """Dataset read from a file on local disk, versioned by size and mtime."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+
+    def fetch(self, if_none_match=None):
+        current = self.version()
+        if if_none_match is not None and if_none_match == current:
+            return None
+        return DatasetObject(open(self.path, 'rb'), current)
+
+    def version(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise Exception(f"File '{self.path}' not found")
+        return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+class InMemoryDatasetSource(DatasetSource):
+    """Dataset held as bytes in memory; handy for tests and benchmarks."""
+
+    def __init__(self, data, name='memory'):
+        self.name = name
+        self.update(data)
+
+    def update(self, data):
+        """Replace the dataset contents, bumping the version."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._data = bytes(data)
+        self._version = hashlib.sha1(self._data).hexdigest()
+
+    def fetch(self, if_none_match=None):
+        if if_none_match is not None and if_none_match == self._version:
+            return None
+        return DatasetObject(io.BytesIO(self._data), self._version)
+
+    def version(self):
+        return self._version
+
+
+def dataset_source_from_env(client_factory=create_s3_client):
+    """Build the dataset source selected by DATASET_SOURCE (s3, local)."""
+    kind = os.getenv('DATASET_SOURCE', 's3').lower()
+    if kind == 's3':
+        return S3DatasetSource(os.getenv('DATASET_BUCKET', DEFAULT_BUCKET),
+                               os.getenv('DATASET_KEY', DEFAULT_KEY),
+                               client_factory=client_factory)
+    if kind == 'local':
+        return LocalFileDatasetSource(os.getenv('DATASET_PATH', DEFAULT_KEY))
+    raise Exception(f"Unknown DATASET_SOURCE '{kind}', expected 's3' or 'local'")
@@ -0,0 +1,59 @@
+import math
+import zlib
+
+import numpy as np
+
+from soilSnapshot import json_values
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 50000
+
+
+def stream_options(options):
+    """Normalize the options sent with request_full_dataset."""
+    options = options or {}
+    chunk_size = int(options.get('chunk_size', DEFAULT_CHUNK_SIZE))
+    return {
+        'chunk_size': max(1, min(chunk_size, MAX_CHUNK_SIZE)),
+        # Compression is applied to the float32 buffers, so it implies binary
+        'binary': bool(options.get('binary', False) or options.get('compress', False)),
+        'compress': bool(options.get('compress', False))
+    }
+
+
+def dataset_header(df, chunk_size, binary, compress, version=None):
+    """Payload for full_dataset_start."""
+    return {
+        'columns': df.columns.tolist(),
+        'rows': len(df),
+        'chunkSize': chunk_size,
+        'chunks': math.ceil(len(df) / chunk_size),
+        'encoding': 'float32' if binary else 'json',
+        'compression': 'deflate' if compress else None,
+        'version': version
+    }
+
+
+def iter_dataset_chunks(df, chunk_size, binary=False, compress=False):
+    """Yield full_dataset_chunk payloads, one column-oriented row range at a time.
+
+    Only the current slice is ever converted, so memory stays proportional to
+    ``chunk_size`` rather than to the dataset. Missing values are sent as 0,
+    matching the non-streaming full_dataset event.
+    """
+    columns = df.columns.tolist()
+    arrays = [df[column].to_numpy() for column in columns]
+
+    for index, start in enumerate(range(0, len(df), chunk_size)):
+        stop = min(start + chunk_size, len(df))
+        encoded = {}
+        for column, values in zip(columns, arrays):
+            if binary:
+                block = np.nan_to_num(np.asarray(values[start:stop], dtype='<f4'), nan=0.0)
+                # bytes values are sent as Socket.IO binary attachments
+                buffer = block.tobytes()
+                encoded[column] = zlib.compress(buffer, 1) if compress else buffer
+            else:
+                encoded[column] = json_values(np.nan_to_num(values[start:stop], nan=0))
+
+        yield {'index': index, 'start': start, 'stop': stop, 'columns': encoded}
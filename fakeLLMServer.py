@@ -0,0 +1,69 @@
+"""OpenAI-compatible stand-in for load tests.
+
+Run ``python fakeLLMServer.py [port]`` and start the backend with
+OPENAI_BASE_URL=http://localhost:<port>/v1 so neither the weights request
+nor the streamed analysis leaves the machine. FAKE_LLM_DELAY sets the
+seconds between streamed tokens.
+"""
+import json
+import os
+import re
+import sys
+import time
+
+from flask import Flask, Response, jsonify, request
+
+from sustainabilityAnalysis import STUB_ANALYSIS
+
+app = Flask(__name__)
+TOKEN_DELAY = float(os.getenv('FAKE_LLM_DELAY', 0.02))
+
+
+def reply_for(messages):
+    prompt = messages[-1]['content'] if messages else ''
+    minerals = re.search(r'minerals from soil data: (.*)', prompt)
+    if minerals:
+        return json.dumps({name: 0.5 for name in minerals.group(1).split(', ')})
+    return STUB_ANALYSIS
+
+
+def completion_chunk(model, content=None, finish_reason=None):
+    delta = {'content': content} if content is not None else {}
+    return {
+        'id': 'chatcmpl-fake',
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+    }
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    body = request.get_json()
+    model = body.get('model', 'fake')
+    reply = reply_for(body.get('messages', []))
+
+    if not body.get('stream'):
+        return jsonify({
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        })
+
+    def events():
+        for i, word in enumerate(reply.split(' ')):
+            time.sleep(TOKEN_DELAY)
+            yield f"data: {json.dumps(completion_chunk(model, word if i == 0 else ' ' + word))}\n\n"
+        yield f"data: {json.dumps(completion_chunk(model, finish_reason='stop'))}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return Response(events(), mimetype='text/event-stream')
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8089
+    app.run(port=port, threaded=True)
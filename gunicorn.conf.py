@@ -0,0 +1,38 @@
+# Picked up automatically by gunicorn from the working directory (see Dockerfile)
+import os
+
+# Off by default: preloading imports app.py in the master, which monkey-patches it with eventlet
+# and builds the job pool and job board there. GUNICORN_PRELOAD=1 trades that for faster worker
+# starts; post_fork then gives every worker its own pool and board.
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1'
+
+
+def when_ready(server):
+    # Runs in the master before the first fork; the lazily imported modules are shared with every worker.
+    # The master never runs jobs, so the job pool and board its import built (and the board's temp
+    # directory) go; post_fork builds each worker its own.
+    if preload_app:
+        import app
+        app.warm_up()
+        app.job_executor.shutdown()
+        app.job_board.close()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import reset_worker_state
+        reset_worker_state()
+
+
+def post_worker_init(worker):
+    # Runs in every worker once eventlet has patched it and app.py is loaded, before it accepts
+    # connections, so the first process_data does not stall the hub on the lazy imports
+    from app import warm_up
+    warm_up()
+
+
+def worker_exit(server, worker):
+    # Stop the process_data worker pool explicitly; its interpreter-exit hook can hang under eventlet
+    import app
+    app.job_executor.shutdown()
+    app.job_board.close()
@@ -0,0 +1,214 @@
+"""Long-lived worker that keeps TensorFlow, statsmodels and loaded models warm.
+
+``newAI1.py`` and ``ARIMAmodelPrediction.py`` used to pay every import on
+every call. Run ``python inferenceWorker.py --socket /tmp/inference.sock``
+(or ``--stdio``) once and point the scripts at it with
+``INFERENCE_SOCKET``; they then only forward the request and print the
+answer, and fall back to running it themselves when no worker listens,
+the worker is busy, or it does not answer within ``INFERENCE_TIMEOUT``
+seconds (300 by default).
+
+The protocol is JSON lines. A request is
+``{"id": ..., "task": "newAI1" | "arima", "args": {...}}`` and its
+response is ``{"id": ..., "result": ...}`` or ``{"id": ..., "error": ...}``,
+with ``"busy": true`` when the request was turned away unrun.
+Responses may come back out of order; match them by ``id``.
+"""
+import argparse
+import importlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# task -> (module, function); keyword arguments come from the request's "args"
+TASKS = {
+    'newAI1': ('newAI1', 'predict'),
+    'arima': ('ARIMAmodelPrediction', 'process_data')
+}
+
+
+class WorkerError(Exception):
+    """Raised on the client side when the worker answers with an error."""
+
+
+class WorkerBusy(WorkerError):
+    """Raised on the client side when the worker turned the request away without running it."""
+
+
+class InferenceWorker:
+    """Runs tasks on a bounded thread pool inside one warm process.
+
+    At most ``max_concurrency`` requests run at once and at most
+    ``max_queue`` more wait; anything beyond that is answered with a busy
+    error right away, like JobExecutor does for the web app.
+    """
+
+    def __init__(self, max_concurrency=2, max_queue=8):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_concurrency + max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='inference')
+
+    def warm_up(self):
+        """Import every task module and the libraries they pull in lazily."""
+        for module, _ in TASKS.values():
+            importlib.import_module(module)
+        import pandas  # noqa: F401
+        import sklearn.preprocessing  # noqa: F401
+        import statsmodels.tsa.arima.model  # noqa: F401
+        import tensorflow  # noqa: F401
+        import modelRegistry  # noqa: F401
+
+    def run(self, request):
+        """Run one request synchronously and return its response."""
+        response = {'id': request.get('id')}
+        if request.get('task') not in TASKS:
+            response['error'] = f"Unknown task '{request.get('task')}'"
+            return response
+        try:
+            module, function = TASKS[request['task']]
+            fn = getattr(importlib.import_module(module), function)
+            response['result'] = fn(**request.get('args', {}))
+        except Exception as e:
+            response['error'] = str(e)
+        return response
+
+    def submit(self, line, respond):
+        """Parse one request line and call ``respond(response)`` once it has run."""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            respond({'id': None, 'error': f"Invalid JSON request: {e}"})
+            return
+
+        if not self._slots.acquire(blocking=False):
+            respond({'id': request.get('id'), 'busy': True,
+                     'error': f"Worker is busy: {self.max_concurrency + self.max_queue} requests already queued or running"})
+            return
+
+        def done(future):
+            self._slots.release()
+            respond(future.result())
+
+        self._pool.submit(self.run, request).add_done_callback(done)
+
+    def serve_stdio(self, stdin=None, stdout=None):
+        """Answer requests read from stdin on stdout until stdin closes.
+
+        Anything the tasks print goes to stderr, so stdout carries only responses.
+        """
+        stdin = stdin or sys.stdin
+        if stdout is None:
+            stdout, sys.stdout = sys.stdout, sys.stderr
+        lock = threading.Lock()
+
+        def respond(response):
+            with lock:
+                stdout.write(json.dumps(response) + '\n')
+                stdout.flush()
+
+        for line in stdin:
+            if line.strip():
+                self.submit(line, respond)
+        self._pool.shutdown(wait=True)
+
+    def serve_socket(self, path):
+        """Answer requests on a Unix socket; each connection may send many lines."""
+        worker = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                lock = threading.Lock()
+                pending = threading.Semaphore(0)
+                sent = 0
+
+                def respond(response):
+                    with lock:
+                        try:
+                            self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+                            self.wfile.flush()
+                        except OSError:
+                            pass
+                    pending.release()
+
+                for line in self.rfile:
+                    if line.strip():
+                        worker.submit(line.decode('utf-8'), respond)
+                        sent += 1
+                # Keep the connection open until every request on it has been answered
+                for _ in range(sent):
+                    pending.acquire()
+
+        if os.path.exists(path):
+            os.remove(path)
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+            server.daemon_threads = True
+            print(f"Inference worker listening on {path}", file=sys.stderr, flush=True)
+            try:
+                server.serve_forever()
+            finally:
+                os.remove(path)
+
+
+def request(task, args, socket_path, timeout=None):
+    """Send one request to the worker on ``socket_path`` and return its result.
+
+    ``timeout`` (seconds, ``INFERENCE_TIMEOUT`` by default) bounds every
+    socket operation, so a stuck worker raises ``socket.timeout``.
+    """
+    if timeout is None:
+        timeout = float(os.getenv('INFERENCE_TIMEOUT', '300'))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(socket_path)
+        conn.sendall((json.dumps({'id': 1, 'task': task, 'args': args}) + '\n').encode('utf-8'))
+        conn.shutdown(socket.SHUT_WR)
+        with conn.makefile('r', encoding='utf-8') as reader:
+            response = json.loads(reader.readline())
+
+    if 'error' in response:
+        raise (WorkerBusy if response.get('busy') else WorkerError)(response['error'])
+    return response['result']
+
+
+def call_worker(task, args, local):
+    """Run ``task`` on the worker at ``INFERENCE_SOCKET``, or call ``local()`` when it cannot run it.
+
+    That covers no worker listening, a busy worker, a timeout and an empty
+    or garbled reply; an error raised by the task itself is passed on.
+    """
+    socket_path = os.getenv('INFERENCE_SOCKET')
+    if not socket_path:
+        return local()
+    try:
+        return request(task, args, socket_path)
+    except (WorkerBusy, OSError, json.JSONDecodeError) as e:
+        # stdout carries the script's JSON answer
+        print(f"Inference worker unavailable ({e!r}), running {task} locally", file=sys.stderr)
+        return local()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve newAI1 and ARIMA predictions from a warm process.")
+    transport = parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument('--stdio', action='store_true', help="JSON lines on stdin/stdout")
+    transport.add_argument('--socket', help="JSON lines on this Unix socket path")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('INFERENCE_CONCURRENCY', 2)),
+                        help="requests run at once")
+    parser.add_argument('--queue', type=int, default=int(os.getenv('INFERENCE_QUEUE', 8)),
+                        help="requests allowed to wait for a slot")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    worker = InferenceWorker(max_concurrency=args.concurrency, max_queue=args.queue)
+    worker.warm_up()
+    if args.stdio:
+        worker.serve_stdio()
+    else:
+        worker.serve_socket(args.socket)
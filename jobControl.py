@@ -0,0 +1,119 @@
+"""Cooperative cancellation and stage progress for jobs in worker processes.
+
+Spawned workers share nothing with the web process but the filesystem, so
+each job is a pair of small files in the board's state directory: the
+worker rewrites ``<id>.progress`` as it reaches each stage, and the hub
+creates ``<id>.cancel`` to ask it to stop. Workers only look for the flag
+at their checkpoints between stages, so a stage already running finishes
+first; a checkpoint costs one ``stat`` and one small atomic write.
+
+A job started with a ``timeout`` also stops at the first checkpoint past
+its wall-clock deadline with JobTimeout, so a worker whose caller already
+gave up frees its slot without waiting to be cancelled. The stage running
+at the deadline is not interrupted.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from atomicFile import atomic_write
+
+
+class JobCancelled(Exception):
+    """Raised at the checkpoint of a job that was cancelled."""
+
+
+class JobTimeout(Exception):
+    """Raised when a job runs past its wall-time budget."""
+
+
+class JobHandle:
+    """Worker side of a job: pass it to the job function and call ``checkpoint`` between stages.
+
+    ``deadline`` is a ``time.time()`` value, since the handle crosses processes.
+    """
+
+    def __init__(self, state_dir, job_id, deadline=None):
+        self.state_dir = state_dir
+        self.job_id = job_id
+        self.deadline = deadline
+        self.step = 0
+
+    def path(self, kind):
+        return os.path.join(self.state_dir, f"{self.job_id}.{kind}")
+
+    def checkpoint(self, stage):
+        """Stop here if the job was cancelled, otherwise record ``stage`` as the one now running."""
+        if os.path.exists(self.path('cancel')):
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+        if self.deadline is not None and time.time() > self.deadline:
+            raise JobTimeout(f"Job {self.job_id} ran past its time limit before stage '{stage}'")
+        self.step += 1
+
+        try:
+            # A state directory removed by a closed board must not be recreated
+            with atomic_write(self.path('progress'), makedirs=False) as f:
+                json.dump({'stage': stage, 'step': self.step}, f)
+        except OSError:
+            # Progress is best effort; the hub just sees the previous stage for longer
+            pass
+
+
+class JobBoard:
+    """Hub side: hands out job handles, reads their progress and cancels them.
+
+    Without ``state_dir`` each board gets its own temporary directory, so
+    several web processes on one machine never see each other's jobs.
+    """
+
+    def __init__(self, state_dir=None):
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._owned = not state_dir
+        self.state_dir = state_dir or tempfile.mkdtemp(prefix='jobs-')
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def start(self, job_id=None, timeout=None):
+        """Register a new job and return its handle.
+
+        With ``timeout`` the job raises JobTimeout at its first checkpoint after that many seconds.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        handle = JobHandle(self.state_dir, job_id or uuid.uuid4().hex, deadline)
+        with self._lock:
+            self._active.add(handle.job_id)
+        return handle
+
+    def progress(self, job_id):
+        """``{'stage', 'step'}`` of the stage the job last reached, or None before its first checkpoint."""
+        try:
+            with open(JobHandle(self.state_dir, job_id).path('progress')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def cancel(self, job_id):
+        """Ask a job to stop at its next checkpoint."""
+        with self._lock:
+            if job_id not in self._active:
+                return
+            open(JobHandle(self.state_dir, job_id).path('cancel'), 'a').close()
+
+    def discard(self, job_id):
+        """Forget a job that has ended and remove its files."""
+        handle = JobHandle(self.state_dir, job_id)
+        with self._lock:
+            self._active.discard(job_id)
+            for kind in ('progress', 'cancel'):
+                if os.path.exists(handle.path(kind)):
+                    os.remove(handle.path(kind))
+
+    def close(self):
+        """Remove the temporary state directory, if the board made one."""
+        if self._owned:
+            shutil.rmtree(self.state_dir, ignore_errors=True)
@@ -0,0 +1,114 @@
+import importlib
+import multiprocessing
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, TimeoutError, wait
+
+from jobControl import JobTimeout
+
+
+class JobRejected(Exception):
+    """Raised when the executor's queue is full."""
+
+
+def _run_initializer(path, *args):
+    """Import ``module:function`` inside the worker and call it."""
+    module, name = path.split(':')
+    getattr(importlib.import_module(module), name)(*args)
+
+
+class JobExecutor:
+    """Bounded process pool for CPU-heavy request work.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more
+    wait for a worker; anything beyond that is rejected immediately instead
+    of piling up. Workers are spawned rather than forked so they never
+    inherit the web process's eventlet hub. ``initializer`` may be given as
+    a ``'module:function'`` string, so the parent never has to import the
+    module itself.
+
+    ``job_timeout`` bounds how long callers wait for a result; a running
+    worker cannot be stopped from here. Jobs that take a JobHandle enforce
+    the same limit themselves when started with ``JobBoard.start(timeout=...)``.
+    """
+
+    def __init__(self, max_workers=2, max_queue=8, job_timeout=120.0, initializer=None, initargs=()):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        if isinstance(initializer, str):
+            initializer, initargs = _run_initializer, (initializer,) + tuple(initargs)
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=initializer,
+            initargs=initargs
+        )
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)`` on a worker and return its future."""
+        if not self._slots.acquire(blocking=False):
+            raise JobRejected(f"Server is busy: {self.max_workers + self.max_queue} jobs already queued or running")
+
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(self._release)
+        return future
+
+    def result(self, future, timeout=None):
+        """Wait for a job's result, giving up after the job's wall-time budget."""
+        timeout = self.job_timeout if timeout is None else timeout
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise JobTimeout(f"Job exceeded its {timeout:.0f}s time limit")
+
+    def results(self, futures, timeout=None, poll=None, interval=0.25):
+        """Wait for every job in ``futures`` and return their results in order.
+
+        ``poll()`` is called every ``interval`` seconds while any is still
+        running. If it raises, a job fails, or the jobs together run past
+        ``timeout`` (the wall-time budget by default), the jobs that have
+        not started yet are cancelled and the exception propagates.
+        """
+        timeout = self.job_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        pending = set(futures)
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise JobTimeout(f"Job exceeded its {timeout:.0f}s time limit")
+                done, pending = wait(pending, timeout=min(interval, remaining) if poll else remaining,
+                                     return_when=FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+                if pending and poll is not None:
+                    poll()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return [future.result() for future in futures]
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self._pending, 'max_workers': self.max_workers, 'max_queue': self.max_queue}
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
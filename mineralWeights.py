@@ -0,0 +1,181 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from atomicFile import atomic_write
+from stageTimings import METRICS
+
+
+def weights_prompt(columns):
+    return f"""
+    Given these minerals from soil data: {', '.join(columns)}
+    Provide weights (0-1) for each mineral's importance in determining mining sustainability.
+    Consider: environmental impact, economic value, scarcity, extraction difficulty, and recovery time.
+    Return only a Python dictionary with minerals as keys and weights as values.
+    Example format: {{"mineral1": 0.8, "mineral2": 0.6}}
+    """
+
+
+def uniform_weights(columns):
+    return {col: 1.0 / len(columns) for col in columns}
+
+
+def parse_weights(text, columns):
+    """Parse a model reply into {column: weight}, accepting only a literal dict of numbers in [0, 1].
+
+    Unknown keys are dropped; the reply is never executed.
+    """
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if match is None:
+        raise ValueError(f"No dictionary found in weights reply: {text!r}")
+
+    literal = match.group(0)
+    try:
+        parsed = json.loads(literal)
+    except ValueError:
+        parsed = ast.literal_eval(literal)
+    if not isinstance(parsed, dict):
+        raise ValueError("Weights reply is not a dictionary")
+
+    # Replies sometimes trim stray whitespace from column names, so match on the stripped name
+    by_name = {' '.join(str(col).split()): col for col in columns}
+    weights = {}
+    for name, value in parsed.items():
+        column = by_name.get(' '.join(str(name).split()))
+        if column is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+            raise ValueError(f"Invalid weight for '{column}': {value!r}")
+        weights[column] = float(value)
+
+    if not weights:
+        raise ValueError("Weights reply did not mention any known column")
+    return weights
+
+
+class OpenAIWeightsProvider:
+    """Asks the chat model for weights."""
+
+    def __init__(self, client, model="gpt-3.5-turbo", timeout=30.0):
+        self.client = client
+        self.model = model
+        self.timeout = timeout
+
+    def fetch(self, columns):
+        with METRICS.time('external_call_seconds', call='openai_weights'):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "You are an expert in mining sustainability and mineral importance."},
+                    {"role": "user", "content": weights_prompt(columns)}
+                ],
+                temperature=0.3,
+                timeout=self.timeout
+            )
+        return response.choices[0].message.content.strip()
+
+
+class StubWeightsProvider:
+    """Offline stand-in that answers instantly with deterministic weights derived from the column names."""
+
+    def fetch(self, columns):
+        weights = {}
+        for col in columns:
+            digest = hashlib.sha1(col.encode('utf-8')).digest()
+            weights[col] = round(0.2 + 0.8 * digest[0] / 255, 2)
+        return json.dumps(weights)
+
+
+class WeightsCache:
+    """Mineral weights keyed by the column set, persisted to disk with a TTL.
+
+    Concurrent requests for the same column set share one in-flight fetch.
+    Replies that fail to parse fall back to uniform weights, which are
+    returned but never cached.
+    """
+
+    def __init__(self, provider, path=None, ttl=7 * 24 * 3600):
+        self.provider = provider
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = self._read()
+        self._in_flight = {}
+
+    @staticmethod
+    def key(columns):
+        return hashlib.sha1(json.dumps(sorted(columns)).encode('utf-8')).hexdigest()
+
+    def get(self, columns):
+        columns = list(columns)
+        key = self.key(columns)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry['fetched_at'] < self.ttl:
+                return dict(entry['weights'])
+
+            waiter = self._in_flight.get(key)
+            leader = waiter is None
+            if leader:
+                waiter = self._in_flight[key] = {'done': threading.Event(), 'weights': None}
+
+        if not leader:
+            waiter['done'].wait()
+            return dict(waiter['weights'])
+
+        try:
+            weights = self._fetch(key, columns)
+            waiter['weights'] = weights
+            return dict(weights)
+        finally:
+            if waiter['weights'] is None:
+                waiter['weights'] = uniform_weights(columns)
+            with self._lock:
+                del self._in_flight[key]
+            waiter['done'].set()
+
+    def _fetch(self, key, columns):
+        try:
+            weights = parse_weights(self.provider.fetch(columns), columns)
+        except Exception as e:
+            print(f"Error getting mineral weights: {e}")
+            return uniform_weights(columns)
+
+        with self._lock:
+            self._entries[key] = {'weights': weights, 'fetched_at': time.time()}
+            self._write()
+        return weights
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable weights cache {self.path}: {e}")
+            return {}
+
+    def _write(self):
+        if not self.path:
+            return
+        try:
+            with atomic_write(self.path) as f:
+                json.dump(self._entries, f)
+        except OSError as e:
+            print(f"Failed to persist weights cache: {e}")
+
+
+def weights_provider_from_env(openai_client):
+    """Pick the weights provider named by WEIGHTS_PROVIDER (openai, stub)."""
+    kind = os.getenv('WEIGHTS_PROVIDER', 'openai').lower()
+    if kind == 'openai':
+        return OpenAIWeightsProvider(openai_client)
+    if kind == 'stub':
+        return StubWeightsProvider()
+    raise Exception(f"Unknown WEIGHTS_PROVIDER '{kind}', expected 'openai' or 'stub'")
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+
+from atomicFile import atomic_write
+
+
+class ModelCache:
+    """Fitted models keyed by (dataset version, target column, feature config).
+
+    Entries live in a bounded in-memory LRU. When ``cache_dir`` is set every
+    entry is also written there with joblib, so a restarted process can pick
+    it back up instead of refitting. The directory is bounded too: past
+    ``max_disk_entries`` files (or ``max_disk_bytes``), the least recently
+    used ones by mtime are removed, since every new dataset version writes
+    new entries.
+    """
+
+    def __init__(self, max_entries=32, cache_dir=None, max_disk_entries=256, max_disk_bytes=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_evictions': 0}
+
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError as e:
+                # The disk tier is best effort; _store retries and the LRU works without it
+                print(f"Model cache directory {cache_dir} is unavailable: {e}")
+
+    @staticmethod
+    def key(dataset_version, target_column, config):
+        """Stable cache key for a model fitted on one column of one dataset version."""
+        payload = json.dumps([dataset_version, target_column, config], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached entry for ``key``, or None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return self._entries[key]
+
+        entry = self._load(key)
+        with self._lock:
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['disk_hits'] += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._remember(key, entry)
+        if self._store(key, entry):
+            self._evict_disk(keep=self._path(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, size=len(self._entries), max_entries=self.max_entries)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.joblib")
+
+    def _load(self, key):
+        if not self.cache_dir or not os.path.exists(self._path(key)):
+            return None
+        try:
+            entry = joblib.load(self._path(key))
+            # Mark it recently used for disk eviction
+            os.utime(self._path(key))
+            return entry
+        except Exception as e:
+            print(f"Discarding unreadable model cache entry {key}: {e}")
+            return None
+
+    def _store(self, key, entry):
+        """Write ``entry`` to the disk tier; on any failure the entry just stays memory-only.
+
+        Returns whether the entry was written.
+        """
+        if not self.cache_dir:
+            return False
+        try:
+            # Recreates the directory if it was removed while the process was running, and
+            # concurrent readers never load a partial dump
+            with atomic_write(self._path(key), 'wb') as f:
+                joblib.dump(entry, f)
+            return True
+        except Exception as e:
+            print(f"Failed to persist model cache entry {key}, keeping it in memory only: {e}")
+            return False
+
+    def _evict_disk(self, keep):
+        """Remove the least recently used files other than ``keep`` until the directory is within its limits."""
+        files = []
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for item in entries:
+                    if item.name.endswith('.joblib') and item.path != keep:
+                        stat = item.stat()
+                        files.append((stat.st_mtime, stat.st_size, item.path))
+            total = os.path.getsize(keep)
+        except OSError as e:
+            print(f"Could not scan model cache directory {self.cache_dir}: {e}")
+            return
+
+        files.sort()
+        total += sum(size for _, size, _ in files)
+        # ``keep`` counts towards the limits but is never removed
+        while files and (len(files) + 1 > self.max_disk_entries or
+                         (self.max_disk_bytes is not None and total > self.max_disk_bytes)):
+            _, size, path = files.pop(0)
+            total -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Another process evicted it first
+                continue
+            except OSError as e:
+                print(f"Could not evict model cache file {path}: {e}")
+                continue
+            with self._lock:
+                self._counters['disk_evictions'] += 1
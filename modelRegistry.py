@@ -0,0 +1,212 @@
+"""Serve the keras-tuner search in ``my_dir/time_series`` instead of retraining per call.
+
+The tuner left one ``trial_NNNN`` directory per trial with its
+hyperparameters and score (``trial.json``), the input shape it was built
+for (``build_config.json``) and, for the trials it kept, the weights
+(``checkpoint.weights.h5``). The registry indexes those trials by score,
+rebuilds the best one that fits the caller's input schema and loads its
+weights, so a prediction costs a model load instead of a training run.
+
+Which model serves a given (schema, data version) is recorded in
+``registry.json`` next to the models retrained here. The tuner did not
+record what data it saw, so its best trial is bound to the first data
+version served with its schema; a new data version warm-starts a short
+retrain from the current model, and a schema no trial was built for is
+trained from scratch with the best trial's hyperparameters.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from atomicFile import atomic_write
+from soilSnapshot import normalize_column_name
+
+MODEL_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'my_dir')
+TUNER_DIR = os.path.join(MODEL_ROOT, 'time_series')
+REGISTRY_DIR = os.path.join(MODEL_ROOT, 'registry')
+MANIFEST_FILE = 'registry.json'
+WEIGHTS_FILE = 'checkpoint.weights.h5'
+# Width of the dense layer the tuner's build function put before the output
+DENSE_UNITS = 64
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, payload):
+    """Write JSON atomically, so concurrent readers never load a half-written file."""
+    with atomic_write(path) as f:
+        json.dump(payload, f, indent=2)
+
+
+def trial_index(tuner_dir=TUNER_DIR):
+    """Completed trials that kept their weights, best score first.
+
+    Each entry has the trial id, score, hyperparameter values, the
+    ``(look_back, n_features)`` input shape and the weights path.
+    """
+    if not os.path.isdir(tuner_dir):
+        return []
+
+    trials = []
+    for name in sorted(os.listdir(tuner_dir)):
+        trial_dir = os.path.join(tuner_dir, name)
+        weights = os.path.join(trial_dir, WEIGHTS_FILE)
+        if not name.startswith('trial_') or not os.path.isfile(weights):
+            continue
+        try:
+            trial = read_json(os.path.join(trial_dir, 'trial.json'))
+            build_config = read_json(os.path.join(trial_dir, 'build_config.json'))
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable tuner trial {name}: {e}")
+            continue
+        if trial.get('status') != 'COMPLETED' or trial.get('score') is None:
+            continue
+
+        objective = trial['metrics']['metrics'].get('val_loss', {})
+        trials.append({
+            'trial_id': trial['trial_id'],
+            'score': trial['score'],
+            'direction': objective.get('direction', 'min'),
+            'hyperparameters': trial['hyperparameters']['values'],
+            'input_shape': tuple(build_config['input_shape'][1:]),
+            'weights': weights
+        })
+
+    trials.sort(key=lambda t: t['score'] if t['direction'] == 'min' else -t['score'])
+    return trials
+
+
+def build_model(hyperparameters, input_shape):
+    """The tuner's architecture: two stacked GRUs with dropout between them, then a dense head."""
+    from tensorflow.keras import Input
+    from tensorflow.keras.layers import GRU, Dense, Dropout
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.optimizers import Adam
+
+    units = int(hyperparameters['units'])
+    model = Sequential([
+        Input(shape=tuple(input_shape)),
+        GRU(units, return_sequences=True),
+        Dropout(float(hyperparameters['dropout'])),
+        GRU(units),
+        Dense(DENSE_UNITS, activation='relu'),
+        Dense(1)
+    ])
+    model.compile(optimizer=Adam(learning_rate=float(hyperparameters['lr'])), loss='mean_squared_error')
+    return model
+
+
+class ModelRegistry:
+    """Persisted models keyed by (input schema, data version).
+
+    ``model_for`` returns a ready model and only calls ``train`` when no
+    persisted model covers the schema and data version. Loaded models stay
+    in memory, so a long-lived process loads each one once.
+    """
+
+    def __init__(self, tuner_dir=TUNER_DIR, registry_dir=REGISTRY_DIR):
+        self.tuner_dir = tuner_dir
+        self.registry_dir = registry_dir
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def schema(feature_columns, target_column, look_back):
+        """Input schema; names are normalized so a CSV and its snapshot share models."""
+        return {'features': [normalize_column_name(c) for c in feature_columns],
+                'target': normalize_column_name(target_column), 'look_back': look_back}
+
+    @staticmethod
+    def key(schema, data_version=None):
+        payload = json.dumps([schema, data_version], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+    def manifest(self):
+        path = os.path.join(self.registry_dir, MANIFEST_FILE)
+        return read_json(path) if os.path.exists(path) else {'models': {}}
+
+    def best_trial(self, input_shape=None):
+        """Best-scoring trial, or the best one built for ``(look_back, n_features)``."""
+        for trial in trial_index(self.tuner_dir):
+            if input_shape is None or trial['input_shape'] == tuple(input_shape):
+                return trial
+        return None
+
+    def model_for(self, schema, data_version, train, retrain=False):
+        """Model for ``schema`` fitted on ``data_version``, training one only when none is persisted.
+
+        ``train(model, warm)`` fits ``model`` in place; ``warm`` is True
+        when it already carries weights for this schema and only needs to
+        catch up with the new data. Returns ``(model, entry)`` where entry
+        describes where the model came from.
+        """
+        key = self.key(schema, data_version)
+        with self._lock:
+            if key in self._models and not retrain:
+                return self._models[key]
+
+            entry = None if retrain else self.manifest()['models'].get(key)
+            if entry is None:
+                model, entry = self._fit(schema, data_version, train, retrain)
+            else:
+                model = self._load(entry)
+
+            self._models[key] = (model, entry)
+            return model, entry
+
+    def _load(self, entry):
+        if entry['source'] == 'tuner':
+            model = build_model(entry['hyperparameters'], entry['input_shape'])
+            model.load_weights(entry['weights'])
+            return model
+
+        from tensorflow.keras.models import load_model
+        return load_model(os.path.join(self.registry_dir, entry['path']))
+
+    def _fit(self, schema, data_version, train, retrain):
+        input_shape = (schema['look_back'], len(schema['features']))
+        manifest = self.manifest()
+        earlier = [e for e in manifest['models'].values() if e['schema_key'] == self.key(schema)]
+
+        trial = self.best_trial(input_shape)
+        if trial is not None and not earlier and not retrain:
+            # First data version seen with this schema: serve the tuner's weights as they are
+            entry = {'source': 'tuner', 'trial_id': trial['trial_id'], 'score': trial['score'],
+                     'hyperparameters': trial['hyperparameters'], 'input_shape': list(input_shape),
+                     'weights': trial['weights']}
+            model = self._load(entry)
+        else:
+            base = earlier[-1] if earlier else None
+            hyperparameters = (base or trial or self.best_trial() or {}).get('hyperparameters')
+            if hyperparameters is None:
+                raise Exception(f"No tuner trials found in '{self.tuner_dir}'")
+
+            model = build_model(hyperparameters, input_shape)
+            if base is not None:
+                model.set_weights(self._load(base).get_weights())
+            elif trial is not None:
+                model.load_weights(trial['weights'])
+            train(model, warm=base is not None or trial is not None)
+
+            path = f"{self.key(schema, data_version)}.keras"
+            os.makedirs(self.registry_dir, exist_ok=True)
+            model.save(os.path.join(self.registry_dir, path))
+            start = base or trial
+            entry = {'source': 'retrained', 'path': path, 'hyperparameters': hyperparameters,
+                     'input_shape': list(input_shape),
+                     'warm_start': start and (start.get('path') or f"trial_{start['trial_id']}")}
+
+        entry.update(schema=schema, schema_key=self.key(schema), data_version=data_version)
+        manifest['models'][self.key(schema, data_version)] = entry
+        write_json(os.path.join(self.registry_dir, MANIFEST_FILE), manifest)
+        return model, entry
+
+
+if __name__ == "__main__":
+    for trial in trial_index()[:10]:
+        print(f"trial_{trial['trial_id']}: score={trial['score']:.5f} input={trial['input_shape']} "
+              f"{trial['hyperparameters']}")
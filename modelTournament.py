@@ -0,0 +1,246 @@
+"""Train the batchPrediction candidate models side by side and rank them.
+
+Every candidate runs in its own spawned process, limited to its share of
+the CPU threads, and stops early on a validation split. Candidates stop
+training at TRAINING_SHARE of the wall-clock budget so they still have time
+to predict; any process still running when the budget is spent is
+terminated and listed as timed out.
+
+The heavy libraries (TensorFlow, XGBoost) are imported inside the
+candidate processes only.
+"""
+import multiprocessing
+import os
+import time
+import traceback
+from multiprocessing.connection import wait
+
+import numpy as np
+from sklearn.metrics import mean_absolute_error
+from threadpoolctl import threadpool_limits
+
+from slidingWindows import batch_count, create_dataset, flatten_windows, validation_split, window_batches
+
+TRAINING_SHARE = 0.8
+VALIDATION_SPLIT = 0.2
+
+
+# Safe MAPE calculation
+def safe_mape(y_true, y_pred):
+    y_true = np.where(y_true == 0, 1e-5, y_true)
+    return np.mean(np.abs((y_true - y_pred) / y_true)) * 100
+
+
+# Additional metrics
+def calculate_metrics(y_true, y_pred):
+    mae = mean_absolute_error(y_true, y_pred)
+    rmse = np.sqrt(np.mean((y_true - y_pred) ** 2))
+    return mae, rmse
+
+
+def tournament_data(scaled_features, scaled_target, scaler_Y, look_back, train, test):
+    """Everything a candidate process needs: raw scaled rows (windows are rebuilt as views there) and split bounds."""
+    return {
+        'features': np.ascontiguousarray(scaled_features, dtype=np.float32),
+        'target': np.ascontiguousarray(scaled_target, dtype=np.float32),
+        'scaler_Y': scaler_Y,
+        'look_back': look_back,
+        'train': train,
+        'test': test
+    }
+
+
+def split_windows(data):
+    X, y = create_dataset(data['features'], data['target'], data['look_back'])
+    (train_start, train_end), (test_start, test_end) = data['train'], data['test']
+    return (X[train_start:train_end], y[train_start:train_end]), (X[test_start:test_end], y[test_start:test_end])
+
+
+# Define GRU model
+def create_gru_model(input_shape):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import GRU, Dense, Dropout
+    from tensorflow.keras.optimizers import Adam
+    from tensorflow.keras.losses import Huber
+
+    model = Sequential([
+        GRU(128, return_sequences=True, input_shape=input_shape),
+        Dropout(0.3),
+        GRU(64),
+        Dense(32, activation='relu'),
+        Dense(1)
+    ])
+    model.compile(optimizer=Adam(learning_rate=0.0001), loss=Huber())
+    return model
+
+
+def fit_gru(data, threads, deadline):
+    import tensorflow as tf
+    from tensorflow.keras.callbacks import Callback, EarlyStopping, ReduceLROnPlateau
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+    class StopAtDeadline(Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            if time.monotonic() >= deadline:
+                self.model.stop_training = True
+
+    (trainX, trainY), (testX, testY) = split_windows(data)
+    (fitX, fitY), (valX, valY) = validation_split(trainX, trainY, VALIDATION_SPLIT)
+
+    model = create_gru_model((data['look_back'], trainX.shape[2]))
+    early_stopping = EarlyStopping(monitor='val_loss', patience=50, restore_best_weights=True)
+    reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-6)
+    history = model.fit(window_batches(fitX, fitY, 64, shuffle=True, repeat=True),
+                        steps_per_epoch=batch_count(len(fitX), 64),
+                        validation_data=window_batches(valX, valY, 64, repeat=True),
+                        validation_steps=batch_count(len(valX), 64),
+                        epochs=100, callbacks=[early_stopping, reduce_lr, StopAtDeadline()], verbose=0)
+    return (lambda: model.predict(testX, verbose=0)), testY, {'epochs': len(history.epoch)}
+
+
+def fit_xgboost(data, threads, deadline):
+    from xgboost import XGBRegressor
+    from xgboost.callback import TrainingCallback
+
+    class StopAtDeadline(TrainingCallback):
+        def after_iteration(self, model, epoch, evals_log):
+            return time.monotonic() >= deadline
+
+    (trainX, trainY), (testX, testY) = split_windows(data)
+    (fitX, fitY), (valX, valY) = validation_split(trainX, trainY, VALIDATION_SPLIT)
+
+    model = XGBRegressor(
+        n_estimators=5000,
+        learning_rate=1,
+        max_depth=15,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        lambda_=0.5,  # Reduced L2 regularization
+        alpha=0.1,   # Reduced L1 regularization
+        objective='reg:squarederror',
+        n_jobs=threads,
+        early_stopping_rounds=50,
+        callbacks=[StopAtDeadline()]
+    )
+    model.fit(flatten_windows(fitX), fitY.flatten(), eval_set=[(flatten_windows(valX), valY.flatten())], verbose=False)
+    testX_flat = flatten_windows(testX)
+    return (lambda: model.predict(testX_flat).reshape(-1, 1)), testY, {'trees': int(model.best_iteration) + 1}
+
+
+def fit_linear(data, threads, deadline):
+    from sklearn.linear_model import LinearRegression
+
+    # Only the current feature row, no look-back sequences (y=x relationship)
+    (_, trainY), (_, testY) = split_windows(data)
+    (train_start, train_end), (test_start, test_end) = data['train'], data['test']
+    trainX_flat = data['features'][train_start:train_end]
+    testX_flat = data['features'][test_start:test_end]
+
+    model = LinearRegression()
+    model.fit(trainX_flat, trainY.flatten())
+    return (lambda: model.predict(testX_flat).reshape(-1, 1)), testY, {}
+
+
+CANDIDATES = {
+    'GRU': fit_gru,
+    'XGBoost': fit_xgboost,
+    'Linear Regression': fit_linear
+}
+
+
+def _run_candidate(name, data, threads, training_budget, conn):
+    """Candidate process: fit under a thread limit, time the fit and the test-set prediction, send the result."""
+    try:
+        deadline = time.monotonic() + training_budget
+        with threadpool_limits(threads):
+            start = time.perf_counter()
+            predict, testY, details = CANDIDATES[name](data, threads, deadline)
+            fit_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            predictions_scaled = predict()
+            predict_seconds = time.perf_counter() - start
+
+        scaler_Y = data['scaler_Y']
+        predictions = scaler_Y.inverse_transform(np.asarray(predictions_scaled).reshape(-1, 1))
+        actual = scaler_Y.inverse_transform(testY)
+        mae, rmse = calculate_metrics(actual, predictions)
+        conn.send({
+            'model': name,
+            'status': 'ok',
+            'accuracy': float(100 - safe_mape(actual, predictions)),
+            'mae': float(mae),
+            'rmse': float(rmse),
+            'fit_seconds': fit_seconds,
+            'predict_ms': predict_seconds * 1000,
+            'predict_ms_per_sample': predict_seconds * 1000 / max(1, len(predictions)),
+            'threads': threads,
+            'details': details,
+            'predictions': predictions.ravel()
+        })
+    except Exception as e:
+        conn.send({'model': name, 'status': 'error', 'error': f"{e}\n{traceback.format_exc()}", 'threads': threads})
+    finally:
+        conn.close()
+
+
+def run_tournament(data, candidates=tuple(CANDIDATES), budget=300.0, threads=None):
+    """Train ``candidates`` concurrently within ``budget`` seconds and return the leaderboard.
+
+    ``threads`` is the CPU-thread budget per candidate, by default an even
+    share of the machine.
+    """
+    threads = threads or max(1, (os.cpu_count() or 1) // len(candidates))
+    context = multiprocessing.get_context('spawn')
+    deadline = time.monotonic() + budget
+
+    running = {}
+    for name in candidates:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_run_candidate, args=(name, data, threads, budget * TRAINING_SHARE, sender),
+                                  name=f"tournament-{name}", daemon=True)
+        process.start()
+        sender.close()
+        running[receiver] = (name, process)
+
+    results = []
+    while running:
+        remaining = deadline - time.monotonic()
+        ready = wait(list(running), timeout=remaining) if remaining > 0 else []
+        if not ready:
+            break
+        for conn in ready:
+            name, process = running.pop(conn)
+            try:
+                results.append(conn.recv())
+            except EOFError:
+                results.append({'model': name, 'status': 'error', 'threads': threads,
+                                'error': f"process exited with code {process.exitcode}"})
+            process.join()
+
+    # Whatever is still running has used up the budget
+    for name, process in running.values():
+        process.terminate()
+        process.join()
+        results.append({'model': name, 'status': 'timeout', 'threads': threads,
+                        'error': f"did not finish within {budget:g}s"})
+
+    return leaderboard(results)
+
+
+def leaderboard(results):
+    """Finished candidates by accuracy (best first), followed by the ones that failed or timed out."""
+    finished = sorted((r for r in results if r['status'] == 'ok'), key=lambda r: r['accuracy'], reverse=True)
+    return finished + [r for r in results if r['status'] != 'ok']
+
+
+def print_leaderboard(board):
+    print(f"{'Model':<20}{'Accuracy':>10}{'MAE':>10}{'RMSE':>10}{'Fit s':>9}{'Predict ms':>12}{'Threads':>9}")
+    for r in board:
+        if r['status'] != 'ok':
+            print(f"{r['model']:<20}{r['status']:>10}  {r['error'].splitlines()[0]}")
+            continue
+        print(f"{r['model']:<20}{r['accuracy']:>9.2f}%{r['mae']:>10.4f}{r['rmse']:>10.4f}"
+              f"{r['fit_seconds']:>9.2f}{r['predict_ms']:>12.2f}{r['threads']:>9}")
@@ -1,83 +1,103 @@
+import os
 import sys
-import numpy as np
-import pandas as pd
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import SimpleRNN, Dense
-from tensorflow.keras.optimizers import Adam
-from sklearn.preprocessing import MinMaxScaler
-
-def main(file_path):
+from inferenceWorker import call_worker
+
+# Epochs for a model trained from scratch, and for one warm-started from persisted weights
+EPOCHS = 50
+WARM_EPOCHS = 10
+
+_registry = None
+
+def predict(file_path, retrain=False):
+    """Predict the next pH value; returns the last 30 actual values, the prediction and the actual value."""
+    # Heavy imports stay in here so the CLI can hand the request to a warm worker without paying for them
+    global _registry
+    import pandas as pd
+    from sklearn.preprocessing import MinMaxScaler
+    from modelRegistry import ModelRegistry
+    from soilSnapshot import dataset_version, read_dataset
+    from slidingWindows import batch_count, create_dataset, window_batches
+
+    if _registry is None:
+        _registry = ModelRegistry()
+
+    # Load the data from the CSV file or its typed snapshot directory
+    df = read_dataset(file_path)
+
+    # Define features and target; the window carries past pH too, as in the tuned models' 16-column input
+    features = df.drop(columns=['ID'])
+    target = df[['pH']]
+
+    # Convert string values to float
+    for col in features.columns:
+        features[col] = pd.to_numeric(features[col], errors='coerce')
+    target['pH'] = pd.to_numeric(target['pH'], errors='coerce')
+
+    # Fill any missing values
+    features = features.fillna(features.mean())
+    target = target.fillna(target.mean())
+
+    # Scale features and target separately
+    scaler_X = MinMaxScaler()
+    scaler_Y = MinMaxScaler()
+
+    scaled_features = scaler_X.fit_transform(features)
+    scaled_target = scaler_Y.fit_transform(target)
+
+    # Create sequences
+    look_back = 30
+    X, y = create_dataset(scaled_features, scaled_target, look_back)
+
+    # Split data
+    trainX, trainY = X[:-1], y[:-1]
+    testX, testY = X[-1:], y[-1:]
+
+    # Load the persisted model for this schema and data version; train only if there is none
+    def train(model, warm):
+        model.fit(window_batches(trainX, trainY, 16, shuffle=True, repeat=True),
+                  steps_per_epoch=batch_count(len(trainX), 16), epochs=WARM_EPOCHS if warm else EPOCHS,
+                  verbose=0)
+
+    schema = _registry.schema(features.columns, 'pH', look_back)
+    model, _ = _registry.model_for(schema, dataset_version(file_path), train, retrain=retrain)
+
+    # Make prediction
+    predictions = model.predict(testX, verbose=0)
+
+    # Transform back to original scale
+    predicted_value = scaler_Y.inverse_transform(predictions)
+    actual_value = scaler_Y.inverse_transform(testY)
+    actual_sequence = scaler_Y.inverse_transform(y[-30:])
+
+    return {
+        'sequence': [float(v) for v in actual_sequence.flatten()],
+        'predicted': float(predicted_value.flatten()[0]),
+        'actual': float(actual_value.flatten()[0])
+    }
+
+def main(file_path, retrain=False):
     try:
-        # Load the data from the CSV file
-        df = pd.read_csv(file_path)
-
-        # Define features and target
-        features = df.drop(columns=['ID', 'pH'])
-        target = df[['pH']]
-
-        # Convert string values to float
-        for col in features.columns:
-            features[col] = pd.to_numeric(features[col], errors='coerce')
-        target['pH'] = pd.to_numeric(target['pH'], errors='coerce')
-
-        # Fill any missing values
-        features = features.fillna(features.mean())
-        target = target.fillna(target.mean())
-
-        # Scale features and target separately
-        scaler_X = MinMaxScaler()
-        scaler_Y = MinMaxScaler()
-
-        scaled_features = scaler_X.fit_transform(features)
-        scaled_target = scaler_Y.fit_transform(target)
-
-        # Create sequences
-        def create_dataset(features, target, look_back=30):
-            dataX, dataY = [], []
-            for i in range(len(features) - look_back):
-                dataX.append(features[i:(i + look_back)])
-                dataY.append(target[i + look_back])
-            return np.array(dataX), np.array(dataY)
-
-        look_back = 30
-        X, y = create_dataset(scaled_features, scaled_target, look_back)
-
-        # Split data
-        trainX, trainY = X[:-1], y[:-1]
-        testX, testY = X[-1:], y[-1:]
-
-        # Define and train model
-        model = Sequential()
-        model.add(SimpleRNN(50, input_shape=(look_back, trainX.shape[2])))
-        model.add(Dense(1))
-        model.compile(optimizer=Adam(learning_rate=0.001), loss='mean_squared_error')
-        model.fit(trainX, trainY, epochs=50, batch_size=16, verbose=0)
-
-        # Make prediction
-        predictions = model.predict(testX)
-
-        # Transform back to original scale
-        predicted_value = scaler_Y.inverse_transform(predictions)
-        actual_value = scaler_Y.inverse_transform(testY)
-        actual_sequence = scaler_Y.inverse_transform(y[-30:])
+        # Hand the request to a warm worker when INFERENCE_SOCKET points at one, else run it here
+        result = call_worker('newAI1', {'file_path': os.path.abspath(file_path), 'retrain': retrain},
+                             lambda: predict(file_path, retrain=retrain))
 
         # Print sequence data
-        for value in actual_sequence.flatten():
+        for value in result['sequence']:
             print(f"{value:.2f}")
-        
+
         # Print prediction and actual value
-        print(f"Predicted value: {predicted_value.flatten()[0]:.2f}")
-        print(f"Actual value: {actual_value.flatten()[0]:.2f}")
+        print(f"Predicted value: {result['predicted']:.2f}")
+        print(f"Actual value: {result['actual']:.2f}")
 
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
         sys.exit(1)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    args = [arg for arg in sys.argv[1:] if arg != '--retrain']
+    if len(args) != 1:
         print("Error: Invalid number of arguments", file=sys.stderr)
-        print("Usage: python newAI1.py <file_path>", file=sys.stderr)
+        print("Usage: python newAI1.py <csv_path | snapshot_dir> [--retrain]", file=sys.stderr)
         sys.exit(1)
-    
-    main(sys.argv[1])
 
+    main(args[0], retrain='--retrain' in sys.argv[1:])
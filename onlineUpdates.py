@@ -0,0 +1,240 @@
+"""Incremental state for rows appended to an already processed dataset.
+
+Everything here is updated in O(new rows): running column statistics,
+the rolling-window features, peak statistics and the fitted forest, which
+grows by a few warm-started trees instead of being refitted.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks
+
+PEAK_DISTANCE = 20
+WINDOW = 5
+# Trees added per append, fitted on the most recent rows only
+WARM_START_TREES = 10
+WARM_START_WINDOW = 256
+# Oldest warm-started trees are dropped beyond this, so the forest (and predict time) stays bounded
+MAX_WARM_START_TREES = 100
+
+
+def clean_values(values):
+    """Numeric, forward/back-filled copy of a column, as prepare_column() cleans it."""
+    return pd.to_numeric(pd.Series(values), errors='coerce').ffill().bfill().to_numpy(dtype=float)
+
+
+class RunningStats:
+    """Count / mean / sum of squared deviations, merged batch by batch (Chan et al.)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @classmethod
+    def from_values(cls, values):
+        stats = cls()
+        stats.extend(values)
+        return stats
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        delta = batch_mean - self.mean
+        total = self.count + len(values)
+        self.mean += delta * len(values) / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * len(values) / total
+        self.count = total
+
+    def mean_std(self):
+        """(mean, population std) with a zero std replaced by 1, like sustainabilityScores.column_stats()."""
+        std = float(np.sqrt(self.m2 / self.count)) if self.count else 0.0
+        return float(self.mean), std if std != 0 else 1.0
+
+
+class RollingFeatures:
+    """diff / rolling mean / rolling std of a series, extended from its last ``window - 1`` values."""
+
+    def __init__(self, tail, window=WINDOW):
+        self.window = window
+        self.tail = np.asarray(tail, dtype=float)[-(window - 1):]
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=float)
+        series = np.concatenate([self.tail, values])
+        offset = len(self.tail)
+
+        diff = np.diff(series)[offset - 1:]
+        windows = pd.Series(series).rolling(window=self.window, min_periods=1)
+        mean = windows.mean().to_numpy()[offset:]
+        std = windows.std().to_numpy()[offset:]
+
+        self.tail = series[-(self.window - 1):]
+        return np.column_stack([diff, mean, std])
+
+
+class PeakStats:
+    """Peak count, height sum and first/last peak position of a series, as analyze_peaks() measures them.
+
+    The average spacing of the peaks telescopes to (last - first) / (count - 1),
+    so new peaks can be folded in without the earlier positions. Peaks in
+    appended rows are found against the running mean at append time, so the
+    result can differ slightly from a full analyze_peaks() over the history.
+    """
+
+    def __init__(self, values, distance=PEAK_DISTANCE):
+        self.distance = distance
+        values = np.asarray(values, dtype=float)
+        peaks, _ = find_peaks(values, height=np.nanmean(values), distance=distance)
+        self.count = len(peaks)
+        self.height_sum = float(values[peaks].sum())
+        self.first = int(peaks[0]) if len(peaks) else None
+        self.last = int(peaks[-1]) if len(peaks) else None
+        self.length = len(values)
+        self.tail = values[-(distance + 1):]
+
+    def extend(self, values, threshold):
+        values = np.asarray(values, dtype=float)
+        series = np.concatenate([self.tail, values])
+        start = self.length - len(self.tail)
+        peaks, _ = find_peaks(series, height=threshold, distance=self.distance)
+
+        for index in peaks + start:
+            # The last old row could not be a peak before it had a right neighbour
+            if index < self.length - 1 or (self.last is not None and index - self.last < self.distance):
+                continue
+            self.count += 1
+            self.height_sum += float(series[index - start])
+            self.first = int(index) if self.first is None else self.first
+            self.last = int(index)
+
+        self.length += len(values)
+        self.tail = series[-(self.distance + 1):]
+
+    def averages(self, fallback_height):
+        """(average peak height, average peak distance) with analyze_peaks()'s fallbacks."""
+        if self.count == 0:
+            return float(fallback_height), self.distance
+        distance = (self.last - self.first) / (self.count - 1) if self.count > 1 else self.distance
+        return self.height_sum / self.count, float(distance)
+
+
+class ColumnState:
+    """Running statistics and peaks of one cleaned column, plus the rows appended to it."""
+
+    def __init__(self, values):
+        values = clean_values(values)
+        self.stats = RunningStats.from_values(values)
+        self.peaks = PeakStats(np.nan_to_num(values, nan=np.nanmean(values) if len(values) else 0.0))
+        self.last_value = values[-1] if len(values) else np.nan
+        self._appended = []
+
+    def extend(self, raw):
+        """Clean and absorb new raw values; returns the cleaned values."""
+        series = pd.to_numeric(pd.Series(np.r_[self.last_value, np.asarray(raw, dtype=float)]), errors='coerce')
+        values = series.ffill().to_numpy(dtype=float)[1:]
+        self.stats.extend(values)
+        self.peaks.extend(values, threshold=self.stats.mean)
+        self.last_value = values[-1]
+        self._appended.append(values)
+        return values
+
+    def appended_values(self):
+        return np.concatenate(self._appended) if self._appended else np.empty(0)
+
+    def peak_averages(self):
+        return self.peaks.averages(fallback_height=self.stats.mean)
+
+
+class TargetModel:
+    """A fitted target model that keeps learning from appended rows.
+
+    Each append scales the new rows with the original scalers, adds
+    WARM_START_TREES trees fitted on the last WARM_START_WINDOW rows and
+    predicts only the new rows. Works on a private copy of the forest, so
+    the entry in the model cache is left untouched.
+    """
+
+    def __init__(self, values, features, fitted):
+        values = np.asarray(values, dtype=float)
+        features = np.asarray(features, dtype=float)
+        self.fitted = dict(fitted, model=copy.deepcopy(fitted['model']))
+        self.base_trees = len(self.fitted['model'].estimators_)
+        self.rolling = RollingFeatures(values)
+        self.feature_stats = [RunningStats.from_values(features[:, i]) for i in range(features.shape[1])]
+        self.feature_peaks = [PeakStats(features[:, i]) for i in range(features.shape[1])]
+        self.last_value = values[-1]
+
+        self._recent_features = self.fitted['scaler_features'].transform(features[-WARM_START_WINDOW:])
+        self._recent_target = self.fitted['scaler_target'].transform(values[-WARM_START_WINDOW:].reshape(-1, 1)).ravel()
+        self._predictions = [np.asarray(fitted['predictions'], dtype=float)]
+
+    @property
+    def predictions(self):
+        if len(self._predictions) > 1:
+            self._predictions = [np.concatenate(self._predictions)]
+        return self._predictions[0]
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        features = self.rolling.extend(values)
+        for i, (stats, peaks) in enumerate(zip(self.feature_stats, self.feature_peaks)):
+            stats.extend(features[:, i])
+            peaks.extend(features[:, i], threshold=stats.mean)
+
+        features_scaled = self.fitted['scaler_features'].transform(features)
+        target_scaled = self.fitted['scaler_target'].transform(values.reshape(-1, 1)).ravel()
+        self._recent_features = np.concatenate([self._recent_features, features_scaled])[-WARM_START_WINDOW:]
+        self._recent_target = np.concatenate([self._recent_target, target_scaled])[-WARM_START_WINDOW:]
+
+        model = self.fitted['model']
+        if len(model.estimators_) + WARM_START_TREES > self.base_trees + MAX_WARM_START_TREES:
+            del model.estimators_[self.base_trees:self.base_trees + WARM_START_TREES]
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + WARM_START_TREES)
+        model.fit(self._recent_features, self._recent_target)
+
+        predictions_scaled = model.predict(features_scaled)
+        self._predictions.append(self.fitted['scaler_target'].inverse_transform(predictions_scaled.reshape(-1, 1)).ravel())
+        self.last_value = values[-1]
+
+    def feature_peak_averages(self, index):
+        return self.feature_peaks[index].averages(fallback_height=self.feature_stats[index].mean)
+
+    def fitted_view(self):
+        """The fitted dict predict_future() expects, with predictions over base and appended rows."""
+        return dict(self.fitted, predictions=self.predictions)
+
+
+class OnlineDataset:
+    """Incremental state of one base dataset version and the rows appended to it in this process."""
+
+    def __init__(self, base_version, base_frame, columns):
+        self.base_version = base_version
+        self.base_frame = base_frame
+        self.columns = {column: ColumnState(base_frame[column].to_numpy()) for column in columns}
+        self.targets = {}
+        self.appended_rows = 0
+
+    def extend(self, appended):
+        """Catch up on ``appended`` (all rows appended so far); only the unseen tail is processed."""
+        new_rows = appended.iloc[self.appended_rows:]
+        if len(new_rows) == 0:
+            return
+        for column, state in self.columns.items():
+            values = state.extend(new_rows[column].to_numpy(dtype=float))
+            if column in self.targets:
+                self.targets[column].extend(values)
+        self.appended_rows = len(appended)
+
+    def add_target(self, column, target):
+        """Register a TargetModel built on the base rows and bring it up to date with the appended ones."""
+        target.extend(self.columns[column].appended_values())
+        self.targets[column] = target
+        return target
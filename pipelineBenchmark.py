@@ -0,0 +1,247 @@
+"""Per-stage benchmark of the process_data pipeline on synthetic soil datasets.
+
+Each scale tiles ``SOIL DATA GR.csv`` (781 rows) ``scale`` times with a
+little multiplicative noise, then times every stage handle_process_data
+goes through:
+
+    load_cold       DatasetCache over an in-memory source: parse + snapshot
+    load_warm       DatasetCache hit (what most requests see)
+    features        prepare_column()
+    analyze_peaks   analyze_peaks() on the target column
+    forest_fit      fit_target_model(): scalers, forest fit, in-sample predict
+    forest_predict  predict_future() over FUTURE_ENTRIES synthetic steps
+    synthetic_peaks synthetic futures for every other pipeline column
+    scores          calculate_sustainability_scores()
+    chart_json      new_plot payload as points, JSON-encoded
+    chart_float32   new_plot payload as one float32 buffer
+
+Results are compared with a stored baseline; a stage slower than the
+baseline by more than ``--threshold`` (and by more than ``--min-delta``
+seconds, to ignore timer noise) is a regression and the run exits 1.
+
+    python pipelineBenchmark.py                    # compare with the baseline
+    python pipelineBenchmark.py --save-baseline    # record a new baseline
+    python pipelineBenchmark.py --scales 1,10 --stages features,scores
+
+The stored baseline has no forest stages at 1000x: fitting 781k rows takes
+minutes and several GB, so those stages show up without a baseline there.
+It was recorded on the stack the Dockerfile builds (Python 3.9 and the
+versions pinned in requirements.txt), which is stored with it; a run on a
+different Python or library version is warned about, since its timings are
+not comparable.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from chartPayload import plot_payload
+from datasetCache import DatasetCache
+from datasetSource import InMemoryDatasetSource
+from mineralWeights import StubWeightsProvider
+from processPipeline import (FEATURE_COLUMNS, FUTURE_ENTRIES, analyze_peaks, calculate_sustainability_scores,
+                             fit_target_model, pipeline_columns, predict_future, prepare_column)
+from syntheticPeaks import synthetic_peaks_batch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE_CSV = os.path.join(HERE, 'SOIL DATA GR.csv')
+BASELINE_PATH = os.path.join(HERE, 'benchmarks', 'pipeline_baseline.json')
+SCALES = (1, 10, 100, 1000)
+TARGET_COLUMN = 'pH'
+STAGES = ('load_cold', 'load_warm', 'features', 'analyze_peaks', 'forest_fit', 'forest_predict',
+          'synthetic_peaks', 'scores', 'chart_json', 'chart_float32')
+
+
+def synthetic_csv(scale, seed=0):
+    """The soil CSV tiled ``scale`` times, each copy jittered by up to 5%, as CSV bytes."""
+    base = pd.read_csv(SOURCE_CSV)
+    rng = np.random.default_rng(seed)
+    values = base.drop(columns=['ID']).apply(pd.to_numeric, errors='coerce').to_numpy()
+    tiled = np.tile(values, (scale, 1))
+    tiled *= rng.uniform(0.95, 1.05, size=tiled.shape)
+    frame = pd.DataFrame(tiled, columns=[col for col in base.columns if col != 'ID'])
+    frame.insert(0, 'ID', np.arange(1, len(frame) + 1))
+    return frame.to_csv(index=False, float_format='%.4f').encode('utf-8')
+
+
+def timed(run, setup=None, repeats=3):
+    """Median seconds of ``run(setup())`` over ``repeats`` runs; setup is not timed."""
+    times = []
+    for _ in range(repeats):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_scale(scale, stages, repeats):
+    """Seconds per stage for one dataset scale."""
+    data = synthetic_csv(scale)
+    # Expensive stages run fewer times on the big datasets
+    heavy_repeats = max(1, repeats if scale < 100 else 1)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as snapshot_root:
+        counter = iter(range(1_000_000))
+
+        def cold_cache(_=None):
+            return DatasetCache(InMemoryDatasetSource(data), snapshot_root=os.path.join(snapshot_root, str(next(counter))))
+
+        if 'load_cold' in stages:
+            results['load_cold'] = timed(lambda cache: cache.get(), cold_cache, heavy_repeats)
+        cache = cold_cache()
+        df = cache.get()
+        if 'load_warm' in stages:
+            results['load_warm'] = timed(lambda _: cache.get(), repeats=repeats)
+
+        if 'features' in stages:
+            results['features'] = timed(lambda frame: prepare_column(frame, TARGET_COLUMN),
+                                        lambda: df.copy(), repeats)
+        frame = df.copy()
+        prepare_column(frame, TARGET_COLUMN)
+        target = frame[TARGET_COLUMN].to_numpy()
+
+        if 'analyze_peaks' in stages:
+            results['analyze_peaks'] = timed(lambda _: analyze_peaks(target), repeats=repeats)
+        height, distance = analyze_peaks(target)
+
+        features = frame[FEATURE_COLUMNS].to_numpy()
+        fitted = None
+        if 'forest_fit' in stages:
+            fits = []
+            results['forest_fit'] = timed(lambda _: fits.append(fit_target_model(features, target.reshape(-1, 1))),
+                                          repeats=heavy_repeats)
+            fitted = fits[-1]
+        if 'forest_predict' in stages:
+            fitted = fitted or fit_target_model(features, target.reshape(-1, 1))
+            synthetic = synthetic_peaks_batch(FUTURE_ENTRIES, [height], [distance], seed=0)[0, 0]
+            results['forest_predict'] = timed(lambda _: predict_future(fitted, synthetic, target[-1]), repeats=repeats)
+
+        columns = pipeline_columns(df.columns)
+        others = [col for col in columns if col != TARGET_COLUMN]
+        peaks = [analyze_peaks(frame[col].to_numpy()) for col in others]
+        heights, distances = zip(*peaks)
+        if 'synthetic_peaks' in stages:
+            results['synthetic_peaks'] = timed(lambda _: synthetic_peaks_batch(FUTURE_ENTRIES, heights, distances),
+                                               repeats=repeats)
+
+        future = synthetic_peaks_batch(FUTURE_ENTRIES, [height] + list(heights), [distance] + list(distances))[0]
+        all_predictions = dict(zip([TARGET_COLUMN] + others, future))
+        weights = json.loads(StubWeightsProvider().fetch(columns))
+        if 'scores' in stages:
+            results['scores'] = timed(lambda _: calculate_sustainability_scores(all_predictions, frame, weights),
+                                      repeats=repeats)
+
+        predictions = fitted['predictions'] if fitted else target
+        if 'chart_json' in stages:
+            results['chart_json'] = timed(
+                lambda _: json.dumps(plot_payload(TARGET_COLUMN, target, predictions, future[0], fmt='json')),
+                repeats=repeats)
+        if 'chart_float32' in stages:
+            results['chart_float32'] = timed(
+                lambda _: plot_payload(TARGET_COLUMN, target, predictions, future[0], fmt='float32'),
+                repeats=repeats)
+
+    return results
+
+
+# Versions a baseline is only comparable under
+STACK_KEYS = ('python', 'numpy', 'pandas', 'scikit-learn', 'scipy')
+
+
+def machine_info():
+    import scipy
+    import sklearn
+
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'scikit-learn': sklearn.__version__,
+            'scipy': scipy.__version__}
+
+
+def stack_mismatches(recorded, current):
+    """``key: recorded -> current`` for every stack version that differs (Python by major.minor)."""
+    def version(info, key):
+        value = info.get(key)
+        return '.'.join(value.split('.')[:2]) if key == 'python' and value else value
+
+    return [f"{key}: {recorded.get(key)} -> {current.get(key)}" for key in STACK_KEYS
+            if version(recorded, key) != version(current, key)]
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Print every stage next to its baseline and return the regressions."""
+    regressions = []
+    print(f"{'scale':>6} {'stage':<16} {'seconds':>10} {'baseline':>10} {'ratio':>7}")
+    for scale, stages in results.items():
+        for stage, seconds in stages.items():
+            before = baseline.get(scale, {}).get(stage)
+            ratio = seconds / before if before else None
+            flag = ''
+            if before is not None and seconds > before * (1 + threshold) and seconds - before > min_delta:
+                regressions.append(f"{stage} at {scale}: {seconds:.4f}s vs baseline {before:.4f}s")
+                flag = '  REGRESSION'
+            before_text = f"{before:10.4f}" if before is not None else f"{'-':>10}"
+            ratio_text = f"{ratio:6.2f}x" if ratio is not None else f"{'-':>7}"
+            print(f"{scale:>6} {stage:<16} {seconds:10.4f} {before_text} {ratio_text}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the process_data stages at several dataset sizes.")
+    parser.add_argument('--scales', default=','.join(map(str, SCALES)),
+                        help="comma-separated multiples of the 781-row dataset")
+    parser.add_argument('--stages', default=','.join(STAGES), help="comma-separated stages to run")
+    parser.add_argument('--repeats', type=int, default=3, help="runs per stage (1 for slow stages at 100x and up)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=float(os.getenv('BENCHMARK_THRESHOLD', 0.25)),
+                        help="allowed slowdown over the baseline, as a fraction")
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help="slowdowns below this many seconds are never regressions")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    stages = [stage.strip() for stage in args.stages.split(',')]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        sys.exit(f"Unknown stages: {', '.join(unknown)}")
+
+    results = {}
+    for scale in map(int, args.scales.split(',')):
+        print(f"Running {scale}x ({781 * scale} rows)...", file=sys.stderr, flush=True)
+        results[f"{scale}x"] = bench_scale(scale, stages, args.repeats)
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+    mismatches = stack_mismatches(stored.get('machine', {}), machine_info()) if stored else []
+    if mismatches and not args.save_baseline:
+        print(f"WARNING: baseline was recorded on a different stack ({'; '.join(mismatches)}); "
+              f"timings are not comparable", file=sys.stderr)
+    regressions = compare(results, stored.get('results', {}), args.threshold, args.min_delta)
+
+    if args.save_baseline:
+        # Results from another stack are replaced rather than mixed in
+        merged = {} if mismatches else stored.get('results', {})
+        for scale, stage_results in results.items():
+            merged.setdefault(scale, {}).update(stage_results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': machine_info(), 'results': merged}, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        for regression in regressions:
+            print(f"FAIL: {regression}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,539 @@
+"""CPU-bound part of process_data.
+
+Nothing in here touches Socket.IO, Flask or the network, so it can run in
+the job executor's worker processes as well as inline in the web process.
+"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import MinMaxScaler
+
+from chartPayload import plot_format, plot_payload
+from datasetCache import split_version
+from modelCache import ModelCache
+from onlineUpdates import OnlineDataset, TargetModel
+from soilSnapshot import load_snapshot, read_appended
+from stageTimings import Timings
+from sustainabilityScores import POINTS_PER_SCORE, HistoricalStats, column_stats, score_table, score_windows
+from syntheticPeaks import synthetic_peaks_batch
+
+FEATURE_COLUMNS = ['P_diff', 'P_rolling_mean', 'P_rolling_std']
+FUTURE_ENTRIES = 100
+
+# Anything that changes how the model is fitted must change this, so old cache entries stop matching
+MODEL_CONFIG = {
+    'features': ['diff', 'rolling_mean_5', 'rolling_std_5'],
+    'scaler': 'MinMaxScaler',
+    'model': 'RandomForestRegressor',
+    'n_estimators': 100,
+    'random_state': 42
+}
+
+# Per-process state, set up by init_worker()
+model_cache = None
+historical_stats = HistoricalStats()
+_frames = {}
+# Snapshot directory -> rows appended to it that this process has read so far
+_appended = {}
+# Base dataset version -> OnlineDataset for versions with appended rows
+_online = OrderedDict()
+ONLINE_DATASETS = 2
+
+
+def init_worker(model_cache_size=32, model_cache_dir=None, model_cache_disk_entries=256):
+    """Initialize a worker process: copy-on-write pandas and its own model cache."""
+    global model_cache
+    pd.set_option('mode.copy_on_write', True)
+    model_cache = ModelCache(max_entries=model_cache_size, cache_dir=model_cache_dir,
+                             max_disk_entries=model_cache_disk_entries)
+
+
+def dataset_ref(df, version, snapshot_dir=None):
+    """Describe the dataset for a job: the snapshot path when there is one, else the frame itself.
+
+    Only the number of appended rows (see DatasetCache.append) is sent; a
+    worker reads the rows themselves next to the snapshot, and only those
+    appended since it last looked, or takes them off the end of the frame.
+    """
+    base_version, appended_rows = split_version(version)
+    if snapshot_dir:
+        ref = {'version': version, 'snapshot_dir': snapshot_dir}
+    else:
+        ref = {'version': version, 'frame': df}
+    if appended_rows:
+        ref['base_version'] = base_version
+        ref['appended_rows'] = appended_rows
+    return ref
+
+
+def _base_frame(ref):
+    if 'frame' in ref:
+        frame = ref['frame']
+        return frame.iloc[:len(frame) - ref.get('appended_rows', 0)]
+
+    frame = _frames.get(ref['snapshot_dir'])
+    if frame is None:
+        frame = load_snapshot(ref['snapshot_dir'])
+        _frames.clear()
+        _frames[ref['snapshot_dir']] = frame
+    return frame
+
+
+def _appended_frame(ref):
+    """The rows appended on top of the job's source version, reading only appends this process has not seen."""
+    rows = ref['appended_rows']
+    if 'frame' in ref:
+        return ref['frame'].iloc[len(ref['frame']) - rows:]
+
+    seen = _appended.get(ref['snapshot_dir'])
+    if seen is None or len(seen) < rows:
+        start = 0 if seen is None else len(seen)
+        frames = read_appended(ref['snapshot_dir'], start)
+        seen = pd.concat(([] if seen is None else [seen]) + frames, ignore_index=True)
+        _appended.clear()
+        _appended[ref['snapshot_dir']] = seen
+    return seen.iloc[:rows]
+
+
+def load_dataset_ref(ref):
+    """Return a private view of the dataset a job refers to, mapping each snapshot once per process."""
+    if 'frame' in ref:
+        return ref['frame'].copy(deep=False)
+    frame = _base_frame(ref)
+    if 'appended_rows' in ref:
+        return pd.concat([frame, _appended_frame(ref)], ignore_index=True)
+    return frame.copy(deep=False)
+
+
+def online_dataset(ref):
+    """Incremental state for a dataset with appended rows, or None for a plain source version.
+
+    Each process builds the state once per base version and afterwards
+    only processes the rows appended since it last saw the dataset.
+    """
+    if 'appended_rows' not in ref:
+        return None
+
+    online = _online.get(ref['base_version'])
+    if online is None or online.appended_rows > ref['appended_rows']:
+        base = _base_frame(ref)
+        online = OnlineDataset(ref['base_version'], base, [col for col in base.columns if col != 'ID'])
+        _online[ref['base_version']] = online
+        while len(_online) > ONLINE_DATASETS:
+            _online.popitem(last=False)
+    _online.move_to_end(ref['base_version'])
+    online.extend(_appended_frame(ref))
+    return online
+
+
+def online_target(online, column):
+    """The warm-started model for ``column``, built from the base version's model the first time."""
+    target = online.targets.get(column)
+    if target is None:
+        base = online.base_frame.copy(deep=False)
+        prepare_column(base, column)
+        fitted = fitted_model(base, online.base_version, column)
+        target = online.add_target(column, TargetModel(base[column].values, base[FEATURE_COLUMNS].values, fitted))
+    return target
+
+
+def pipeline_columns(columns):
+    """Columns the sustainability score is computed over, including the engineered features."""
+    mineral_columns = [col for col in columns if col != 'ID']
+    return mineral_columns + [col for col in FEATURE_COLUMNS if col not in mineral_columns]
+
+
+def custom_percent_accuracy(y_true, y_pred):
+    y_true, y_pred = np.array(y_true), np.array(y_pred)
+    max_val = np.max(y_true)
+    return 100 * (1 - np.mean(np.abs(y_true - y_pred) / max_val))
+
+
+def analyze_peaks(data):
+    """Analyze peak characteristics of the time series."""
+    clean_data = np.nan_to_num(data, nan=np.nanmean(data))
+    peaks, _ = find_peaks(clean_data, height=np.nanmean(clean_data), distance=20)
+    if len(peaks) == 0:
+        return np.nanmean(clean_data), 20
+    peak_heights = clean_data[peaks]
+    avg_peak_height = np.nanmean(peak_heights)
+    avg_peak_distance = np.nanmean(np.diff(peaks)) if len(peaks) > 1 else 20
+    return float(avg_peak_height), float(avg_peak_distance)
+
+
+def generate_synthetic_peaks(length, avg_height, avg_distance, noise_level=0.2, seed=None):
+    """Generate synthetic peaks with similar characteristics to the original data."""
+    return synthetic_peaks_batch(length, [avg_height], [avg_distance], noise_level=noise_level, seed=seed)[0, 0]
+
+
+def rolling_features(series, last_value, window=5):
+    """diff / rolling mean / rolling std features for a batch of series, shape (draws, steps, 3).
+
+    Matches the pandas rolling(window, min_periods=1) features used for
+    training, computed with cumulative sums over the last axis so a whole
+    ensemble is handled at once.
+    """
+    series = np.atleast_2d(series)
+    steps = series.shape[-1]
+
+    diff = np.diff(series, axis=-1, prepend=np.full(series.shape[:-1] + (1,), float(last_value)))
+
+    padded = np.concatenate([np.zeros(series.shape[:-1] + (1,)), series], axis=-1)
+    sums = np.cumsum(padded, axis=-1)
+    squares = np.cumsum(padded ** 2, axis=-1)
+    ends = np.arange(1, steps + 1)
+    starts = np.maximum(0, ends - window)
+    counts = (ends - starts).astype(float)
+
+    window_sum = sums[..., ends] - sums[..., starts]
+    window_squares = squares[..., ends] - squares[..., starts]
+    mean = window_sum / counts
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (window_squares - window_sum ** 2 / counts) / (counts - 1)
+    std = np.sqrt(np.clip(variance, 0, None))
+
+    return np.nan_to_num(np.stack([diff, mean, std], axis=-1), nan=0)
+
+
+def predict_future(fitted, synthetic, last_value):
+    """Run the fitted model over one or many synthetic series; returns shape (draws, steps)."""
+    features = rolling_features(synthetic, last_value)
+    draws, steps = features.shape[:2]
+    features_scaled = fitted['scaler_features'].transform(features.reshape(-1, 3))
+    predictions_scaled = fitted['model'].predict(features_scaled)
+    return fitted['scaler_target'].inverse_transform(predictions_scaled.reshape(-1, 1)).reshape(draws, steps)
+
+
+def forecast_ensemble(fitted, last_value, avg_height, avg_distance, horizon, draws=200, seed=None, interval=0.9):
+    """Monte Carlo forecast: the model's mean path and prediction-interval band over ``draws`` synthetic futures."""
+    synthetic = synthetic_peaks_batch(horizon, [avg_height], [avg_distance], n_draws=draws, seed=seed)[:, 0, :]
+    paths = predict_future(fitted, synthetic, last_value)
+    tail = (1 - interval) / 2
+    lower, upper = np.quantile(paths, [tail, 1 - tail], axis=0)
+    return {'mean': paths.mean(axis=0), 'lower': lower, 'upper': upper, 'interval': interval, 'draws': draws}
+
+
+def scoring_inputs(all_predictions, historical_data, weights, stats=None):
+    """Align predictions, historical stats and weights into arrays over the scored minerals."""
+    minerals = [mineral for mineral in weights if mineral in all_predictions]
+    if not minerals:
+        raise ValueError("None of the weighted minerals have predictions")
+
+    horizon = min(len(all_predictions[mineral]) for mineral in minerals)
+    predictions = np.column_stack([np.asarray(all_predictions[mineral][:horizon], dtype=float) for mineral in minerals])
+    if stats is None:
+        means, stds = np.array([column_stats(historical_data[mineral]) for mineral in minerals]).T
+    else:
+        means, stds = np.array([stats(mineral) for mineral in minerals]).T
+    return minerals, predictions, means, stds
+
+
+def calculate_sustainability_scores(all_predictions, historical_data, weights, points_per_score=POINTS_PER_SCORE, stats=None):
+    """
+    Calculate sustainability scores, each combining ``points_per_score`` sequential points from predictions.
+    The number of scores follows the prediction horizon (25 for the default 100 predictions).
+    Returns scores on a scale of 1-10.
+    """
+    minerals, predictions, means, stds = scoring_inputs(all_predictions, historical_data, weights, stats)
+    weight_vector = np.array([float(weights[mineral]) for mineral in minerals])
+    return score_table(score_windows(predictions, means, stds, weight_vector, points_per_score), points_per_score)
+
+
+def sensitivity_scores(all_predictions, historical_data, weight_sets, points_per_score=POINTS_PER_SCORE, stats=None):
+    """Score the same forecasts under several weightings at once, for sensitivity sweeps."""
+    minerals = sorted({mineral for weights in weight_sets for mineral in weights if mineral in all_predictions})
+    union = {mineral: 1.0 for mineral in minerals}
+    minerals, predictions, means, stds = scoring_inputs(all_predictions, historical_data, union, stats)
+    weight_matrix = np.array([[float(weights.get(mineral, 0)) for mineral in minerals] for weights in weight_sets])
+    scores = score_windows(predictions, means, stds, weight_matrix, points_per_score)
+    return [
+        {'weights': weights, 'scores': row.tolist(), 'averageScore': round(float(row.mean()), 2)}
+        for weights, row in zip(weight_sets, scores)
+    ]
+
+
+def fit_target_model(features, target):
+    """Fit the scalers and forest for one target column and predict over its history."""
+    scaler_features = MinMaxScaler()
+    scaler_target = MinMaxScaler()
+
+    features_scaled = scaler_features.fit_transform(features)
+    target_scaled = scaler_target.fit_transform(target)
+
+    model = RandomForestRegressor(n_estimators=MODEL_CONFIG['n_estimators'], random_state=MODEL_CONFIG['random_state'])
+    model.fit(features_scaled, target_scaled.ravel())
+
+    predictions_scaled = model.predict(features_scaled)
+    predictions = scaler_target.inverse_transform(predictions_scaled.reshape(-1, 1)).ravel()
+
+    return {
+        'model': model,
+        'scaler_features': scaler_features,
+        'scaler_target': scaler_target,
+        'predictions': predictions
+    }
+
+
+def sustainability_graph(sustainability_scores, target_column):
+    """Shape the scores into the SustainabilityGraph event payload."""
+    sustainability_graph_data = []
+    prev_score = None
+    for score in sustainability_scores:
+        trend = None
+        if prev_score is not None:
+            diff = score['score'] - prev_score
+            trend = diff
+
+        graph_point = {
+            'period': score['time_period'],
+            'points': score['points_considered'],
+            'score': score['score'],
+            'trend': trend if trend is not None else 0
+        }
+        sustainability_graph_data.append(graph_point)
+        prev_score = score['score']
+
+    # Calculate overall statistics
+    avg_score = sum(s['score'] for s in sustainability_scores) / len(sustainability_scores)
+    total_trend = sustainability_scores[-1]['score'] - sustainability_scores[0]['score']
+
+    # Create metadata for the graph
+    graph_metadata = {
+        'averageScore': round(avg_score, 2),
+        'overallTrend': round(total_trend, 2),
+        'totalPeriods': len(sustainability_scores),
+        'minScore': min(s['score'] for s in sustainability_scores),
+        'maxScore': max(s['score'] for s in sustainability_scores)
+    }
+
+    return {
+        'graphData': sustainability_graph_data,
+        'metadata': graph_metadata,
+        'targetColumn': target_column
+    }
+
+
+def clean_values(values):
+    """``values`` coerced to numbers, with gaps filled from the neighbouring samples."""
+    return pd.to_numeric(values, errors='coerce').ffill().bfill()
+
+
+def clean_column(df, column):
+    """Coerce ``column`` to numbers in place, filling gaps from the neighbouring samples."""
+    df[column] = clean_values(df[column])
+
+
+def prepare_column(df, column):
+    """Clean ``column`` in place and add the engineered feature columns derived from it."""
+    # Data processing
+    clean_column(df, column)
+
+    # Feature engineering
+    df['P_diff'] = df[column].diff().fillna(0)
+
+    df['P_rolling_mean'] = df[column].rolling(window=5, min_periods=1).mean()
+    df['P_rolling_std'] = df[column].rolling(window=5, min_periods=1).std()
+    df['P_rolling_std'] = df['P_rolling_std'].fillna(df[column].std())
+
+
+def fitted_model(df, version, column):
+    """Reuse the fitted model if this column of this dataset version was trained before, else fit it."""
+    cache_key = model_cache.key(version, column, MODEL_CONFIG)
+    fitted = model_cache.get(cache_key)
+    if fitted is None:
+        fitted = fit_target_model(df[FEATURE_COLUMNS].values, df[column].values.reshape(-1, 1))
+        model_cache.put(cache_key, fitted)
+    return fitted
+
+
+def forecast_column(df, version, column, future_entries=FUTURE_ENTRIES, ensemble=None, online=None, timings=None):
+    """Fit (or reuse) the model for one column and forecast ``future_entries`` steps past its history.
+
+    ``df`` must already have been through prepare_column() for ``column``.
+    With ``ensemble`` (draws/seed/interval options) the forecast is the mean
+    over that many synthetic futures and a prediction band is returned too.
+    With ``online`` (an OnlineDataset) the model, peaks and last value come
+    from the incremental state, and ``df`` only needs clean_column().
+    ``timings`` (a Timings) collects the peaks / model / forecast spans.
+    """
+    timings = Timings() if timings is None else timings
+    with timings.span('peaks'):
+        if online is None:
+            # Analyze peak characteristics
+            avg_peak_height, avg_peak_distance = analyze_peaks(df[column].values)
+        else:
+            avg_peak_height, avg_peak_distance = online.columns[column].peak_averages()
+    with timings.span('model'):
+        if online is None:
+            fitted = fitted_model(df, version, column)
+        else:
+            fitted = online_target(online, column).fitted_view()
+    target = df[column].values.reshape(-1, 1)
+
+    predictions = fitted['predictions']
+    forecast = {
+        'predictions': predictions,
+        'mape': float(custom_percent_accuracy(df[column], predictions))
+    }
+
+    with timings.span('forecast'):
+        if ensemble:
+            bands = forecast_ensemble(fitted, target[-1, 0], avg_peak_height, avg_peak_distance, future_entries,
+                                      draws=int(ensemble.get('draws', 200)), seed=ensemble.get('seed'),
+                                      interval=float(ensemble.get('interval', 0.9)))
+            forecast['future'] = bands['mean']
+            forecast['bands'] = bands
+        else:
+            # Generate future predictions from a single synthetic future
+            synthetic_data = generate_synthetic_peaks(future_entries, avg_peak_height, avg_peak_distance)
+            forecast['future'] = predict_future(fitted, synthetic_data, target[-1, 0])[0]
+
+    return forecast
+
+
+def run_process_data(ref, target_column, weights, options=None, job=None):
+    """Train (or reuse) the model for ``target_column`` and compute everything process_data emits.
+
+    ``options`` may set ``horizon`` (future steps), ``ensemble``
+    ({draws, seed, interval}) for a Monte Carlo forecast band and
+    ``weight_sets`` (a list of weight dicts) for a scoring sensitivity sweep.
+    ``plot_format`` picks the new_plot payload (see chartPayload). With
+    ``job`` (a JobHandle) every stage starts at a cancellation checkpoint.
+    """
+    if model_cache is None:
+        init_worker()
+    options = options or {}
+    fmt = plot_format(options)
+    timings = Timings(on_stage=job.checkpoint if job is not None else None)
+
+    with timings.span('load'):
+        df = load_dataset_ref(ref)
+        online = online_dataset(ref)
+
+    with timings.span('features'):
+        if online is None:
+            prepare_column(df, target_column)
+        else:
+            clean_column(df, target_column)
+    forecast = forecast_column(df, ref['version'], target_column,
+                               future_entries=int(options.get('horizon', FUTURE_ENTRIES)),
+                               ensemble=options.get('ensemble'), online=online, timings=timings)
+    predictions = forecast['predictions']
+    future_predictions = forecast['future']
+    future_entries = len(future_predictions)
+    bands = forecast.get('bands')
+
+    # Store all predictions for sustainability calculation
+    all_predictions = {target_column: future_predictions}
+
+    # Prepare data for Recharts, as points or as one float32 buffer
+    with timings.span('chart'):
+        plot = plot_payload(target_column, df[target_column].to_numpy(), predictions, future_predictions, bands, fmt)
+
+    # Process predictions for other minerals if not already processed
+    other_columns = [column for column in pipeline_columns(df.columns) if column not in all_predictions]
+    peak_stats = []
+    with timings.span('other_peaks'):
+        for column in other_columns:
+            if online is not None and column in FEATURE_COLUMNS:
+                peak_stats.append(online_target(online, target_column).feature_peak_averages(FEATURE_COLUMNS.index(column)))
+                continue
+            if online is not None:
+                peak_stats.append(online.columns[column].peak_averages())
+                continue
+            # Process additional columns for sustainability calculation
+            clean_column(df, column)
+            peak_stats.append(analyze_peaks(df[column].values))
+
+    # Generate synthetic futures for all of them in one batch
+    with timings.span('synthetic_peaks'):
+        if other_columns:
+            heights, distances = zip(*peak_stats)
+            synthetic = synthetic_peaks_batch(future_entries, heights, distances)[0]
+            all_predictions.update(zip(other_columns, synthetic))
+
+    # Calculate sustainability scores; historical stats are computed once per dataset version
+    def stats(mineral):
+        if online is not None and mineral in FEATURE_COLUMNS:
+            return online_target(online, target_column).feature_stats[FEATURE_COLUMNS.index(mineral)].mean_std()
+        if online is not None:
+            return online.columns[mineral].stats.mean_std()
+        scope = target_column if mineral in FEATURE_COLUMNS else None
+        return historical_stats.get(ref['version'], mineral, df[mineral], scope=scope)
+
+    with timings.span('scores'):
+        sustainability_scores = calculate_sustainability_scores(all_predictions, df, weights, stats=stats)
+        sustainability = sustainability_graph(sustainability_scores, target_column)
+
+    result = {
+        'sustainability': sustainability,
+        'plot': plot,
+        'mape': forecast['mape'],
+        'futureEntries': future_entries,
+        'columns': df.columns.tolist() + [col for col in FEATURE_COLUMNS if col not in df.columns],
+        'worker': os.getpid(),
+        'modelCache': model_cache.stats()
+    }
+    if options.get('weight_sets'):
+        with timings.span('sensitivity'):
+            result['sensitivity'] = sensitivity_scores(all_predictions, df, options['weight_sets'], stats=stats)
+    # Taken last, so every stage above is in it
+    result['timings'] = list(timings)
+    return result
+
+
+def forecast_columns(ref, columns, job=None):
+    """Train and forecast each of ``columns`` with its own model; one job's share of process_all_columns.
+
+    With ``job`` (a JobHandle) each column starts at a cancellation checkpoint.
+    ``timings`` in the result has a ``features`` and a ``forecast`` span per column.
+    """
+    if model_cache is None:
+        init_worker()
+
+    timings = Timings()
+    with timings.span('load'):
+        dataset = load_dataset_ref(ref)
+        online = online_dataset(ref)
+
+    forecasts = {}
+    for column in columns:
+        if job is not None:
+            job.checkpoint(column)
+        # Each column gets its own copy-on-write view, since prepare_column rewrites the feature columns
+        df = dataset.copy(deep=False)
+        with timings.span('features'):
+            if online is None:
+                prepare_column(df, column)
+            else:
+                clean_column(df, column)
+        with timings.span('forecast'):
+            forecast = forecast_column(df, ref['version'], column, online=online)
+        forecasts[column] = {'future': forecast['future'], 'mape': forecast['mape']}
+
+    return {'forecasts': forecasts, 'worker': os.getpid(), 'modelCache': model_cache.stats(), 'timings': list(timings)}
+
+
+def split_columns(columns, parts):
+    """Deal ``columns`` round-robin into at most ``parts`` non-empty groups."""
+    parts = max(1, min(parts, len(columns)))
+    return [columns[i::parts] for i in range(parts)]
+
+
+def score_forecasts(historical_data, forecasts, weights, target_column, version):
+    """Sustainability graph payload computed from real per-column forecasts.
+
+    Like process_data, each column's history is cleaned before its stats
+    are taken, and the stats are computed once per dataset version.
+    """
+    all_predictions = {column: forecast['future'] for column, forecast in forecasts.items()}
+
+    def stats(mineral):
+        return historical_stats.get(version, mineral, lambda: clean_values(historical_data[mineral]))
+
+    sustainability_scores = calculate_sustainability_scores(all_predictions, historical_data, weights, stats=stats)
+    return sustainability_graph(sustainability_scores, target_column)
@@ -0,0 +1,206 @@
+"""Level-of-detail index for chart series.
+
+A chart a few hundred pixels wide cannot show more than a couple of points
+per pixel, so sending every row of a long history is wasted bandwidth and
+render time. ``MinMaxPyramid`` keeps, for each level ``k``, the minimum and
+maximum (and where they occur) of every bucket of ``2**k`` rows. A range
+query picks the coarsest level that still gives at least one bucket per
+pixel and returns each bucket's min and max in index order, so peaks and
+troughs survive the decimation and the payload stays around ``2 * width``
+points however long the series grows.
+
+Run ``python seriesPyramid.py`` to benchmark building and querying.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from soilSnapshot import json_values
+
+MAX_WIDTH = 10000
+
+
+class MinMaxPyramid:
+    """Min/max decimation levels of one series, built once in O(n)."""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float32)
+        index = np.arange(len(values), dtype=np.int64)
+        self.length = len(values)
+        self.values = values
+        # Level 0 is the series itself; each further level halves the bucket count
+        self.levels = [(values, index, values, index)]
+        while len(self.levels[-1][0]) > 1:
+            self.levels.append(self._halve(*self.levels[-1]))
+
+    @staticmethod
+    def _halve(min_values, min_index, max_values, max_index):
+        if len(min_values) % 2:
+            # Pair the odd last bucket with itself
+            min_values, min_index, max_values, max_index = (np.append(a, a[-1]) for a in
+                                                            (min_values, min_index, max_values, max_index))
+
+        def pick(values, index, better):
+            a, b = values[0::2], values[1::2]
+            # NaN never wins over a number
+            take_b = better(b, a) | (np.isnan(a) & ~np.isnan(b))
+            return np.where(take_b, b, a), np.where(take_b, index[1::2], index[0::2])
+
+        new_min, new_min_index = pick(min_values, min_index, np.less)
+        new_max, new_max_index = pick(max_values, max_index, np.greater)
+        return new_min, new_min_index, new_max, new_max_index
+
+    def level_for(self, count, width):
+        """Coarsest level at which ``count`` rows still fill ``width`` pixels with one bucket each."""
+        level = 0
+        while level + 1 < len(self.levels) and -(-count // (1 << (level + 1))) >= width:
+            level += 1
+        return level
+
+    def query(self, start=0, stop=None, width=1000):
+        """Points for rows ``[start, stop)`` at ``width`` pixels.
+
+        Returns ``(level, index, values)``: the level used, the row indices
+        of the points kept and their values, in row order. When the range
+        fits in ``2 * width`` points every row is returned.
+        """
+        stop = self.length if stop is None else min(stop, self.length)
+        start = max(0, min(start, stop))
+        width = max(1, min(int(width), MAX_WIDTH))
+        count = stop - start
+
+        if count <= 2 * width:
+            return 0, np.arange(start, stop, dtype=np.int64), self.values[start:stop]
+
+        level = self.level_for(count, width)
+        size = 1 << level
+        # Only buckets that lie wholly inside the range come from the level; the partial
+        # buckets at either edge are reduced from their in-range rows instead
+        first, last = -(-start // size), stop // size
+        if first >= last:
+            # No whole bucket inside the range (e.g. width 1): the range is one bucket
+            parts = [self._reduce_rows(start, stop)]
+        else:
+            parts = [self._reduce_rows(start, first * size),
+                     tuple(a[first:last] for a in self.levels[level]),
+                     self._reduce_rows(last * size, stop)]
+        min_values, min_index, max_values, max_index = (np.concatenate(arrays) for arrays in zip(*parts))
+
+        # Each bucket contributes its min and max, earlier one first; a flat bucket contributes one point
+        min_first = min_index <= max_index
+        index = np.column_stack([np.where(min_first, min_index, max_index), np.where(min_first, max_index, min_index)])
+        values = np.column_stack([np.where(min_first, min_values, max_values), np.where(min_first, max_values, min_values)])
+        keep = np.ones(index.shape, dtype=bool)
+        keep[:, 1] = index[:, 1] != index[:, 0]
+        return level, index[keep], values[keep]
+
+    def _reduce_rows(self, start, stop):
+        """Min and max of rows ``[start, stop)`` as a one-bucket level slice (empty for no rows)."""
+        if stop <= start:
+            empty_values, empty_index = np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+            return empty_values, empty_index, empty_values, empty_index
+        rows = self.values[start:stop]
+        if np.isnan(rows).all():
+            low = high = 0
+        else:
+            low, high = np.nanargmin(rows), np.nanargmax(rows)
+        return (rows[[low]], np.array([start + low], dtype=np.int64),
+                rows[[high]], np.array([start + high], dtype=np.int64))
+
+
+class PyramidCache:
+    """Pyramids per (dataset version, series), built on first use and evicted LRU."""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, name, values):
+        """Pyramid of ``values`` for ``name`` at ``version``; ``values`` may be a callable returning them."""
+        key = (version, name)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        pyramid = MinMaxPyramid(values() if callable(values) else values)
+        with self._lock:
+            self._entries[key] = pyramid
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return pyramid
+
+    def discard(self, version):
+        """Drop every pyramid of ``version``."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == version]:
+                del self._entries[key]
+
+
+def range_options(options):
+    """Normalize the options sent with request_range."""
+    options = options or {}
+    start = int(options.get('start', 0))
+    stop = options.get('stop')
+    return {
+        'start': max(0, start),
+        'stop': None if stop is None else max(0, int(stop)),
+        'width': max(1, min(int(options.get('width', 1000)), MAX_WIDTH)),
+        'binary': bool(options.get('binary', False))
+    }
+
+
+def range_payload(pyramids, start, stop, width, binary=False):
+    """range_data payload for ``{series name: pyramid}`` over the same row range.
+
+    Every series is decimated on its own, so each comes with its own row
+    indices. With ``binary`` indices are int32 and values float32 buffers,
+    sent as Socket.IO binary attachments; otherwise they are lists.
+    """
+    series = {}
+    level = 0
+    for name, pyramid in pyramids.items():
+        series_level, index, values = pyramid.query(start, stop, width)
+        level = max(level, series_level)
+        if binary:
+            series[name] = {'index': index.astype('<i4').tobytes(), 'values': values.astype('<f4').tobytes()}
+        else:
+            series[name] = {'index': index.tolist(),
+                            'values': [None if v != v else v for v in json_values(values)]}
+
+    length = max((pyramid.length for pyramid in pyramids.values()), default=0)
+    return {
+        'start': start,
+        'stop': length if stop is None else min(stop, length),
+        'rows': length,
+        'width': width,
+        'level': level,
+        'encoding': 'binary' if binary else 'json',
+        'series': series
+    }
+
+
+def benchmark(rows=1_000_000, width=800, repeats=20):
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.standard_normal(rows)).astype(np.float32)
+
+    start = time.perf_counter()
+    pyramid = MinMaxPyramid(values)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        level, index, _ = pyramid.query(0, rows, width)
+    query = (time.perf_counter() - start) / repeats
+
+    print(f"{rows} rows: build {build * 1000:8.1f} ms, full-range query {query * 1000:6.2f} ms "
+          f"-> {len(index)} points at level {level} (width {width})")
+
+
+if __name__ == "__main__":
+    for rows in map(int, sys.argv[1:] or [1_000, 100_000, 1_000_000, 10_000_000]):
+        benchmark(rows)
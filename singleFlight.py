@@ -0,0 +1,127 @@
+"""Single-flight coalescing of identical requests across sessions.
+
+The first request for a key starts the work and later requests for the
+same key join it while it is still running, so the server does the work
+once per distinct request rather than once per client. Every call has its
+own Socket.IO room; the sessions waiting on it are put in the room and
+its results are emitted there once.
+
+A call goes through two steps: ``finish`` takes it out of the in-flight
+table when its result is ready (anyone asking afterwards starts a new
+call), and ``close`` forgets its sessions once nothing more will be sent
+to its room. When the last session leaves a call, the call is cancelled:
+it leaves the in-flight table and ``call.cancelled`` is set, so whoever
+runs it can stop.
+"""
+import json
+import threading
+import uuid
+
+
+def request_key(version, column, options):
+    """Coalescing key for a request on ``column`` of dataset ``version`` with ``options``."""
+    return (version, column, json.dumps(options or {}, sort_keys=True, default=str))
+
+
+class Call:
+    """One in-flight computation, the sessions waiting for it and the jobs doing it."""
+
+    def __init__(self, key, call_id, room):
+        self.id = call_id
+        self.key = key
+        self.room = room
+        self.members = set()
+        # Sessions that asked for the timing breakdown
+        self.timing = set()
+        self.cancelled = threading.Event()
+        # (job id, future) pairs, filled in by whoever runs the call
+        self.jobs = []
+        # Last progress event sent to the room, for sessions that join later
+        self.progress = None
+
+
+class SingleFlight:
+    """In-flight calls by key, and the call each session is currently waiting on."""
+
+    def __init__(self, prefix='call'):
+        self.prefix = prefix
+        self._calls = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._started = 0
+        self._joined = 0
+        self._cancelled = 0
+
+    def join(self, key, sid, timing=False):
+        """Attach ``sid`` to the call for ``key``, starting one if none is in flight.
+
+        Returns ``(call, leader, previous)``: ``leader`` is True when the
+        caller has to start the work, and ``previous`` is the call ``sid``
+        was waiting on before, if it was another one, so it can leave that
+        call's room (and stop its work if ``previous.cancelled`` is set).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call_id = uuid.uuid4().hex
+                call = self._calls[key] = Call(key, call_id, f"{self.prefix}:{call_id}")
+                self._started += 1
+            else:
+                self._joined += 1
+
+            previous = self._sessions.get(sid)
+            if previous is call:
+                previous = None
+            elif previous is not None:
+                self._discard(previous, sid)
+
+            call.members.add(sid)
+            if timing:
+                call.timing.add(sid)
+            self._sessions[sid] = call
+            return call, leader, previous
+
+    def leave(self, sid):
+        """Detach ``sid`` from the call it is waiting on and return that call, or None.
+
+        The call comes back with ``cancelled`` set if nobody is left waiting on it.
+        """
+        with self._lock:
+            call = self._sessions.pop(sid, None)
+            if call is not None:
+                self._discard(call, sid)
+            return call
+
+    def finish(self, call):
+        """Stop ``call`` from taking new members; returns the sessions still waiting on it."""
+        with self._lock:
+            if self._calls.get(call.key) is call:
+                del self._calls[call.key]
+            return set(call.members)
+
+    def close(self, call):
+        """Forget the sessions of a finished call."""
+        with self._lock:
+            for sid in call.members:
+                if self._sessions.get(sid) is call:
+                    del self._sessions[sid]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'waiting_sessions': sum(len(call.members) for call in self._calls.values()),
+                'started': self._started,
+                'joined': self._joined,
+                'cancelled': self._cancelled
+            }
+
+    def _discard(self, call, sid):
+        call.members.discard(sid)
+        call.timing.discard(sid)
+        if not call.members:
+            call.cancelled.set()
+            if self._calls.get(call.key) is call:
+                del self._calls[call.key]
+                self._cancelled += 1
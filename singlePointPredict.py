@@ -1,12 +1,12 @@
 from tkinter import filedialog
 import tkinter as tk
-import numpy as np
 import pandas as pd
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import SimpleRNN, Dense
 from tensorflow.keras.optimizers import Adam
 from sklearn.preprocessing import MinMaxScaler
 import matplotlib.pyplot as plt
+from slidingWindows import batch_count, create_dataset, window_batches
 
 # Load the dataset
 # Set up GUI for file selection
@@ -35,13 +35,6 @@ scaled_features = scaler_X.fit_transform(features)
 scaled_target = scaler_Y.fit_transform(target)
 
 # Create sequences from the scaled features and target
-def create_dataset(features, target, look_back=30):
-    dataX, dataY = [], []
-    for i in range(len(features) - look_back):
-        dataX.append(features[i:(i + look_back)])
-        dataY.append(target[i + look_back])
-    return np.array(dataX), np.array(dataY)
-
 look_back = 30
 X, y = create_dataset(scaled_features, scaled_target, look_back)
 
@@ -56,7 +49,8 @@ model.add(Dense(1))  # Single output for the target
 model.compile(optimizer=Adam(learning_rate=0.001), loss='mean_squared_error')
 
 # Train the model
-model.fit(trainX, trainY, epochs=50, batch_size=16, verbose=2)
+model.fit(window_batches(trainX, trainY, 16, shuffle=True, repeat=True),
+          steps_per_epoch=batch_count(len(trainX), 16), epochs=50, verbose=2)
 
 # Predict based on the last sequence
 predictions = model.predict(testX)
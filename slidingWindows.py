@@ -0,0 +1,125 @@
+"""Look-back windows over a feature matrix, as strided views instead of copies.
+
+create_dataset() used to append ``features[i:i + look_back]`` slices and
+stack them, which stores every row ``look_back`` times. Here the windows
+are views on one contiguous float32 copy of the features, so memory stays
+proportional to the raw data; only the batches handed to a model are
+materialized.
+
+Run ``python slidingWindows.py`` to benchmark against the old loop.
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+
+
+def create_dataset(features, target, look_back=30):
+    """Windows of ``look_back`` rows and the target right after each, as read-only views.
+
+    Returns ``(windows, targets)`` with shapes (n, look_back, n_features)
+    and ``(n,) + target.shape[1:]`` where ``n = len(features) - look_back``,
+    the same arrays the old loop built, in float32.
+    """
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    target = np.asarray(target, dtype=np.float32)
+    count = max(0, len(features) - look_back)
+    if len(features) < look_back:
+        # Too short for even one window; sliding_window_view would refuse
+        return np.empty((0, look_back) + features.shape[1:], dtype=np.float32), target[:0]
+
+    # sliding_window_view puts the window axis last: (n, n_features, look_back) -> (n, look_back, n_features)
+    windows = sliding_window_view(features, look_back, axis=0)[:count].transpose(0, 2, 1)
+    return windows, target[look_back:look_back + count]
+
+
+def flatten_windows(windows):
+    """(n, look_back * n_features) view of windows, for models that take flat rows (XGBoost, LinearRegression).
+
+    Consecutive rows of a window are adjacent in memory, so the flat rows
+    overlap in the same buffer instead of being copied. Windows that do not
+    share that layout are reshaped with a copy.
+    """
+    count, look_back, n_features = windows.shape
+    row_stride, step_stride, feature_stride = windows.strides
+    if step_stride != n_features * feature_stride:
+        return windows.reshape(count, -1)
+    return as_strided(windows, shape=(count, look_back * n_features),
+                      strides=(row_stride, feature_stride), writeable=False)
+
+
+def window_batches(windows, targets, batch_size=32, shuffle=False, seed=None, repeat=False):
+    """Yield ``(windows, targets)`` batches, copying one batch at a time.
+
+    Pass to Keras ``fit`` with ``steps_per_epoch=batch_count(len(windows), batch_size)``;
+    ``repeat`` makes the generator endless so it lasts for every epoch, and
+    ``shuffle`` reorders the windows each pass like ``fit(shuffle=True)``.
+    """
+    rng = np.random.default_rng(seed)
+    while True:
+        order = rng.permutation(len(windows)) if shuffle else np.arange(len(windows))
+        for start in range(0, len(order), batch_size):
+            index = order[start:start + batch_size]
+            yield windows[index], targets[index]
+        if not repeat:
+            return
+
+
+def batch_count(count, batch_size):
+    return -(-count // batch_size)
+
+
+def validation_split(windows, targets, fraction):
+    """Split off the last ``fraction`` of the windows, as Keras' ``validation_split`` does."""
+    split = int(len(windows) * (1 - fraction))
+    return (windows[:split], targets[:split]), (windows[split:], targets[split:])
+
+
+def loop_create_dataset(features, target, look_back=30):
+    """The original list-append implementation, kept for the benchmark."""
+    dataX, dataY = [], []
+    for i in range(len(features) - look_back):
+        dataX.append(features[i:(i + look_back)])
+        dataY.append(target[i + look_back])
+    return np.array(dataX), np.array(dataY)
+
+
+def benchmark(rows=781, n_features=16, look_back=50, repeats=5):
+    """Time and peak memory of building windows (plus the flat view) with the loop and with views."""
+    rng = np.random.default_rng(0)
+    features = rng.random((rows, n_features))
+    target = rng.random((rows, 1))
+
+    def run(build):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            build()
+        elapsed = (time.perf_counter() - start) / repeats
+
+        tracemalloc.start()
+        build()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak
+
+    def loop():
+        windows, targets = loop_create_dataset(features, target, look_back)
+        return windows, windows.reshape(len(windows), -1)
+
+    def views():
+        windows, targets = create_dataset(features, target, look_back)
+        return windows, flatten_windows(windows)
+
+    loop_time, loop_peak = run(loop)
+    view_time, view_peak = run(views)
+    print(f"{rows} rows x {n_features} features, look_back={look_back} (raw data {features.nbytes / 1e6:.2f} MB)")
+    print(f"  loop:  {loop_time * 1000:8.2f} ms  peak {loop_peak / 1e6:8.2f} MB")
+    print(f"  views: {view_time * 1000:8.2f} ms  peak {view_peak / 1e6:8.2f} MB")
+    print(f"  speedup {loop_time / view_time:.0f}x, memory {loop_peak / view_peak:.0f}x smaller")
+
+
+if __name__ == "__main__":
+    for scale in map(int, sys.argv[1:] or [1, 10, 100]):
+        benchmark(rows=781 * scale)
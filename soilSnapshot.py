@@ -0,0 +1,247 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from atomicFile import atomic_write
+
+SCHEMA_FILE = 'schema.json'
+VALUES_FILE = 'values.npy'
+INTEGERS_FILE = 'integers.npy'
+# Rows appended to a snapshot's dataset, one file per append: appended-<first row>-<rows>.pkl
+APPENDED_PATTERN = re.compile(r'^appended-(\d{12})-(\d+)\.pkl$')
+APPEND_LOCK_FILE = 'append.lock'
+SNAPSHOT_FORMAT = 2
+# Significant digits that recover a value written with up to 7 digits from its float32
+FLOAT32_DIGITS = 7
+
+
+def normalize_column_name(name):
+    """Strip stray whitespace from a column name, e.g. 'K ppm ' -> 'K ppm'."""
+    return ' '.join(str(name).split())
+
+
+def snapshot_path(snapshot_root, version):
+    """Directory holding the snapshot of a given dataset version."""
+    digest = hashlib.sha1(str(version).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(snapshot_root, digest)
+
+
+def ingest_csv(csv_file, snapshot_dir, version=None):
+    """Convert a soil CSV into a typed columnar snapshot.
+
+    Columns the CSV holds as integers (such as ``ID``) are kept as int64 in
+    ``integers.npy``; every other column is coerced to float32 and stored in
+    a single column-major ``values.npy`` matrix (one row per column), so
+    loading it back is a memory map rather than a text parse. Column names
+    are normalized and the original names are kept in ``schema.json``.
+    """
+    raw = pd.read_csv(csv_file)
+    columns = [normalize_column_name(c) for c in raw.columns]
+    is_integer = [raw[column].dtype.kind in 'iu' for column in raw.columns]
+
+    float_sources = [column for column, integer in zip(raw.columns, is_integer) if not integer]
+    values = np.empty((len(float_sources), len(raw)), dtype=np.float32)
+    for i, column in enumerate(float_sources):
+        values[i] = pd.to_numeric(raw[column], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+    integer_sources = [column for column, integer in zip(raw.columns, is_integer) if integer]
+    integers = np.empty((len(integer_sources), len(raw)), dtype=np.int64)
+    for i, column in enumerate(integer_sources):
+        integers[i] = raw[column].to_numpy(dtype=np.int64)
+
+    schema = {
+        'format': SNAPSHOT_FORMAT,
+        'version': version,
+        'rows': len(raw),
+        'dtype': 'float32',
+        'columns': columns,
+        'integer_columns': [name for name, integer in zip(columns, is_integer) if integer],
+        'source_columns': [str(c) for c in raw.columns]
+    }
+
+    # Build in a sibling temp dir and swap it in, so readers never see a half-written snapshot
+    parent = os.path.dirname(os.path.abspath(snapshot_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.ingest-')
+    try:
+        np.save(os.path.join(tmp_dir, VALUES_FILE), values)
+        np.save(os.path.join(tmp_dir, INTEGERS_FILE), integers)
+        with open(os.path.join(tmp_dir, SCHEMA_FILE), 'w') as f:
+            json.dump(schema, f)
+        if os.path.isdir(snapshot_dir):
+            shutil.rmtree(snapshot_dir)
+        os.replace(tmp_dir, snapshot_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return schema
+
+
+def is_snapshot(path):
+    """Whether ``path`` holds a snapshot in the current format; older ones get ingested again."""
+    if not os.path.isfile(os.path.join(path, SCHEMA_FILE)):
+        return False
+    try:
+        return read_schema(path).get('format') == SNAPSHOT_FORMAT
+    except ValueError:
+        return False
+
+
+def read_schema(snapshot_dir):
+    with open(os.path.join(snapshot_dir, SCHEMA_FILE)) as f:
+        return json.load(f)
+
+
+def load_snapshot(snapshot_dir, mmap_mode='c'):
+    """Load a snapshot as a DataFrame backed directly by the memory-mapped matrix.
+
+    The default ``mmap_mode='c'`` maps the file copy-on-write: untouched
+    pages are shared through the page cache and in-place edits stay private
+    to this process instead of being written back.
+    """
+    schema = read_schema(snapshot_dir)
+    if schema.get('format') != SNAPSHOT_FORMAT:
+        raise Exception(f"Unsupported snapshot format in '{snapshot_dir}'")
+
+    values = np.load(os.path.join(snapshot_dir, VALUES_FILE), mmap_mode=mmap_mode)
+    integer_columns = schema['integer_columns']
+    float_columns = [column for column in schema['columns'] if column not in integer_columns]
+    # values is (columns x rows); its transpose is a zero-copy single float32 block
+    frame = pd.DataFrame(values.T, columns=float_columns, copy=False)
+    if integer_columns:
+        integers = np.load(os.path.join(snapshot_dir, INTEGERS_FILE), mmap_mode=mmap_mode)
+        for row, column in zip(integers, integer_columns):
+            frame.insert(schema['columns'].index(column), column, row)
+    return frame
+
+
+@contextmanager
+def append_lock(snapshot_dir):
+    """Exclusive lock on a snapshot's appended rows, shared by every process on the machine."""
+    with open(os.path.join(snapshot_dir, APPEND_LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def write_appended(snapshot_dir, start, frame):
+    """Store ``frame`` as the appended rows starting at appended row ``start``; hold append_lock()."""
+    path = os.path.join(snapshot_dir, f"appended-{start:012d}-{len(frame)}.pkl")
+    with atomic_write(path, 'wb', makedirs=False) as f:
+        frame.to_pickle(f)
+
+
+def read_appended(snapshot_dir, start=0):
+    """Frames of the rows appended to a snapshot's dataset from appended row ``start`` on, in order.
+
+    ``start`` must be where an earlier append began (e.g. the number of rows
+    already read), so only the appends made since are read.
+    """
+    segments = []
+    for name in os.listdir(snapshot_dir):
+        match = APPENDED_PATTERN.match(name)
+        if match and int(match.group(1)) >= start:
+            segments.append((int(match.group(1)), int(match.group(2)), name))
+
+    frames = []
+    for first, rows, name in sorted(segments):
+        if first != start:
+            raise Exception(f"Appended rows of '{snapshot_dir}' are missing rows {start}-{first - 1}")
+        frames.append(pd.read_pickle(os.path.join(snapshot_dir, name)))
+        start += rows
+    return frames
+
+
+def json_values(values):
+    """``values`` as a list for JSON, without float32 noise.
+
+    Integers stay integers. A float32 value is sent as the decimal it was
+    most likely read from (5.16 rather than 5.159999847412109): rounded to
+    FLOAT32_DIGITS significant digits, or to 9 for the few values that do
+    not come back to the same float32 that way.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'iub':
+        return values.tolist()
+    wide = values.astype(np.float64)
+    if values.dtype != np.float32:
+        return wide.tolist()
+
+    wide = _round_significant(wide, FLOAT32_DIGITS)
+    missed = np.isfinite(wide) & (wide.astype(np.float32) != values)
+    if missed.any():
+        wide[missed] = _round_significant(values[missed].astype(np.float64), 9)
+    return wide.tolist()
+
+
+def _round_significant(values, digits):
+    rounded = values.copy()
+    scaled = np.isfinite(values) & (values != 0)
+    decimals = digits - 1 - np.floor(np.log10(np.abs(values[scaled]))).astype(int)
+    picked = rounded[scaled]
+    # np.round takes one decimals value per call; a column spans only a few magnitudes
+    for places in np.unique(decimals):
+        same = decimals == places
+        picked[same] = np.round(picked[same], int(places))
+    rounded[scaled] = picked
+    return rounded
+
+
+def load_dataset(source, snapshot_root):
+    """Load the current version of ``source`` from its snapshot, ingesting it first if needed.
+
+    Returns (DataFrame, version).
+    """
+    version = source.version()
+    snapshot_dir = snapshot_path(snapshot_root, version)
+    if not is_snapshot(snapshot_dir):
+        obj = source.fetch()
+        version = obj.version
+        snapshot_dir = snapshot_path(snapshot_root, version)
+        try:
+            ingest_csv(obj.body, snapshot_dir, version=version)
+        finally:
+            obj.body.close()
+    return load_snapshot(snapshot_dir), version
+
+
+def read_dataset(path):
+    """Read either a snapshot directory or a CSV file into a DataFrame."""
+    if os.path.isdir(path) and is_snapshot(path):
+        return load_snapshot(path)
+    return pd.read_csv(path)
+
+
+def dataset_version(path):
+    """Version of a snapshot directory or CSV file: the snapshot's recorded version, else a content hash."""
+    if os.path.isdir(path) and is_snapshot(path):
+        version = read_schema(path).get('version')
+        if version is not None:
+            return str(version)
+        path = os.path.join(path, VALUES_FILE)
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python soilSnapshot.py <csv_path> <snapshot_dir>", file=sys.stderr)
+        sys.exit(1)
+
+    schema = ingest_csv(sys.argv[1], sys.argv[2])
+    print(f"Wrote {schema['rows']} rows x {len(schema['columns'])} columns to {sys.argv[2]}")
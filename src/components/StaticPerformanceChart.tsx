@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react'
+import React, { useState, useEffect, useCallback, useRef } from 'react'
 import { Card, CardContent } from "@/components/ui/card"
 import { Button } from "@/components/ui/button"
 import { Line, LineChart, ResponsiveContainer, Tooltip, XAxis, YAxis, CartesianGrid, Legend } from "recharts"
@@ -14,6 +14,38 @@ interface StaticPerformanceChartProps {
   socket: Socket | null;
 }
 
+interface DatasetStreamHeader {
+  columns: string[];
+  rows: number;
+  chunkSize: number;
+  chunks: number;
+  encoding: 'json' | 'float32';
+  compression: 'deflate' | null;
+}
+
+interface DatasetStreamChunk {
+  index: number;
+  start: number;
+  stop: number;
+  columns: Record<string, number[] | ArrayBuffer>;
+}
+
+// Rows per full_dataset_chunk; columns arrive as (deflated) little-endian float32 buffers
+const DATASET_STREAM_OPTIONS = { stream: true, chunk_size: 500, binary: true, compress: true }
+
+const inflate = async (buffer: ArrayBuffer): Promise<ArrayBuffer> => {
+  const stream = new Blob([buffer]).stream().pipeThrough(new DecompressionStream('deflate'))
+  return new Response(stream).arrayBuffer()
+}
+
+const decodeColumn = async (values: number[] | ArrayBuffer, header: DatasetStreamHeader): Promise<ArrayLike<number>> => {
+  if (header.encoding === 'json') {
+    return values as number[]
+  }
+  const buffer = header.compression === 'deflate' ? await inflate(values as ArrayBuffer) : values as ArrayBuffer
+  return new Float32Array(buffer)
+}
+
 const CustomTooltip = ({ active, payload, label }) => {
   if (active && payload && payload.length) {
     return (
@@ -40,16 +72,76 @@ export function StaticPerformanceChart({ socket }: StaticPerformanceChartProps)
   const [error, setError] = useState(null)
   const [windowedData, setWindowedData] = useState([])
   const [currentIndex, setCurrentIndex] = useState(0)
+  const streamHeader = useRef<DatasetStreamHeader | null>(null)
+  const decodeQueue = useRef<Promise<void>>(Promise.resolve())
+  // Rows decoded so far; handed to state once, when the stream ends
+  const streamRows = useRef<Record<string, number>[]>([])
 
   useEffect(() => {
     if (!socket) return;
 
+    const requestDataset = () => {
+      socket.emit('request_full_dataset', DATASET_STREAM_OPTIONS);
+    };
+
     const handleConnect = () => {
       console.log('Socket connected');
-      socket.emit('request_full_dataset');
+      requestDataset();
       setError(null);
     };
 
+    const handleStreamStart = (header: DatasetStreamHeader) => {
+      console.log('Dataset stream started:', header);
+      streamHeader.current = header;
+      decodeQueue.current = Promise.resolve();
+      streamRows.current = [];
+      setData([]);
+      setColumns(header.columns);
+      setVisibleLines(header.columns.reduce((acc, column) => {
+        if (column !== 'ID') {
+          acc[column] = true;
+        }
+        return acc;
+      }, {}));
+    };
+
+    const handleStreamChunk = (chunk: DatasetStreamChunk) => {
+      const header = streamHeader.current;
+      if (!header) return;
+      const rows = streamRows.current;
+
+      // Decoding is async, so chain chunks to keep rows in order
+      decodeQueue.current = decodeQueue.current.then(async () => {
+        const decoded = await Promise.all(
+          header.columns.map(column => decodeColumn(chunk.columns[column], header))
+        );
+        for (let i = 0; i < chunk.stop - chunk.start; i++) {
+          const row = {};
+          header.columns.forEach((column, c) => {
+            row[column] = decoded[c][i];
+          });
+          rows.push(row);
+        }
+      }).catch((err) => {
+        console.error('Failed to decode dataset chunk:', err);
+        setError('Invalid data format received from server');
+      });
+    };
+
+    const handleStreamEnd = (summary: { rows: number; chunks: number }) => {
+      const header = streamHeader.current;
+      if (!header) return;
+      decodeQueue.current.then(() => {
+        // A newer stream has started meanwhile; its own end will set the data
+        if (streamHeader.current !== header) return;
+        console.log('Dataset stream complete:', summary);
+        streamHeader.current = null;
+        setData(streamRows.current);
+        streamRows.current = [];
+        setIsLoading(false);
+      });
+    };
+
     const handleFullDataset = (receivedData) => {
       console.log('Received data:', receivedData);
       if (receivedData && receivedData.columns && Array.isArray(receivedData.data)) {
@@ -85,16 +177,22 @@ export function StaticPerformanceChart({ socket }: StaticPerformanceChartProps)
 
     socket.on('connect', handleConnect);
     socket.on('full_dataset', handleFullDataset);
+    socket.on('full_dataset_start', handleStreamStart);
+    socket.on('full_dataset_chunk', handleStreamChunk);
+    socket.on('full_dataset_end', handleStreamEnd);
     socket.on('error', handleError);
     socket.on('disconnect', handleDisconnect);
 
     if (socket.connected) {
-      socket.emit('request_full_dataset');
+      requestDataset();
     }
 
     return () => {
       socket.off('connect', handleConnect);
       socket.off('full_dataset', handleFullDataset);
+      socket.off('full_dataset_start', handleStreamStart);
+      socket.off('full_dataset_chunk', handleStreamChunk);
+      socket.off('full_dataset_end', handleStreamEnd);
       socket.off('error', handleError);
       socket.off('disconnect', handleDisconnect);
     };
@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react'
 import { io, Socket } from 'socket.io-client'
+import { decodePlot, PlotPayload } from '@/lib/chartPayload'
 
 interface DataPoint {
   entry: number;
@@ -7,6 +8,13 @@ interface DataPoint {
   predicted: number;
 }
 
+interface JobProgress {
+  jobId: string;
+  targetColumn: string | null;
+  stage: string;
+  percent: number;
+}
+
 interface UseSocketReturn {
   socket: Socket | null;
   columns: string[];
@@ -16,6 +24,7 @@ interface UseSocketReturn {
   targetColumn: string;
   error: string | null;
   isConnecting: boolean;
+  progress: JobProgress | null;
   handleSubmit: (column: string) => void;
 }
 
@@ -28,6 +37,7 @@ export function useSocket(): UseSocketReturn {
   const [targetColumn, setTargetColumn] = useState<string>('')
   const [error, setError] = useState<string | null>(null)
   const [isConnecting, setIsConnecting] = useState(true)
+  const [progress, setProgress] = useState<JobProgress | null>(null)
 
   useEffect(() => {
     let mounted = true;
@@ -84,14 +94,20 @@ export function useSocket(): UseSocketReturn {
           }
         })
 
-        newSocket.on('new_plot', (data: { data: DataPoint[], column: string }) => {
+        newSocket.on('new_plot', (data: PlotPayload) => {
           if (mounted) {
-            console.log('Received plot data:', data)
-            setChartData(data.data)
+            console.log('Received plot data for:', data.column)
+            setChartData(decodePlot(data))
             setTargetColumn(data.column)
           }
         })
 
+        newSocket.on('progress', (data: JobProgress) => {
+          if (mounted) {
+            setProgress(data)
+          }
+        })
+
         newSocket.on('error', (error: any) => {
           if (mounted) {
             console.error('Socket error:', error)
@@ -144,8 +160,9 @@ export function useSocket(): UseSocketReturn {
         setAccuracy(null)
         setError(null)
         setConsoleOutput('')
+        setProgress(null)
         
-        socket.emit('process_data', { target_column: column })
+        socket.emit('process_data', { target_column: column, plot_format: 'float32' })
       } catch (err) {
         const errorMessage = err instanceof Error ? err.message : 'Failed to send data to server'
         setError(errorMessage)
@@ -162,6 +179,7 @@ export function useSocket(): UseSocketReturn {
     targetColumn,
     error,
     isConnecting,
+    progress,
     handleSubmit
   }
 }
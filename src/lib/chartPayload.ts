@@ -0,0 +1,64 @@
+export interface ChartPoint {
+  entry: number;
+  actual: number | null;
+  predicted: number;
+  lower?: number;
+  upper?: number;
+}
+
+interface SeriesSlice {
+  offset: number;
+  length: number;
+}
+
+// new_plot with plot_format 'float32': every series in one little-endian float32 buffer
+export interface BinaryPlotPayload {
+  column: string;
+  encoding: 'float32';
+  byteOrder: 'little';
+  entryStart: number;
+  rows: number;
+  future: number;
+  series: Record<string, SeriesSlice>;
+  buffer: ArrayBuffer;
+}
+
+export interface JsonPlotPayload {
+  column: string;
+  data: ChartPoint[];
+}
+
+export type PlotPayload = BinaryPlotPayload | JsonPlotPayload;
+
+const readSeries = (payload: BinaryPlotPayload, name: string): Float32Array | null => {
+  const slice = payload.series[name]
+  if (!slice) return null
+  // Copy into an aligned buffer, since the attachment may start at an odd byte offset
+  return new Float32Array(payload.buffer.slice(slice.offset, slice.offset + slice.length * 4))
+}
+
+export function decodePlot(payload: PlotPayload): ChartPoint[] {
+  if (!('encoding' in payload)) {
+    return payload.data
+  }
+
+  const actual = readSeries(payload, 'actual')!
+  const predicted = readSeries(payload, 'predicted')!
+  const future = readSeries(payload, 'future')!
+  const lower = readSeries(payload, 'lower')
+  const upper = readSeries(payload, 'upper')
+
+  const points: ChartPoint[] = new Array(payload.rows + payload.future)
+  for (let i = 0; i < payload.rows; i++) {
+    points[i] = { entry: payload.entryStart + i, actual: actual[i], predicted: predicted[i] }
+  }
+  for (let i = 0; i < payload.future; i++) {
+    const point: ChartPoint = { entry: payload.entryStart + payload.rows + i, actual: null, predicted: future[i] }
+    if (lower && upper) {
+      point.lower = lower[i]
+      point.upper = upper[i]
+    }
+    points[payload.rows + i] = point
+  }
+  return points
+}
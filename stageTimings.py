@@ -0,0 +1,125 @@
+"""Timing spans and Prometheus-style latency histograms.
+
+``Timings`` records the stages of one request as ``(stage, seconds)``
+pairs; it is a plain list underneath, so a job executor worker can return
+it with its result. ``MetricsRegistry`` folds durations into fixed-bucket
+histograms and renders them in the Prometheus text format for ``/metrics``.
+Recording a span is a ``perf_counter`` pair, a lock and a bisect, so both
+can stay on in production.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans from sub-millisecond cache hits up to slow model fits
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram for one label set."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Histograms keyed by metric name and labels, shared by the whole process."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Observe the duration of the ``with`` block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self):
+        """All histograms in the Prometheus text exposition format."""
+        with self._lock:
+            snapshot = sorted((key, list(h.counts), h.sum, h.count) for key, h in self._histograms.items())
+
+        lines = []
+        seen = set()
+        for (name, labels), counts, total, count in snapshot:
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            prefix = label_text + ',' if label_text else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = '{' + label_text + '}' if label_text else ''
+            lines.append(f"{name}_sum{suffix} {total}")
+            lines.append(f"{name}_count{suffix} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Timings(list):
+    """``(stage, seconds)`` spans of one request, in the order they finished.
+
+    ``on_stage`` is called with each stage's name before it starts, e.g. a
+    job's cancellation checkpoint; if it raises, the stage does not run.
+    """
+
+    def __init__(self, *args, on_stage=None):
+        super().__init__(*args)
+        self.on_stage = on_stage
+
+    @contextmanager
+    def span(self, stage):
+        if self.on_stage is not None:
+            self.on_stage(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.append((stage, time.perf_counter() - start))
+
+    def breakdown(self):
+        """Payload for the ``timing`` event: stages in order, milliseconds, and the total."""
+        return {
+            'stages': [{'stage': stage, 'ms': round(seconds * 1000, 3)} for stage, seconds in self],
+            'totalMs': round(sum(seconds for _, seconds in self) * 1000, 3)
+        }
+
+
+# Process-wide registry; external calls are timed into it wherever they happen
+METRICS = MetricsRegistry()
+METRICS.describe('process_data_stage_seconds', "Time spent in each process_data pipeline stage.")
+METRICS.describe('external_call_seconds', "Latency of calls to external services (S3, OpenAI).")
@@ -0,0 +1,127 @@
+"""Import-time and connect-latency budget for app.py.
+
+Each measurement runs in a fresh interpreter, like a gunicorn worker that
+was just restarted without ``preload_app``:
+
+- ``import app`` wall time, and which heavy modules it pulled in
+- time from interpreter start until a socket.io client connecting to the
+  app receives ``available_columns``, using the local CSV and stub
+  providers so no network is involved
+- with ``--top N`` the slowest imports from ``python -X importtime``
+
+Exits non-zero when a median exceeds its budget or a heavy module is
+imported at startup, so it can gate CI:
+
+    python startupBenchmark.py --import-budget 2 --connect-budget 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Must not be imported before the first request that needs them
+HEAVY_MODULES = ('sklearn', 'scipy', 'joblib', 'openai', 'boto3', 'botocore', 'statsmodels', 'tensorflow',
+                 'matplotlib')
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+print(json.dumps({'seconds': time.perf_counter() - start,
+                  'heavy': sorted({m.split('.')[0] for m in sys.modules} & set(%r))}))
+""" % (HEAVY_MODULES,)
+
+CONNECT_PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+client = app.socketio.test_client(app.app)
+received = [m['name'] for m in client.get_received()]
+print(json.dumps({'seconds': time.perf_counter() - start, 'received': received}))
+"""
+
+
+def probe_env(snapshot_dir):
+    env = dict(os.environ)
+    env.update({
+        'DATASET_SOURCE': 'local',
+        'DATASET_PATH': os.path.join(HERE, 'SOIL DATA GR.csv'),
+        'DATASET_SNAPSHOT_DIR': snapshot_dir,
+        'WEIGHTS_PROVIDER': 'stub',
+        'ANALYSIS_PROVIDER': 'stub'
+    })
+    return env
+
+
+def run_probe(code, env):
+    out = subprocess.run([sys.executable, '-c', code], cwd=HERE, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env, top):
+    """The ``top`` imports with the largest cumulative time, from ``-X importtime``."""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=HERE, env=env,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def benchmark(repeats=5, import_budget=2.0, connect_budget=4.0, top=0):
+    """Run the probes and return a list of budget violations (empty when everything passed)."""
+    failures = []
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        env = probe_env(snapshot_dir)
+        imports = [run_probe(IMPORT_PROBE, env) for _ in range(repeats)]
+        # The first connect ingests the CSV snapshot; later ones measure the steady state
+        run_probe(CONNECT_PROBE, env)
+        connects = [run_probe(CONNECT_PROBE, env) for _ in range(repeats)]
+        slowest = slowest_imports(env, top) if top else []
+
+    import_time = statistics.median(r['seconds'] for r in imports)
+    connect_time = statistics.median(r['seconds'] for r in connects)
+    heavy = sorted({m for r in imports for m in r['heavy']})
+
+    print(f"import app:         median {import_time * 1000:8.1f} ms (budget {import_budget * 1000:.0f} ms)")
+    print(f"connect -> columns: median {connect_time * 1000:8.1f} ms (budget {connect_budget * 1000:.0f} ms)")
+    print(f"heavy modules at import: {', '.join(heavy) or 'none'}")
+    for cumulative, name in slowest:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if import_time > import_budget:
+        failures.append(f"import app took {import_time:.2f}s, budget {import_budget:.2f}s")
+    if connect_time > connect_budget:
+        failures.append(f"connect took {connect_time:.2f}s, budget {connect_budget:.2f}s")
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    if any('available_columns' not in r['received'] for r in connects):
+        failures.append("connect did not emit available_columns")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check app.py startup against an import and connect budget.")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--import-budget', type=float, default=float(os.getenv('STARTUP_IMPORT_BUDGET', 2.0)),
+                        help="seconds for 'import app'")
+    parser.add_argument('--connect-budget', type=float, default=float(os.getenv('STARTUP_CONNECT_BUDGET', 4.0)),
+                        help="seconds from interpreter start to available_columns")
+    parser.add_argument('--top', type=int, default=0, help="also list the N slowest imports")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    failures = benchmark(args.repeats, args.import_budget, args.connect_budget, args.top)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,121 @@
+import os
+import time
+
+from stageTimings import METRICS
+
+SYSTEM_PROMPT = "You are an AI assistant that advises on mining sustainability using provided data."
+
+STUB_ANALYSIS = (
+    "The forecast stays within the historical range for most minerals and the model accuracy is "
+    "acceptable, so extraction at the current rate does not show a clear depletion trend. Recovery "
+    "should still be monitored where scores dip in later periods. Yes, mining can continue."
+)
+
+
+def analysis_messages(target_column, mape, all_columns, future_entries):
+    prompt = f"""
+            Given the following information about mining data, please assess if it is sustainable to continue mining:
+
+            Available data columns: {', '.join(all_columns)}
+            Target column analyzed: {target_column}
+            Prediction accuracy: {mape}%
+            Number of future predictions: {future_entries}
+
+            Based on the historical data and future predictions for {target_column}, analyze the environmental impact
+            and sustainability of continuing mining operations. Consider any trends, patterns, or concerning indicators
+            in the data. Give a definitive yes or no answer at the end if we should continue mining. You must either
+            say yes or no, not maybe or anything like that. Keep the whole response under 200 words.
+            """
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+class OpenAIAnalysisProvider:
+    """Streams the analysis from a chat completions endpoint.
+
+    Any OpenAI-compatible server works, so OPENAI_BASE_URL can point the
+    client at fakeLLMServer.py for load tests.
+    """
+
+    def __init__(self, client, model="gpt-3.5-turbo"):
+        self.client = client
+        self.model = model
+
+    def stream(self, messages, timeout):
+        start = time.perf_counter()
+        with METRICS.time('external_call_seconds', call='openai_analysis_request'):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                timeout=timeout
+            )
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            response.close()
+            METRICS.observe('external_call_seconds', time.perf_counter() - start, call='openai_analysis_stream')
+
+
+class StubAnalysisProvider:
+    """Offline stand-in that yields a canned answer word by word."""
+
+    def __init__(self, delay=0.02, text=STUB_ANALYSIS):
+        self.delay = delay
+        self.text = text
+
+    def stream(self, messages, timeout):
+        for i, word in enumerate(self.text.split(' ')):
+            time.sleep(self.delay)
+            yield word if i == 0 else ' ' + word
+
+
+def stream_analysis(provider, messages, on_update, budget, cancelled=None, flush_interval=0.1):
+    """Pull tokens from ``provider`` and report the growing text through ``on_update(text, delta, status)``.
+
+    Updates are coalesced to at most one per ``flush_interval`` seconds and
+    carry ``status=None``; the last one carries 'complete', 'cancelled' or
+    'timeout'. Stops early when ``cancelled`` (a threading.Event) is set or
+    the ``budget`` in seconds runs out between tokens. Returns the text.
+    """
+    deadline = time.monotonic() + budget
+    text = ''
+    pending = ''
+    last_flush = time.monotonic()
+    status = 'complete'
+
+    tokens = provider.stream(messages, timeout=budget)
+    try:
+        for token in tokens:
+            text += token
+            pending += token
+            if cancelled is not None and cancelled.is_set():
+                status = 'cancelled'
+                break
+            now = time.monotonic()
+            if now >= deadline:
+                status = 'timeout'
+                break
+            if now - last_flush >= flush_interval:
+                on_update(text, pending, None)
+                pending = ''
+                last_flush = now
+    finally:
+        tokens.close()
+
+    on_update(text, pending, status)
+    return text
+
+
+def analysis_provider_from_env(openai_client):
+    """Pick the analysis provider named by ANALYSIS_PROVIDER (openai, stub)."""
+    kind = os.getenv('ANALYSIS_PROVIDER', 'openai').lower()
+    if kind == 'openai':
+        return OpenAIAnalysisProvider(openai_client)
+    if kind == 'stub':
+        return StubAnalysisProvider(delay=float(os.getenv('ANALYSIS_STUB_DELAY', 0.02)))
+    raise Exception(f"Unknown ANALYSIS_PROVIDER '{kind}', expected 'openai' or 'stub'")
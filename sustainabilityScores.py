@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+POINTS_PER_SCORE = 4
+
+
+def column_stats(values):
+    """Historical (mean, std) of one column, with a zero std replaced by 1 as the scorer expects."""
+    values = np.asarray(values, dtype=float)
+    std = np.nanstd(values)
+    return float(np.nanmean(values)), float(std) if std != 0 else 1.0
+
+
+class HistoricalStats:
+    """Per-column historical statistics, computed once per dataset version.
+
+    ``scope`` separates columns whose history depends on more than the
+    dataset version, such as the engineered features of a target column.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, column, values, scope=None):
+        """(mean, std) of ``column`` at ``version``; ``values`` may be a callable returning them."""
+        key = (version, scope, column)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        stats = column_stats(values() if callable(values) else values)
+        with self._lock:
+            self._entries[key] = stats
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return stats
+
+
+def score_windows(predictions, means, stds, weights, points_per_score=POINTS_PER_SCORE):
+    """Score forecast windows for any number of scenarios and weight vectors in one pass.
+
+    predictions: (scenarios, horizon, minerals) or (horizon, minerals)
+    means, stds: (minerals,) historical statistics
+    weights:     (weight_sets, minerals) or (minerals,)
+
+    The horizon is cut into ``horizon // points_per_score`` windows; each
+    window's mean prediction becomes a per-mineral z-score, mapped to 1-10
+    and combined with the weights. Returns (scenarios, weight_sets, windows)
+    scores, dropping the scenario / weight axes that were not given.
+    """
+    predictions = np.asarray(predictions, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    single_scenario = predictions.ndim == 2
+    single_weights = weights.ndim == 1
+    predictions = predictions[None] if single_scenario else predictions
+    weights = np.atleast_2d(weights)
+
+    scenarios, horizon, minerals = predictions.shape
+    windows = horizon // points_per_score
+    if windows == 0:
+        raise ValueError(f"Need at least {points_per_score} predictions, but only have {horizon}")
+
+    # (scenarios, windows, points, minerals) -> mean over the points in each window
+    window_means = predictions[:, :windows * points_per_score].reshape(
+        scenarios, windows, points_per_score, minerals).mean(axis=2)
+
+    z_scores = np.abs((window_means - np.asarray(means)) / np.asarray(stds))
+    mineral_scores = np.clip(10 * (1 - z_scores / 3), 1, 10)
+
+    weighted = np.einsum('swm,km->skw', mineral_scores, weights)
+    total_weight = weights.sum(axis=1)[None, :, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = np.where(total_weight > 0, 10 - weighted / total_weight, 1.0)
+    scores = np.round(scores, 2)
+
+    if single_weights:
+        scores = scores[:, 0]
+    if single_scenario:
+        scores = scores[0]
+    return scores
+
+
+def score_table(scores, points_per_score=POINTS_PER_SCORE):
+    """Turn one row of window scores into the per-period dicts the graph is built from."""
+    return [
+        {
+            'time_period': i + 1,
+            'points_considered': f"{i * points_per_score + 1}-{(i + 1) * points_per_score}",
+            'score': float(score)
+        }
+        for i, score in enumerate(scores)
+    ]
@@ -0,0 +1,26 @@
+import warnings
+
+# app.py patches the standard library for eventlet as its first import; tests that load
+# it must see every other module imported the same way, so patch before any of them
+with warnings.catch_warnings():
+    # Eventlet warns that it is in maintenance mode on import
+    warnings.simplefilter('ignore')
+    import eventlet
+eventlet.monkey_patch()
+
+import os
+import sys
+
+import pytest
+
+# The application modules live flat at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SOIL_CSV = os.path.join(ROOT, 'SOIL DATA GR.csv')
+
+
+@pytest.fixture
+def soil_frame():
+    import pandas as pd
+    return pd.read_csv(SOIL_CSV)
@@ -0,0 +1,298 @@
+import importlib
+import os
+import time
+
+import pytest
+
+from conftest import SOIL_CSV
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """app.py configured for a local CSV, stub providers and one job worker."""
+    state = tmp_path_factory.mktemp('app')
+    os.environ.update({
+        'DATASET_SOURCE': 'local',
+        'DATASET_PATH': SOIL_CSV,
+        'DATASET_SNAPSHOT_DIR': str(state / 'snapshots'),
+        'WEIGHTS_PROVIDER': 'stub',
+        'WEIGHTS_CACHE_PATH': str(state / 'weights.json'),
+        'ANALYSIS_PROVIDER': 'stub',
+        'ANALYSIS_STUB_DELAY': '0',
+        'MODEL_CACHE_DIR': '',
+        'JOB_WORKERS': '1',
+        'PROGRESS_INTERVAL_SECONDS': '0.05',
+    })
+    module = importlib.import_module('app')
+    yield module
+    module.job_executor.shutdown()
+    module.job_board.close()
+
+
+def test_reset_worker_state_gives_a_forked_worker_its_own_pool_and_board(app_module):
+    executor, board = app_module.job_executor, app_module.job_board
+
+    app_module.reset_worker_state()
+    try:
+        assert app_module.job_executor is not executor
+        assert app_module.job_board.state_dir != board.state_dir
+    finally:
+        app_module.job_executor.shutdown()
+        app_module.job_board.close()
+        app_module.job_executor, app_module.job_board = executor, board
+
+
+def wait_for(app_module, clients, event, timeout=120):
+    """Let background tasks run until every client has received ``event``; returns all events per client."""
+    received = [[] for _ in clients]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for events, client in zip(received, clients):
+            events.extend(client.get_received())
+        if all(any(e['name'] == event for e in events) for events in received):
+            return received
+        app_module.socketio.sleep(0.05)
+    raise AssertionError(f"{event} not received within {timeout}s: {[[e['name'] for e in r] for r in received]}")
+
+
+def names(events):
+    return [event['name'] for event in events]
+
+
+def test_identical_requests_from_two_sessions_share_one_job(app_module):
+    before = app_module.process_calls.stats()
+    first = app_module.socketio.test_client(app_module.app)
+    second = app_module.socketio.test_client(app_module.app)
+    try:
+        request = {'target_column': 'pH', 'horizon': 12, 'timing': True}
+        first.emit('process_data', request)
+        second.emit('process_data', dict(request, timing=False))
+
+        received = wait_for(app_module, [first, second], 'new_plot')
+
+        after = app_module.process_calls.stats()
+        assert after['started'] - before['started'] == 1
+        assert after['joined'] - before['joined'] == 1
+        for events in received:
+            plot = next(e['args'][0] for e in events if e['name'] == 'new_plot')
+            assert plot['column'] == 'pH'
+            assert 'SustainabilityGraph' in names(events) and 'model_mae' in names(events)
+        # Only the session that asked for it gets the timing breakdown
+        assert 'timing' in names(received[0]) and 'timing' not in names(received[1])
+        timing = next(e['args'][0] for e in received[0] if e['name'] == 'timing')
+        assert timing['sessions'] == 2
+    finally:
+        first.disconnect()
+        second.disconnect()
+
+
+@pytest.fixture
+def submitted(app_module, monkeypatch):
+    """Futures of the jobs the app submits during the test, in order."""
+    futures = []
+    submit_job = app_module.submit_job
+
+    def recording(*args):
+        futures.append(submit_job(*args))
+        return futures[-1]
+
+    monkeypatch.setattr(app_module, 'submit_job', recording)
+    return futures
+
+
+def wait_until(app_module, condition, timeout=120):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError(f"Condition not met within {timeout}s")
+        app_module.socketio.sleep(0.05)
+
+
+def test_cancel_process_data_stops_the_worker_at_its_next_checkpoint(app_module, submitted):
+    from jobControl import JobCancelled
+    before = app_module.process_calls.stats()
+    client = app_module.socketio.test_client(app_module.app)
+    # Keep the only worker busy so the job is handed to it but cannot reach its first stage yet
+    blocker = app_module.job_executor.submit(time.sleep, 2)
+    try:
+        client.emit('process_data', {'target_column': 'pH'})
+        job, = submitted
+        wait_until(app_module, job.running)
+
+        client.emit('cancel_process_data')
+        wait_until(app_module, job.done)
+
+        assert isinstance(job.exception(), JobCancelled)
+        assert app_module.process_calls.stats()['cancelled'] - before['cancelled'] == 1
+        app_module.socketio.sleep(0.2)
+        events = client.get_received()
+        assert any(e['name'] == 'progress' and e['args'][0]['stage'] == 'cancelled' for e in events)
+        assert 'new_plot' not in names(events)
+    finally:
+        blocker.result()
+        client.disconnect()
+
+
+def test_a_new_request_from_the_same_session_stops_the_one_it_supersedes(app_module, submitted):
+    from jobControl import JobCancelled
+    before = app_module.process_calls.stats()
+    client = app_module.socketio.test_client(app_module.app)
+    blocker = app_module.job_executor.submit(time.sleep, 2)
+    try:
+        client.emit('process_data', {'target_column': 'pH'})
+        wait_until(app_module, submitted[0].running)
+        client.emit('process_data', {'target_column': 'Zn ppm'})
+
+        events, = wait_for(app_module, [client], 'new_plot')
+
+        superseded, current = submitted
+        assert isinstance(superseded.exception(), JobCancelled)
+        assert current.exception() is None
+        assert [e['args'][0]['column'] for e in events if e['name'] == 'new_plot'] == ['Zn ppm']
+        assert app_module.process_calls.stats()['cancelled'] - before['cancelled'] == 1
+    finally:
+        blocker.result()
+        client.disconnect()
+
+
+def test_streamed_dataset_matches_the_full_dataset_event(app_module):
+    client = app_module.socketio.test_client(app_module.app)
+    try:
+        client.emit('request_full_dataset')
+        full = next(e['args'][0] for e in client.get_received() if e['name'] == 'full_dataset')
+        client.emit('request_full_dataset', {'stream': True, 'chunk_size': 300})
+        events = client.get_received()
+    finally:
+        client.disconnect()
+
+    assert names(events) == ['full_dataset_start'] + ['full_dataset_chunk'] * 3 + ['full_dataset_end']
+    start, *chunks, end = [e['args'][0] for e in events]
+    assert start['rows'] == end['rows'] == len(full['data']) and end['chunks'] == 3
+    streamed = {column: sum((chunk['columns'][column] for chunk in chunks), []) for column in start['columns']}
+    assert [dict(zip(streamed, row)) for row in zip(*streamed.values())] == full['data']
+
+
+def test_process_all_columns_forecasts_every_mineral_column(app_module, soil_frame):
+    client = app_module.socketio.test_client(app_module.app)
+    try:
+        client.emit('process_data', {'process_all_columns': True, 'target_column': 'pH'})
+        events, = wait_for(app_module, [client], 'column_forecasts')
+    finally:
+        client.disconnect()
+
+    forecasts = next(e['args'][0] for e in events if e['name'] == 'column_forecasts')['forecasts']
+    assert sorted(forecasts) == sorted(' '.join(c.split()) for c in soil_frame.columns if c != 'ID')
+    mae = next(e['args'][0] for e in events if e['name'] == 'model_mae')['mae']
+    assert mae == forecasts['pH']['accuracy']
+    assert 'SustainabilityGraph' in names(events)
+
+
+def test_results_are_sent_before_the_streamed_analysis(app_module):
+    from sustainabilityAnalysis import STUB_ANALYSIS
+    client = app_module.socketio.test_client(app_module.app)
+    events = []
+
+    def done():
+        events.extend(client.get_received())
+        return any(e['name'] == 'progress' and e['args'][0]['stage'] == 'done' for e in events)
+
+    try:
+        client.emit('process_data', {'target_column': 'Mn ppm'})
+        wait_until(app_module, done)
+    finally:
+        client.disconnect()
+
+    analysis = [i for i, e in enumerate(events)
+                if e['name'] == 'console_output' and e['args'][0].get('stream') == 'analysis']
+    assert names(events).index('new_plot') < analysis[0]
+    updates = [events[i]['args'][0] for i in analysis]
+    assert [update['status'] for update in updates][-1] == 'complete'
+    assert ''.join(update['delta'] for update in updates) == STUB_ANALYSIS
+    assert updates[-1]['message'].endswith(STUB_ANALYSIS)
+
+
+def test_request_range_decimates_dataset_and_plot_series(app_module, soil_frame):
+    client = app_module.socketio.test_client(app_module.app)
+
+    def range_data(options):
+        client.emit('request_range', options)
+        event = client.get_received()[-1]
+        return event['args'][0] if event['name'] == 'range_data' else event['args'][0]['message']
+
+    try:
+        assert range_data({'source': 'plot'}).startswith('No plot to query yet')
+        assert range_data({'columns': ['Unobtainium']}) == 'Columns not found in dataset: Unobtainium'
+        assert range_data({'source': 'pixels'}).startswith("Unknown range source 'pixels'")
+
+        dataset = range_data({'columns': ['pH'], 'width': 50})
+        assert dataset['rows'] == len(soil_frame) and dataset['level'] > 0
+        assert len(dataset['series']['pH']['index']) <= 4 * 50 + 4
+        assert max(dataset['series']['pH']['values']) == pytest.approx(soil_frame['pH'].max())
+
+        client.emit('process_data', {'target_column': 'pH'})
+        wait_for(app_module, [client], 'new_plot')
+        plot = range_data({'source': 'plot', 'series': ['actual'], 'start': 10, 'stop': 20})
+        assert plot['column'] == 'pH' and plot['level'] == 0
+        assert plot['series']['actual']['index'] == list(range(10, 20))
+    finally:
+        client.disconnect()
+
+
+def test_timing_event_and_metrics_cover_the_pipeline_stages(app_module):
+    client = app_module.socketio.test_client(app_module.app)
+    try:
+        client.emit('process_data', {'target_column': 'Zn ppm', 'timing': True})
+        events, = wait_for(app_module, [client], 'timing')
+    finally:
+        client.disconnect()
+
+    breakdown = next(e['args'][0] for e in events if e['name'] == 'timing')
+    stages = [stage['stage'] for stage in breakdown['stages']]
+    assert breakdown['targetColumn'] == 'Zn ppm' and breakdown['sessions'] == 1
+    assert {'queue', 'load', 'model', 'emit'} <= set(stages)
+    assert breakdown['totalMs'] == pytest.approx(sum(stage['ms'] for stage in breakdown['stages']), abs=0.01)
+
+    metrics = app_module.app.test_client().get('/metrics')
+    assert metrics.mimetype == 'text/plain'
+    assert 'process_data_stage_seconds_count{stage="model"}' in metrics.get_data(as_text=True)
+
+
+def test_timing_event_and_metrics_cover_the_all_columns_mode(app_module, soil_frame):
+    client = app_module.socketio.test_client(app_module.app)
+    try:
+        client.emit('process_data', {'process_all_columns': True, 'target_column': 'pH', 'timing': True})
+        events, = wait_for(app_module, [client], 'timing')
+    finally:
+        client.disconnect()
+
+    breakdown = next(e['args'][0] for e in events if e['name'] == 'timing')
+    assert [stage['stage'] for stage in breakdown['stages']] == ['load_data', 'weights', 'job', 'scores', 'emit']
+    assert sum(worker['columns'] for worker in breakdown['workers']) == len(soil_frame.columns) - 1
+    assert {stage['stage'] for worker in breakdown['workers'] for stage in worker['stages']} == {'load', 'features',
+                                                                                                  'forecast'}
+
+    metrics = app_module.app.test_client().get('/metrics').get_data(as_text=True)
+    assert 'process_data_stage_seconds_count{mode="all_columns",stage="forecast"}' in metrics
+    assert 'process_data_stage_seconds_count{mode="all_columns",stage="job"}' in metrics
+
+
+def test_a_spawned_worker_reimporting_app_builds_no_server_state(tmp_path):
+    import json
+    import subprocess
+    import sys
+
+    probe = """
+import json, runpy, tempfile, eventlet.patcher
+before = set(__import__('os').listdir(tempfile.gettempdir()))
+module = runpy.run_path('app.py', run_name='__mp_main__')
+after = set(__import__('os').listdir(tempfile.gettempdir()))
+print(json.dumps({'patched': eventlet.patcher.is_monkey_patched('thread'),
+                  'state': [module[name] is None for name in ('dataset_cache', 'job_executor', 'job_board')],
+                  'new_job_dirs': sorted(d for d in after - before if d.startswith('jobs-'))}))
+"""
+    env = dict(os.environ, DATASET_SOURCE='local', DATASET_PATH=SOIL_CSV, WEIGHTS_PROVIDER='stub',
+               ANALYSIS_PROVIDER='stub', TMPDIR=str(tmp_path))
+    out = subprocess.run([sys.executable, '-c', probe], cwd=os.path.dirname(SOIL_CSV), env=env,
+                         capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == {'patched': False, 'state': [True, True, True],
+                                                               'new_job_dirs': []}
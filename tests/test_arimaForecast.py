@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ARIMAmodelPrediction
+from arimaForecast import ArimaForecaster, fit_series
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    return {'Mercury (%)': np.cumsum(rng.normal(size=120)) + 50, 'Zinc (%)': np.cumsum(rng.normal(size=120)) + 20}
+
+
+def test_forecasts_come_from_the_cached_fit(series):
+    forecaster = ArimaForecaster(max_workers=1)
+
+    first = forecaster.forecast(series, 'v1', steps=10)
+    longer = forecaster.forecast(series, 'v1', steps=25)
+
+    assert forecaster.stats()['fits'] == 2
+    assert {column: len(values) for column, values in longer.items()} == {'Mercury (%)': 25, 'Zinc (%)': 25}
+    np.testing.assert_allclose(longer['Zinc (%)'][:10], first['Zinc (%)'])
+    np.testing.assert_allclose(first['Zinc (%)'], fit_series(series['Zinc (%)']).forecast(steps=10))
+
+
+def test_appended_rows_extend_the_state_instead_of_refitting(series):
+    forecaster = ArimaForecaster(max_workers=1)
+    head = {'Zinc (%)': series['Zinc (%)'][:100]}
+    fitted = forecaster.results(head, 'v1')['Zinc (%)']
+
+    forecast = forecaster.forecast({'Zinc (%)': series['Zinc (%)']}, 'v2', steps=5)
+
+    stats = forecaster.stats()
+    assert stats['fits'] == 1 and stats['appends'] == 1
+    expected = fitted.append(series['Zinc (%)'][100:], refit=False).forecast(steps=5)
+    np.testing.assert_allclose(forecast['Zinc (%)'], expected)
+
+
+def test_changed_history_is_fitted_again(series):
+    forecaster = ArimaForecaster(max_workers=1)
+    forecaster.results({'Zinc (%)': series['Zinc (%)'][:100]}, 'v1')
+
+    edited = series['Zinc (%)'].copy()
+    edited[0] += 1
+    forecaster.results({'Zinc (%)': edited}, 'v2')
+
+    assert forecaster.stats()['fits'] == 2 and forecaster.stats()['appends'] == 0
+
+
+def test_parallel_fits_match_serial_ones(series):
+    forecaster = ArimaForecaster(max_workers=2)
+    try:
+        parallel = forecaster.forecast(series, 'v1', steps=5)
+    finally:
+        forecaster.shutdown()
+
+    for column, values in series.items():
+        np.testing.assert_allclose(parallel[column], fit_series(values).forecast(steps=5))
+
+
+def test_fits_survive_a_new_process_through_the_cache_dir(series, tmp_path):
+    ArimaForecaster(max_workers=1, cache_dir=str(tmp_path)).results(series, 'v1')
+
+    fresh = ArimaForecaster(max_workers=1, cache_dir=str(tmp_path))
+    fresh.results(series, 'v1')
+    assert fresh.stats()['fits'] == 0
+
+
+def test_apply_reuses_the_fitted_parameters(series):
+    forecaster = ArimaForecaster(max_workers=1)
+    fitted = forecaster.results({'Zinc (%)': series['Zinc (%)']}, 'v1')['Zinc (%)']
+
+    applied = forecaster.apply('Zinc (%)', 'v1', series['Mercury (%)'])
+
+    np.testing.assert_allclose(applied.params, fitted.params)
+    assert applied.nobs == len(series['Mercury (%)'])
+    with pytest.raises(Exception, match='No fitted ARIMA'):
+        forecaster.apply('Zinc (%)', 'v9', series['Mercury (%)'])
+
+
+def test_process_data_forecasts_the_requested_horizon(series, tmp_path, monkeypatch):
+    monkeypatch.setattr(ARIMAmodelPrediction, '_forecaster', ArimaForecaster(max_workers=1))
+    actual_file = tmp_path / 'actual.csv'
+    pd.DataFrame(dict(series, Date=pd.date_range('2024-01-01', periods=120))).to_csv(actual_file, index=False)
+    predicted_file = tmp_path / 'predicted.txt'
+    predicted_file.write_text("Forecast Forecast.1\n1.0 2.0\n")
+
+    result = ARIMAmodelPrediction.process_data(str(predicted_file), str(actual_file), horizon=7)
+
+    dates = [row['date'] for row in result['forecast']]
+    assert len(dates) == 7 and dates[0] == '2024-04-30' and dates[-1] == '2024-05-06'
+    assert len(result['mineralData']) == 127 and result['mineralData'][0]['mercuryForecast'] is None
+    assert result['mercuryPredicted'] == [1.0] and result['zincPredicted'] == [2.0]
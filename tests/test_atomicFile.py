@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from atomicFile import atomic_write
+
+
+def test_the_file_is_replaced_only_when_the_block_succeeds(tmp_path):
+    path = tmp_path / 'report.json'
+    path.write_text('old')
+
+    with pytest.raises(ValueError):
+        with atomic_write(str(path)) as f:
+            f.write('half')
+            raise ValueError()
+    assert path.read_text() == 'old'
+
+    with atomic_write(str(path)) as f:
+        f.write('new')
+    assert path.read_text() == 'new'
+    assert os.listdir(tmp_path) == ['report.json']
+
+
+def test_parent_directories_are_created_unless_disabled(tmp_path):
+    with atomic_write(str(tmp_path / 'a' / 'b.bin'), 'wb') as f:
+        f.write(b'\x00')
+    assert (tmp_path / 'a' / 'b.bin').read_bytes() == b'\x00'
+
+    with pytest.raises(FileNotFoundError):
+        with atomic_write(str(tmp_path / 'missing' / 'c.json'), makedirs=False):
+            pass
+    assert not (tmp_path / 'missing').exists()
+
+
+def test_a_failed_move_leaves_no_temp_file(tmp_path):
+    # A directory where the file should go makes os.replace fail
+    (tmp_path / 'target').mkdir()
+    with pytest.raises(OSError):
+        with atomic_write(str(tmp_path / 'target')) as f:
+            f.write('data')
+    assert os.listdir(tmp_path) == ['target']
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import batchPrediction
+from batchPrediction import evaluate_column, parse_args, prepare_target, run_batch
+
+
+@pytest.fixture
+def minerals(soil_frame):
+    return soil_frame.drop(columns=['ID'])
+
+
+def test_prepare_target_splits_the_windows_and_keeps_the_test_values(minerals):
+    data, actual = prepare_target(minerals, 'pH', look_back=50)
+
+    windows = len(data['features']) - 50
+    assert data['train'] == (int(windows * 0.6), int(windows * 0.9))
+    assert data['test'] == (int(windows * 0.9), windows)
+    assert actual.shape == (data['test'][1] - data['test'][0], 1)
+    assert data['features'].shape[1] == minerals.shape[1] + 1  # two features added, the target taken out
+
+
+def test_evaluate_column_reports_errors_instead_of_raising(minerals):
+    entry = evaluate_column(minerals, 'v1', 'Unobtainium', budget=1, threads=1)
+    assert entry['status'] == 'error' and entry['column'] == 'Unobtainium'
+
+
+def test_batch_writes_a_report_and_resumes_finished_columns(minerals, monkeypatch, tmp_path):
+    monkeypatch.setattr(batchPrediction, 'load_current_dataset', lambda: (minerals, 'v1'))
+    report_path = str(tmp_path / 'report.json')
+
+    report = run_batch(columns=['pH'], report_path=report_path, workers=1, budget=120)
+
+    entry = report['columns']['pH']
+    assert entry['status'] == 'ok' and entry['dataset_version'] == 'v1'
+    assert 'Linear Regression' in [r['model'] for r in entry['leaderboard'] if r['status'] == 'ok']
+    with open(report_path) as f:
+        assert json.load(f) == report
+
+    # A second run finds the column done for this version and leaves it alone
+    again = run_batch(columns=['pH'], report_path=report_path, workers=1, budget=120)
+    assert again['columns']['pH']['started'] == entry['started']
+
+    with pytest.raises(ValueError, match='Unobtainium'):
+        run_batch(columns=['Unobtainium'], report_path=report_path)
+
+
+def test_parse_args_defaults_to_the_interactive_mode():
+    assert not parse_args([]).batch
+    args = parse_args(['--batch', '--columns', 'pH, Zn ppm', '--no-resume'])
+    assert args.batch and args.columns == 'pH, Zn ppm' and args.no_resume
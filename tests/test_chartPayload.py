@@ -0,0 +1,44 @@
+import numpy as np
+
+from chartPayload import chart_buffer, chart_points, plot_format, plot_payload, plot_series
+
+import pytest
+
+
+def test_chart_points_sends_source_decimals_for_float32_history():
+    actual = np.array([5.16, 6.07], dtype=np.float32)
+    points = chart_points(actual, np.array([5.2, 6.0]), np.array([6.1]))
+    assert points == [
+        {'entry': 1, 'actual': 5.16, 'predicted': 5.2},
+        {'entry': 2, 'actual': 6.07, 'predicted': 6.0},
+        {'entry': 3, 'actual': None, 'predicted': 6.1},
+    ]
+
+
+def test_float32_buffer_and_points_decode_to_the_same_series():
+    actual, predicted, future = np.arange(5.0), np.arange(5.0) + 0.5, np.array([9.0, 10.0])
+    bands = {'lower': future - 1, 'upper': future + 1}
+    from_points = plot_series({'data': chart_points(actual, predicted, future, bands), 'column': 'pH'})
+    from_buffer = plot_series(chart_buffer('pH', actual, predicted, future, bands))
+    for name in ('actual', 'predicted', 'lower', 'upper'):
+        np.testing.assert_allclose(from_points[name], from_buffer[name])
+
+
+def test_plot_format_rejects_unknown_formats():
+    assert plot_format({}) == 'json'
+    with pytest.raises(Exception):
+        plot_format({'plot_format': 'png'})
+
+
+def test_float32_buffer_packs_the_series_back_to_back_in_little_endian():
+    payload = chart_buffer('pH', [1.0, 2.0, 3.0], [1.5, 2.5], [4.0])
+
+    assert payload['rows'] == 2 and payload['future'] == 1
+    assert payload['series'] == {'actual': {'offset': 0, 'length': 2}, 'predicted': {'offset': 8, 'length': 2},
+                                 'future': {'offset': 16, 'length': 1}}
+    np.testing.assert_array_equal(np.frombuffer(payload['buffer'], dtype='<f4'), [1.0, 2.0, 1.5, 2.5, 4.0])
+
+
+def test_plot_payload_picks_the_format():
+    assert plot_payload('pH', [1.0], [1.0], [2.0])['data'][1] == {'entry': 2, 'actual': None, 'predicted': 2.0}
+    assert plot_payload('pH', [1.0], [1.0], [2.0], fmt='float32')['encoding'] == 'float32'
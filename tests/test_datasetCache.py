@@ -0,0 +1,164 @@
+import threading
+
+import pytest
+
+from datasetCache import DatasetCache, appended_version, split_version
+from datasetSource import InMemoryDatasetSource
+
+CSV = "ID,pH,Zn ppm \n1,5.16,0.89\n2,6.07,3.66\n"
+NEW_CSV = "ID,pH,Zn ppm \n1,5.16,0.89\n2,6.07,3.66\n3,7.01,1.20\n"
+
+
+class CountingSource(InMemoryDatasetSource):
+    def __init__(self, data):
+        super().__init__(data)
+        self.fetches = 0
+
+    def fetch(self, if_none_match=None):
+        self.fetches += 1
+        return super().fetch(if_none_match)
+
+
+class SlowSource(CountingSource):
+    """Blocks every fetch after the first until ``release`` is set."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.fetching = threading.Event()
+        self.release = threading.Event()
+
+    def fetch(self, if_none_match=None):
+        if self.fetches:
+            self.fetching.set()
+            assert self.release.wait(5)
+        return super().fetch(if_none_match)
+
+
+def test_appended_version_round_trips():
+    assert appended_version('etag', 0) == 'etag'
+    assert appended_version('etag', 3) == 'etag+3'
+    assert split_version('etag+3') == ('etag', 3)
+    assert split_version('etag') == ('etag', 0)
+    # A '+' that is not followed by a row count is part of the source version
+    assert split_version('a+b') == ('a+b', 0)
+    assert split_version('+3') == ('+3', 0)
+
+
+@pytest.mark.parametrize('snapshots', [False, True])
+def test_revalidates_only_when_due_and_reloads_new_versions(tmp_path, snapshots):
+    source = CountingSource(CSV)
+    cache = DatasetCache(source, revalidate_interval=3600, snapshot_root=str(tmp_path) if snapshots else None)
+
+    df, version = cache.get(with_version=True)
+    assert df.columns.tolist() == ['ID', 'pH', 'Zn ppm']
+    assert len(df) == 2 and version == source.version()
+    cache.get()
+    assert source.fetches == 1
+
+    cache.invalidate()
+    cache.get()
+    assert source.fetches == 2  # not modified: the cached frame is kept
+
+    source.update(NEW_CSV)
+    cache.invalidate()
+    df, version = cache.get(with_version=True)
+    assert len(df) == 3 and version == source.version()
+
+
+def test_cold_start_maps_an_existing_snapshot_without_fetching(tmp_path):
+    DatasetCache(CountingSource(CSV), snapshot_root=str(tmp_path)).get()
+
+    source = CountingSource(CSV)
+    df = DatasetCache(source, snapshot_root=str(tmp_path)).get()
+
+    assert source.fetches == 0
+    assert df['ID'].tolist() == [1, 2]
+
+
+def test_serves_the_cached_copy_when_the_source_fails():
+    source = CountingSource(CSV)
+    cache = DatasetCache(source, revalidate_interval=3600)
+    cache.get()
+
+    def broken(if_none_match=None):
+        raise Exception("source down")
+    source.fetch = broken
+    cache.invalidate()
+
+    assert len(cache.get()) == 2
+
+
+def test_readers_are_not_blocked_while_a_revalidation_is_in_progress(tmp_path):
+    source = SlowSource(CSV)
+    cache = DatasetCache(source, revalidate_interval=3600, snapshot_root=str(tmp_path))
+    cache.get()
+    source.update(NEW_CSV)
+    cache.invalidate()
+
+    refresher = threading.Thread(target=cache.get)
+    refresher.start()
+    assert source.fetching.wait(5)
+
+    # The refresher is stuck in the source; readers still get the current copy
+    assert len(cache.get()) == 2
+
+    source.release.set()
+    refresher.join(5)
+    assert len(cache.get()) == 3
+
+
+def test_append_adds_rows_with_ids_and_a_new_version():
+    source = InMemoryDatasetSource(CSV)
+    cache = DatasetCache(source)
+
+    version = cache.append([{'pH': 5.5}, {'pH': 6.5, 'Zn ppm': 1.0}])
+
+    df = cache.get()
+    assert version == appended_version(source.version(), 2)
+    assert df['ID'].tolist() == [1, 2, 3, 4]
+    assert df['pH'].iloc[-1] == pytest.approx(6.5)
+    with pytest.raises(Exception):
+        cache.append([{'unknown': 1}])
+
+    # A new source version drops the appended rows
+    source.update(NEW_CSV)
+    cache.invalidate()
+    assert cache.get()['ID'].tolist() == [1, 2, 3]
+
+
+def test_appends_are_shared_through_the_snapshot_directory(tmp_path):
+    source = InMemoryDatasetSource(CSV)
+    first = DatasetCache(source, revalidate_interval=3600, snapshot_root=str(tmp_path))
+    second = DatasetCache(source, revalidate_interval=3600, snapshot_root=str(tmp_path))
+    first.get()
+    second.get()
+
+    first.append([{'pH': 5.5}])
+    assert second.append([{'pH': 6.5}]) == appended_version(source.version(), 2)
+
+    # Each sees the other's rows, in append order and with distinct IDs
+    for cache in (first, second):
+        df, version = cache.get(with_version=True)
+        assert version == appended_version(source.version(), 2)
+        assert df['ID'].tolist() == [1, 2, 3, 4]
+        assert df['pH'].tolist()[2:] == pytest.approx([5.5, 6.5])
+    assert sorted(p.name for p in tmp_path.rglob('appended-*.pkl')) == ['appended-000000000000-1.pkl',
+                                                                         'appended-000000000001-1.pkl']
+    # A restarted process picks the appended rows up with the snapshot
+    assert len(DatasetCache(source, snapshot_root=str(tmp_path)).get()) == 4
+
+    source.update(NEW_CSV)
+    first.invalidate()
+    assert first.get(with_version=True)[1] == source.version()
+
+
+def test_callers_writing_to_their_copy_do_not_change_the_cache():
+    cache = DatasetCache(InMemoryDatasetSource(CSV))
+
+    df = cache.get()
+    df.loc[0, 'pH'] = 99.0
+    df['new'] = 1
+
+    fresh = cache.get()
+    assert fresh['pH'].iloc[0] == pytest.approx(5.16)
+    assert 'new' not in fresh.columns
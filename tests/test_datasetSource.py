@@ -0,0 +1,93 @@
+import io
+import os
+
+import pytest
+from botocore.exceptions import ClientError
+
+from datasetSource import (InMemoryDatasetSource, LocalFileDatasetSource, S3DatasetSource,
+                           dataset_source_from_env)
+
+CSV = b"ID,pH\n1,5.16\n"
+
+
+class FakeS3Client:
+    """get_object/head_object over one in-memory object with an ETag."""
+
+    def __init__(self, data=CSV, etag='"v1"'):
+        self.data = data
+        self.etag = etag
+        self.requests = []
+
+    def get_object(self, **request):
+        self.requests.append(request)
+        if request.get('IfNoneMatch') == self.etag:
+            raise ClientError({'Error': {'Code': '304'}}, 'GetObject')
+        return {'Body': io.BytesIO(self.data), 'ETag': self.etag}
+
+    def head_object(self, **request):
+        raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+
+
+def test_local_file_is_versioned_by_size_and_mtime(tmp_path):
+    path = tmp_path / 'soil.csv'
+    path.write_bytes(CSV)
+    source = LocalFileDatasetSource(str(path))
+
+    obj = source.fetch()
+    assert obj.body.read() == CSV
+    obj.body.close()
+    assert source.fetch(if_none_match=obj.version) is None
+
+    path.write_bytes(CSV + b"2,6.07\n")
+    os.utime(path, ns=(0, 10 ** 9))
+    assert source.version() != obj.version
+
+
+def test_local_file_reports_a_missing_file(tmp_path):
+    with pytest.raises(Exception, match='not found'):
+        LocalFileDatasetSource(str(tmp_path / 'missing.csv')).version()
+
+
+def test_in_memory_source_bumps_its_version_on_update():
+    source = InMemoryDatasetSource(CSV)
+    version = source.version()
+    assert source.fetch(if_none_match=version) is None
+
+    source.update(CSV.decode() + "2,6.07\n")
+    obj = source.fetch(if_none_match=version)
+    assert obj.version != version and obj.body.read().endswith(b"6.07\n")
+
+
+def test_s3_source_sends_the_cached_etag_and_treats_304_as_not_modified():
+    client = FakeS3Client()
+    created = []
+    source = S3DatasetSource('bucket', 'soil.csv', client_factory=lambda: created.append(1) or client)
+    assert created == []  # the client is only made on first use
+
+    obj = source.fetch()
+    assert obj.version == '"v1"' and obj.body.read() == CSV
+    assert source.fetch(if_none_match='"v1"') is None
+
+    assert created == [1]
+    assert client.requests[-1] == {'Bucket': 'bucket', 'Key': 'soil.csv', 'IfNoneMatch': '"v1"'}
+
+
+def test_s3_errors_name_the_missing_object():
+    source = S3DatasetSource('bucket', 'soil.csv', client=FakeS3Client())
+    with pytest.raises(Exception, match="File 'soil.csv' not found"):
+        source.version()
+
+
+def test_source_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv('DATASET_SOURCE', 'local')
+    monkeypatch.setenv('DATASET_PATH', str(tmp_path / 'soil.csv'))
+    assert isinstance(dataset_source_from_env(), LocalFileDatasetSource)
+
+    monkeypatch.setenv('DATASET_SOURCE', 'S3')
+    monkeypatch.setenv('DATASET_KEY', 'other.csv')
+    source = dataset_source_from_env(client_factory=FakeS3Client)
+    assert isinstance(source, S3DatasetSource) and source.file_key == 'other.csv'
+
+    monkeypatch.setenv('DATASET_SOURCE', 'ftp')
+    with pytest.raises(Exception, match='Unknown DATASET_SOURCE'):
+        dataset_source_from_env()
@@ -0,0 +1,47 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datasetStream import MAX_CHUNK_SIZE, dataset_header, iter_dataset_chunks, stream_options
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'ID': np.arange(1, 8),
+        'pH': np.array([5.16, 6.07, np.nan, 7.0, 7.5, 8.1, 6.6], dtype=np.float32)
+    })
+
+
+def test_stream_options_clamp_the_chunk_size_and_compression_implies_binary():
+    assert stream_options(None) == {'chunk_size': 500, 'binary': False, 'compress': False}
+    assert stream_options({'chunk_size': 0})['chunk_size'] == 1
+    assert stream_options({'chunk_size': 10 ** 9})['chunk_size'] == MAX_CHUNK_SIZE
+    assert stream_options({'compress': True}) == {'chunk_size': 500, 'binary': True, 'compress': True}
+
+
+def test_header_counts_the_chunks(frame):
+    header = dataset_header(frame, chunk_size=3, binary=True, compress=False, version='v1')
+    assert header['chunks'] == 3 and header['rows'] == 7
+    assert header['encoding'] == 'float32' and header['compression'] is None
+
+
+def test_json_chunks_cover_every_row_once_with_nan_as_zero(frame):
+    chunks = list(iter_dataset_chunks(frame, chunk_size=3))
+
+    assert [(c['index'], c['start'], c['stop']) for c in chunks] == [(0, 0, 3), (1, 3, 6), (2, 6, 7)]
+    assert sum((c['columns']['ID'] for c in chunks), []) == list(range(1, 8))
+    assert sum((c['columns']['pH'] for c in chunks), [])[:3] == [5.16, 6.07, 0]
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_binary_chunks_decode_to_the_float32_columns(frame, compress):
+    decoded = {column: [] for column in frame.columns}
+    for chunk in iter_dataset_chunks(frame, chunk_size=4, binary=True, compress=compress):
+        for column, buffer in chunk['columns'].items():
+            decoded[column].append(np.frombuffer(zlib.decompress(buffer) if compress else buffer, dtype='<f4'))
+
+    np.testing.assert_array_equal(np.concatenate(decoded['pH']), np.nan_to_num(frame['pH'].to_numpy()))
+    np.testing.assert_array_equal(np.concatenate(decoded['ID']), frame['ID'].to_numpy(dtype=np.float32))
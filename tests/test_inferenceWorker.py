@@ -0,0 +1,119 @@
+import io
+import json
+import socket
+import threading
+
+import pytest
+
+import inferenceWorker
+from inferenceWorker import InferenceWorker, WorkerBusy, WorkerError, call_worker, request
+
+release = threading.Event()
+
+
+def blocking_task(value):
+    assert release.wait(5)
+    return value
+
+
+@pytest.fixture(autouse=True)
+def tasks(monkeypatch):
+    """Light tasks in place of newAI1 and ARIMA, which need TensorFlow and statsmodels."""
+    monkeypatch.setattr(inferenceWorker, 'TASKS', {
+        'dumps': ('json', 'dumps'),
+        'loads': ('json', 'loads'),
+        'block': (__name__, 'blocking_task')
+    })
+    release.clear()
+    yield
+    release.set()
+
+
+def test_run_returns_results_and_errors_by_id():
+    worker = InferenceWorker()
+    assert worker.run({'id': 1, 'task': 'dumps', 'args': {'obj': [1, 2]}}) == {'id': 1, 'result': '[1, 2]'}
+    assert 'error' in worker.run({'id': 2, 'task': 'loads', 'args': {'s': '{'}})
+    assert worker.run({'id': 3, 'task': 'newAI2'}) == {'id': 3, 'error': "Unknown task 'newAI2'"}
+
+
+def test_stdio_answers_every_line_including_bad_ones():
+    stdin = io.StringIO('{"id": "a", "task": "dumps", "args": {"obj": 5}}\n\nnot json\n')
+    stdout = io.StringIO()
+
+    InferenceWorker().serve_stdio(stdin, stdout)
+
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert len(responses) == 2 and {'id': 'a', 'result': '5'} in responses
+    error = next(response for response in responses if 'error' in response)
+    assert error['id'] is None and error['error'].startswith('Invalid JSON request')
+
+
+def test_requests_beyond_the_queue_are_answered_busy_right_away():
+    worker = InferenceWorker(max_concurrency=1, max_queue=0)
+    responses = []
+
+    worker.submit(json.dumps({'id': 1, 'task': 'block', 'args': {'value': 'done'}}), responses.append)
+    worker.submit(json.dumps({'id': 2, 'task': 'dumps', 'args': {'obj': 1}}), responses.append)
+    assert responses == [{'id': 2, 'busy': True, 'error': 'Worker is busy: 1 requests already queued or running'}]
+
+    release.set()
+    worker._pool.shutdown(wait=True)
+    assert responses[1] == {'id': 1, 'result': 'done'}
+
+
+def test_socket_worker_serves_requests_and_clients_fall_back_without_one(tmp_path, monkeypatch):
+    path = str(tmp_path / 'inference.sock')
+    server = threading.Thread(target=InferenceWorker().serve_socket, args=(path,), daemon=True)
+    server.start()
+    monkeypatch.setenv('INFERENCE_SOCKET', path)
+    for _ in range(100):
+        try:
+            assert request('dumps', {'obj': {'a': 1}}, path, timeout=5) == '{"a": 1}'
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            threading.Event().wait(0.05)
+    else:
+        pytest.fail("Worker did not start listening")
+
+    with pytest.raises(WorkerError):
+        request('loads', {'s': '{'}, path, timeout=5)
+    assert call_worker('dumps', {'obj': 2}, local=lambda: 'local') == '2'
+
+    monkeypatch.setenv('INFERENCE_SOCKET', str(tmp_path / 'nobody.sock'))
+    assert call_worker('dumps', {'obj': 2}, local=lambda: 'local') == 'local'
+    monkeypatch.delenv('INFERENCE_SOCKET')
+    assert call_worker('dumps', {'obj': 2}, local=lambda: 'local') == 'local'
+
+
+def listening_socket(path, reply=None):
+    """A Unix socket that accepts connections and answers each with ``reply`` and a close; None never answers."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    if reply is not None:
+        def answer():
+            conn, _ = server.accept()
+            with conn:
+                conn.sendall(reply)
+        threading.Thread(target=answer, daemon=True).start()
+    return server
+
+
+@pytest.mark.parametrize('reply', [None, b'', b'not json\n', b'{"id": 1, "busy": true, "error": "Worker is busy"}\n'])
+def test_clients_run_locally_when_the_worker_cannot_take_the_request(tmp_path, monkeypatch, reply):
+    path = str(tmp_path / 'inference.sock')
+    monkeypatch.setenv('INFERENCE_SOCKET', path)
+    monkeypatch.setenv('INFERENCE_TIMEOUT', '0.2')
+
+    with listening_socket(path, reply):
+        assert call_worker('dumps', {'obj': 2}, local=lambda: 'local') == 'local'
+
+
+def test_task_errors_are_not_retried_locally(tmp_path, monkeypatch):
+    path = str(tmp_path / 'inference.sock')
+    monkeypatch.setenv('INFERENCE_SOCKET', path)
+
+    with listening_socket(path, b'{"id": 1, "error": "bad input"}\n'):
+        with pytest.raises(WorkerError, match='bad input') as raised:
+            call_worker('dumps', {'obj': 2}, local=lambda: 'local')
+    assert not isinstance(raised.value, WorkerBusy)
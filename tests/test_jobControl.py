@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from jobControl import JobBoard, JobCancelled, JobTimeout
+from stageTimings import Timings
+
+
+@pytest.fixture
+def board():
+    board = JobBoard()
+    yield board
+    board.close()
+
+
+def test_checkpoints_report_the_stage_now_running(board):
+    job = board.start()
+    assert board.progress(job.job_id) is None
+
+    job.checkpoint('load')
+    job.checkpoint('features')
+
+    assert board.progress(job.job_id) == {'stage': 'features', 'step': 2}
+
+
+def test_a_cancelled_job_stops_at_its_next_checkpoint(board):
+    job = board.start()
+    job.checkpoint('load')
+
+    board.cancel(job.job_id)
+
+    with pytest.raises(JobCancelled):
+        job.checkpoint('features')
+    assert board.progress(job.job_id) == {'stage': 'load', 'step': 1}
+
+
+def test_a_job_past_its_deadline_stops_at_its_next_checkpoint(board):
+    job = board.start(timeout=60)
+    job.checkpoint('load')
+
+    job.deadline -= 120
+
+    with pytest.raises(JobTimeout, match="before stage 'features'"):
+        job.checkpoint('features')
+    assert board.start().deadline is None
+
+
+def test_timings_do_not_run_a_stage_whose_checkpoint_raises(board):
+    job = board.start()
+    timings = Timings(on_stage=job.checkpoint)
+    ran = []
+
+    with timings.span('load'):
+        ran.append('load')
+    board.cancel(job.job_id)
+    with pytest.raises(JobCancelled):
+        with timings.span('features'):
+            ran.append('features')
+
+    assert ran == ['load']
+    assert [stage for stage, _ in timings] == ['load']
+
+
+def test_discarded_jobs_leave_no_files_and_ignore_late_cancels(board):
+    job = board.start()
+    job.checkpoint('load')
+    board.cancel(job.job_id)
+
+    board.discard(job.job_id)
+    board.cancel(job.job_id)
+
+    assert os.listdir(board.state_dir) == []
+    assert board.progress(job.job_id) is None
+
+
+def test_close_only_removes_a_directory_the_board_made(tmp_path):
+    owned = JobBoard()
+    owned.close()
+    assert not os.path.exists(owned.state_dir)
+
+    shared = JobBoard(str(tmp_path / 'jobs'))
+    shared.close()
+    assert os.path.isdir(shared.state_dir)
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pytest
+
+from jobExecutor import JobExecutor, JobRejected, JobTimeout
+
+
+@pytest.fixture
+def executor():
+    executor = JobExecutor(max_workers=1, max_queue=8)
+    yield executor
+    executor.shutdown()
+
+
+def test_results_cancels_jobs_not_started_when_poll_raises(executor):
+    futures = [executor.submit(time.sleep, 1.0)] + [executor.submit(time.sleep, 0) for _ in range(4)]
+
+    def poll():
+        raise RuntimeError("client went away")
+
+    with pytest.raises(RuntimeError):
+        executor.results(futures, poll=poll, interval=0.05)
+
+    # The running job finishes on its own; the ones still queued never start
+    assert not futures[0].cancelled()
+    assert futures[-1].cancelled()
+    assert futures[0].result() is None
+
+
+def test_submit_rejects_jobs_beyond_the_queue_and_frees_slots_as_jobs_end():
+    executor = JobExecutor(max_workers=1, max_queue=1)
+    try:
+        running = [executor.submit(time.sleep, 0.5), executor.submit(time.sleep, 0)]
+        with pytest.raises(JobRejected):
+            executor.submit(time.sleep, 0)
+        assert executor.stats()['pending'] == 2
+
+        executor.results(running)
+        assert executor.result(executor.submit(abs, -3)) == 3
+    finally:
+        executor.shutdown()
+
+
+def test_jobs_past_their_time_limit_raise_job_timeout(executor):
+    with pytest.raises(JobTimeout):
+        executor.result(executor.submit(time.sleep, 1.0), timeout=0.1)
+
+    futures = [executor.submit(time.sleep, 1.0)] + [executor.submit(time.sleep, 0) for _ in range(4)]
+    with pytest.raises(JobTimeout):
+        executor.results(futures, timeout=0.1)
+    assert futures[-1].cancelled()
+
+
+def test_initializer_given_by_name_runs_in_each_worker(tmp_path):
+    executor = JobExecutor(max_workers=1, initializer='os:chdir', initargs=(str(tmp_path),))
+    try:
+        assert executor.result(executor.submit(os.getcwd)) == str(tmp_path)
+    finally:
+        executor.shutdown()
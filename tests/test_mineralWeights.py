@@ -0,0 +1,95 @@
+import json
+import threading
+
+import pytest
+
+from mineralWeights import StubWeightsProvider, WeightsCache, parse_weights, uniform_weights
+
+COLUMNS = ['pH', 'Zn ppm', 'K ppm ']
+
+
+class CountingProvider:
+    def __init__(self, reply=None, release=None):
+        self.reply = reply
+        self.release = release
+        self.calls = 0
+
+    def fetch(self, columns):
+        self.calls += 1
+        if self.release is not None:
+            assert self.release.wait(5)
+        return self.reply or StubWeightsProvider().fetch(columns)
+
+
+def test_parse_weights_accepts_a_literal_dict_in_prose():
+    reply = "Sure! Here you go:\n{'pH': 0.8, 'K ppm': 1, 'Gold': 0.5}\nHope that helps."
+    assert parse_weights(reply, COLUMNS) == {'pH': 0.8, 'K ppm ': 1.0}
+
+
+@pytest.mark.parametrize('reply', [
+    "no dictionary here",
+    '{"pH": 1.5}',
+    '{"pH": true}',
+    '{"pH": "0.5"}',
+    '{"Gold": 0.5}',
+    "{'pH': __import__('os').getpid()}",
+])
+def test_parse_weights_rejects_anything_but_known_weights_in_range(reply):
+    with pytest.raises(ValueError):
+        parse_weights(reply, COLUMNS)
+
+
+def test_weights_are_cached_per_column_set_and_persisted(tmp_path):
+    path = str(tmp_path / 'weights.json')
+    provider = CountingProvider()
+    cache = WeightsCache(provider, path=path)
+
+    weights = cache.get(COLUMNS)
+    assert cache.get(reversed(COLUMNS)) == weights
+    assert provider.calls == 1
+
+    restarted = CountingProvider()
+    assert WeightsCache(restarted, path=path).get(COLUMNS) == weights
+    assert restarted.calls == 0
+
+
+def test_expired_entries_are_fetched_again(tmp_path):
+    provider = CountingProvider()
+    cache = WeightsCache(provider, ttl=0)
+    cache.get(COLUMNS)
+    cache.get(COLUMNS)
+    assert provider.calls == 2
+
+
+def test_bad_replies_fall_back_to_uniform_weights_without_caching_them():
+    provider = CountingProvider(reply='{"pH": 7}')
+    cache = WeightsCache(provider)
+
+    assert cache.get(COLUMNS) == uniform_weights(COLUMNS)
+    cache.get(COLUMNS)
+    assert provider.calls == 2
+
+
+def test_concurrent_requests_share_one_fetch():
+    release = threading.Event()
+    provider = CountingProvider(release=release)
+    cache = WeightsCache(provider)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get(COLUMNS))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert provider.calls == 1
+    assert len(results) == 5 and all(result == results[0] for result in results)
+
+
+def test_unreadable_cache_files_are_ignored(tmp_path):
+    path = tmp_path / 'weights.json'
+    path.write_text('{not json')
+    cache = WeightsCache(CountingProvider(), path=str(path))
+    weights = cache.get(COLUMNS)
+    assert json.loads(path.read_text())[WeightsCache.key(COLUMNS)]['weights'] == weights
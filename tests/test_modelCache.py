@@ -0,0 +1,80 @@
+import os
+import shutil
+
+from modelCache import ModelCache
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = ModelCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['misses'] == 1 and stats['size'] == 2
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    ModelCache(cache_dir=str(tmp_path)).put('k', {'model': [1, 2, 3]})
+
+    fresh = ModelCache(cache_dir=str(tmp_path))
+    assert fresh.get('k') == {'model': [1, 2, 3]}
+    assert fresh.stats()['disk_hits'] == 1
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+
+def test_put_recreates_a_removed_cache_dir(tmp_path):
+    cache_dir = tmp_path / 'models'
+    cache = ModelCache(cache_dir=str(cache_dir))
+    shutil.rmtree(cache_dir)
+
+    cache.put('k', 42)
+
+    assert cache.get('k') == 42
+    assert ModelCache(cache_dir=str(cache_dir)).get('k') == 42
+
+
+def test_put_falls_back_to_memory_when_the_disk_tier_fails(tmp_path):
+    # A regular file where the directory should be makes every disk write fail
+    blocker = tmp_path / 'models'
+    blocker.write_text('not a directory')
+    cache = ModelCache(cache_dir=str(blocker))
+
+    cache.put('k', 42)
+
+    assert cache.get('k') == 42
+
+
+def test_unreadable_disk_entries_are_misses(tmp_path):
+    cache = ModelCache(cache_dir=str(tmp_path))
+    (tmp_path / f"{'k'}.joblib").write_bytes(b'garbage')
+    assert cache.get('k') is None
+    assert ModelCache.key('v1', 'pH', {'a': 1}) == ModelCache.key('v1', 'pH', {'a': 1})
+    assert ModelCache.key('v1', 'pH', {'a': 1}) != ModelCache.key('v2', 'pH', {'a': 1})
+
+
+def test_disk_tier_evicts_the_least_recently_used_files_past_its_limit(tmp_path):
+    cache = ModelCache(cache_dir=str(tmp_path), max_disk_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    os.utime(tmp_path / 'a.joblib', (1, 1))
+    os.utime(tmp_path / 'b.joblib', (2, 2))
+    # Loading 'a' from disk makes it the most recently used file
+    assert ModelCache(cache_dir=str(tmp_path)).get('a') == 1
+
+    cache.put('c', 3)
+
+    assert sorted(os.listdir(tmp_path)) == ['a.joblib', 'c.joblib']
+    assert cache.stats()['disk_evictions'] == 1
+
+
+def test_disk_tier_byte_limit_keeps_the_entry_just_written(tmp_path):
+    cache = ModelCache(cache_dir=str(tmp_path), max_disk_bytes=1)
+    cache.put('a', list(range(1000)))
+    cache.put('b', list(range(1000)))
+
+    assert os.listdir(tmp_path) == ['b.joblib']
+    assert ModelCache(cache_dir=str(tmp_path)).get('b') == list(range(1000))
@@ -0,0 +1,131 @@
+import json
+import os
+
+import pytest
+
+import modelRegistry
+from modelRegistry import MANIFEST_FILE, WEIGHTS_FILE, ModelRegistry, trial_index
+
+
+def write_trial(tuner_dir, trial_id, score, input_shape=(30, 16), status='COMPLETED', weights=True, units=64):
+    trial_dir = tuner_dir / f"trial_{trial_id}"
+    trial_dir.mkdir(parents=True)
+    (trial_dir / 'trial.json').write_text(json.dumps({
+        'trial_id': trial_id,
+        'hyperparameters': {'values': {'units': units, 'dropout': 0.2, 'lr': 0.001}},
+        'metrics': {'metrics': {'val_loss': {'direction': 'min'}}},
+        'score': score,
+        'status': status
+    }))
+    (trial_dir / 'build_config.json').write_text(json.dumps({'input_shape': [None, *input_shape]}))
+    if weights:
+        (trial_dir / WEIGHTS_FILE).write_bytes(b'weights')
+
+
+class FakeModel:
+    """Stands in for the Keras model build_model() returns; records what happened to it."""
+
+    def __init__(self, hyperparameters, input_shape):
+        self.hyperparameters = hyperparameters
+        self.input_shape = tuple(input_shape)
+        self.weights = None
+
+    def load_weights(self, path):
+        self.weights = path
+
+    def get_weights(self):
+        return self.weights
+
+    def set_weights(self, weights):
+        self.weights = weights
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            f.write(str(self.weights))
+
+
+@pytest.fixture
+def tuner_dir(tmp_path):
+    tuner_dir = tmp_path / 'tuner'
+    write_trial(tuner_dir, '0001', 0.30, units=128)
+    write_trial(tuner_dir, '0002', 0.10)
+    write_trial(tuner_dir, '0003', 0.05, weights=False)
+    write_trial(tuner_dir, '0004', 0.01, status='FAILED')
+    write_trial(tuner_dir, '0005', 0.20, input_shape=(50, 16), units=256)
+    (tuner_dir / 'trial_0006').mkdir()
+    (tuner_dir / 'trial_0006' / WEIGHTS_FILE).write_bytes(b'weights')
+    (tuner_dir / 'trial_0006' / 'trial.json').write_text('{truncated')
+    return tuner_dir
+
+
+@pytest.fixture
+def registry(tuner_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(modelRegistry, 'build_model', FakeModel)
+    return ModelRegistry(tuner_dir=str(tuner_dir), registry_dir=str(tmp_path / 'registry'))
+
+
+def test_trial_index_lists_completed_trials_with_weights_best_first(tuner_dir):
+    trials = trial_index(str(tuner_dir))
+
+    assert [t['trial_id'] for t in trials] == ['0002', '0005', '0001']
+    assert trials[0]['input_shape'] == (30, 16) and trials[0]['hyperparameters']['units'] == 64
+    assert trial_index(str(tuner_dir / 'missing')) == []
+
+
+def test_best_trial_matches_the_input_shape(registry):
+    assert registry.best_trial()['trial_id'] == '0002'
+    assert registry.best_trial((50, 16))['trial_id'] == '0005'
+    assert registry.best_trial((7, 2)) is None
+
+
+def test_schema_names_are_normalized():
+    assert ModelRegistry.schema(['K ppm ', 'pH'], ' pH', 30) == {'features': ['K ppm', 'pH'], 'target': 'pH',
+                                                                  'look_back': 30}
+    assert ModelRegistry.key({'a': 1}, 'v1') != ModelRegistry.key({'a': 1}, 'v2')
+
+
+def test_first_version_is_served_from_the_tuner_without_training(registry, tuner_dir):
+    schema = ModelRegistry.schema([f"f{i}" for i in range(16)], 'pH', 30)
+    trained = []
+
+    model, entry = registry.model_for(schema, 'v1', lambda model, warm: trained.append(warm))
+
+    assert trained == []
+    assert entry['source'] == 'tuner' and entry['trial_id'] == '0002'
+    assert model.weights == str(tuner_dir / 'trial_0002' / WEIGHTS_FILE)
+    assert registry.model_for(schema, 'v1', None)[0] is model
+
+    # Another process finds it in the manifest
+    fresh = ModelRegistry(tuner_dir=registry.tuner_dir, registry_dir=registry.registry_dir)
+    assert fresh.model_for(schema, 'v1', None)[1]['trial_id'] == '0002'
+
+
+def test_new_data_versions_warm_start_from_the_current_model(registry):
+    schema = ModelRegistry.schema([f"f{i}" for i in range(16)], 'pH', 30)
+    registry.model_for(schema, 'v1', None)
+    trained = []
+
+    model, entry = registry.model_for(schema, 'v2', lambda model, warm: trained.append(warm))
+
+    assert trained == [True]
+    assert entry['source'] == 'retrained' and entry['warm_start'] == 'trial_0002'
+    assert os.path.exists(os.path.join(registry.registry_dir, entry['path']))
+    with open(os.path.join(registry.registry_dir, MANIFEST_FILE)) as f:
+        assert {e['data_version'] for e in json.load(f)['models'].values()} == {'v1', 'v2'}
+
+
+def test_unknown_schemas_train_from_scratch_with_the_best_hyperparameters(registry):
+    schema = ModelRegistry.schema(['a', 'b'], 'pH', 10)
+    trained = []
+
+    model, entry = registry.model_for(schema, 'v1', lambda model, warm: trained.append(warm))
+
+    assert trained == [False] and model.weights is None
+    assert model.input_shape == (10, 2) and entry['hyperparameters']['units'] == 64
+
+
+def test_without_trials_there_is_nothing_to_build(tmp_path, monkeypatch):
+    monkeypatch.setattr(modelRegistry, 'build_model', FakeModel)
+    registry = ModelRegistry(tuner_dir=str(tmp_path / 'none'), registry_dir=str(tmp_path / 'registry'))
+    with pytest.raises(Exception, match='No tuner trials'):
+        registry.model_for(ModelRegistry.schema(['a'], 'pH', 5), 'v1', lambda model, warm: None)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+from modelTournament import leaderboard, run_tournament, split_windows, tournament_data
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    features = rng.random((200, 3))
+    target = features @ np.array([[0.5], [0.3], [0.2]])
+    scaler_Y = MinMaxScaler().fit(target)
+    # 200 rows - look_back 10 = 190 windows
+    return tournament_data(features, scaler_Y.transform(target), scaler_Y, 10, (0, 150), (150, 190))
+
+
+def test_split_windows_uses_the_given_bounds(data):
+    (trainX, trainY), (testX, testY) = split_windows(data)
+    assert trainX.shape == (150, 10, 3) and testX.shape == (40, 10, 3)
+    np.testing.assert_array_equal(testY, data['target'][160:200])
+
+
+def test_leaderboard_ranks_finished_candidates_first():
+    results = [{'model': 'a', 'status': 'timeout'}, {'model': 'b', 'status': 'ok', 'accuracy': 80.0},
+               {'model': 'c', 'status': 'error'}, {'model': 'd', 'status': 'ok', 'accuracy': 95.0}]
+    assert [r['model'] for r in leaderboard(results)] == ['d', 'b', 'a', 'c']
+
+
+def test_candidates_report_metrics_and_failures_without_stopping_the_others(data):
+    board = run_tournament(data, candidates=('Linear Regression', 'Missing'), budget=120, threads=1)
+
+    linear, missing = board
+    assert linear['model'] == 'Linear Regression' and linear['status'] == 'ok'
+    assert len(linear['predictions']) == 40
+    assert {'accuracy', 'mae', 'rmse', 'fit_seconds', 'predict_ms'} <= set(linear)
+    assert missing['model'] == 'Missing' and missing['status'] == 'error'
+
+
+def test_candidates_still_running_at_the_deadline_time_out(data):
+    # Spawning a process alone takes longer than this budget
+    board = run_tournament(data, candidates=('Linear Regression',), budget=0.01, threads=1)
+    assert board == [{'model': 'Linear Regression', 'status': 'timeout', 'threads': 1,
+                      'error': 'did not finish within 0.01s'}]
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import find_peaks
+
+from onlineUpdates import (MAX_WARM_START_TREES, WARM_START_TREES, OnlineDataset, PeakStats, RollingFeatures,
+                           RunningStats, TargetModel)
+from processPipeline import FEATURE_COLUMNS, fit_target_model, prepare_column
+
+
+def test_running_stats_merged_in_batches_match_the_whole_column():
+    values = np.random.default_rng(0).normal(5, 2, 1000)
+    values[[3, 500]] = np.nan
+
+    stats = RunningStats.from_values(values[:10])
+    for batch in np.array_split(values[10:], 7):
+        stats.extend(batch)
+
+    mean, std = stats.mean_std()
+    assert mean == pytest.approx(np.nanmean(values)) and std == pytest.approx(np.nanstd(values))
+    assert RunningStats.from_values([4.0, 4.0]).mean_std() == (4.0, 1.0)
+
+
+def test_rolling_features_extended_in_pieces_match_pandas():
+    series = pd.Series(np.random.default_rng(1).normal(0, 1, 40))
+    rolling = RollingFeatures(series[:20])
+
+    features = np.concatenate([rolling.extend(series[20:23]), rolling.extend(series[23:])])
+
+    windows = series.rolling(window=5, min_periods=1)
+    np.testing.assert_allclose(features[:, 0], series.diff()[20:])
+    np.testing.assert_allclose(features[:, 1], windows.mean()[20:])
+    np.testing.assert_allclose(features[:, 2], windows.std()[20:])
+
+
+def test_peak_stats_fold_in_peaks_from_appended_rows():
+    values = np.zeros(300)
+    values[5::30] = 10.0
+    stats = PeakStats(values[:150])
+
+    stats.extend(values[150:200], threshold=values[:200].mean())
+    stats.extend(values[200:], threshold=values.mean())
+
+    peaks, _ = find_peaks(values, height=values.mean(), distance=20)
+    assert stats.count == len(peaks)
+    assert stats.averages(0) == (10.0, float(np.diff(peaks).mean()))
+
+
+@pytest.fixture
+def fitted_ph(soil_frame):
+    df = soil_frame.copy()
+    prepare_column(df, 'pH')
+    return df, fit_target_model(df[FEATURE_COLUMNS].values, df['pH'].values.reshape(-1, 1))
+
+
+def test_target_model_grows_a_bounded_forest_without_touching_the_cached_one(fitted_ph):
+    df, fitted = fitted_ph
+    base_trees = len(fitted['model'].estimators_)
+    target = TargetModel(df['pH'].values, df[FEATURE_COLUMNS].values, fitted)
+
+    target.extend(np.array([6.1, 6.3, 7.0]))
+    assert len(target.fitted['model'].estimators_) == base_trees + WARM_START_TREES
+    assert len(target.predictions) == len(df) + 3
+
+    for _ in range(MAX_WARM_START_TREES // WARM_START_TREES + 2):
+        target.extend(np.array([6.5]))
+    assert len(target.fitted['model'].estimators_) == base_trees + MAX_WARM_START_TREES
+    assert len(fitted['model'].estimators_) == base_trees
+
+
+def test_online_dataset_only_processes_rows_it_has_not_seen(soil_frame):
+    online = OnlineDataset('v1', soil_frame, ['pH'])
+    appended = pd.DataFrame({'pH': [6.0, 6.5, 7.0]})
+
+    online.extend(appended.iloc[:2])
+    online.extend(appended)
+    online.extend(appended)
+
+    assert online.appended_rows == 3
+    np.testing.assert_array_equal(online.columns['pH'].appended_values(), [6.0, 6.5, 7.0])
+    mean, _ = online.columns['pH'].stats.mean_std()
+    assert mean == pytest.approx(np.mean(np.r_[soil_frame['pH'].to_numpy(dtype=float), 6.0, 6.5, 7.0]))
@@ -0,0 +1,70 @@
+import io
+import json
+import os
+
+import pandas as pd
+
+from pipelineBenchmark import (BASELINE_PATH, HERE, SCALES, STACK_KEYS, STAGES, bench_scale, compare, machine_info,
+                               parse_args, stack_mismatches, synthetic_csv)
+
+
+def test_synthetic_csv_tiles_the_dataset_with_small_jitter(soil_frame):
+    frame = pd.read_csv(io.BytesIO(synthetic_csv(2)))
+
+    assert list(frame.columns) == list(soil_frame.columns)
+    assert frame['ID'].tolist() == list(range(1, 2 * len(soil_frame) + 1))
+    tiled = pd.concat([soil_frame['pH']] * 2, ignore_index=True)
+    assert ((frame['pH'] - tiled).abs() <= tiled.abs() * 0.05 + 1e-4).all()
+    assert synthetic_csv(1) == synthetic_csv(1)
+
+
+def test_bench_scale_times_only_the_requested_stages():
+    assert sorted(bench_scale(1, STAGES, repeats=1)) == sorted(STAGES)
+    results = bench_scale(1, ('load_warm', 'scores'), repeats=1)
+    assert sorted(results) == ['load_warm', 'scores'] and all(seconds >= 0 for seconds in results.values())
+
+
+def test_compare_flags_slowdowns_beyond_both_thresholds(capsys):
+    baseline = {'1x': {'features': 0.100, 'scores': 0.001, 'chart_json': 0.100}}
+    results = {'1x': {'features': 0.200, 'scores': 0.004, 'chart_json': 0.110, 'forest_fit': 5.0}}
+
+    regressions = compare(results, baseline, threshold=0.25, min_delta=0.005)
+
+    # scores tripled but by less than min_delta; chart_json is within the threshold; forest_fit has no baseline
+    assert regressions == ['features at 1x: 0.2000s vs baseline 0.1000s']
+    assert 'REGRESSION' in capsys.readouterr().out
+
+
+def test_stored_baseline_covers_the_default_scales():
+    with open(BASELINE_PATH) as f:
+        stored = json.load(f)['results']
+    assert sorted(stored) == sorted(f"{scale}x" for scale in SCALES)
+    assert all(set(stages) <= set(STAGES) for stages in stored.values())
+
+
+def test_stored_baseline_was_recorded_on_the_pinned_stack():
+    with open(BASELINE_PATH) as f:
+        machine = json.load(f)['machine']
+    with open(os.path.join(HERE, 'requirements.txt')) as f:
+        pins = dict(line.strip().split('==') for line in f if '==' in line)
+    with open(os.path.join(HERE, 'Dockerfile')) as f:
+        image = f.readline().split(':')[1].strip()
+
+    assert machine['python'].startswith(image + '.')
+    assert {key: machine[key] for key in ('numpy', 'pandas', 'scikit-learn')} == \
+        {key: pins[key] for key in ('numpy', 'pandas', 'scikit-learn')}
+
+
+def test_stack_mismatches_compare_python_by_minor_version():
+    recorded = {'python': '3.9.18', 'numpy': '1.26.4', 'pandas': '2.2.3', 'scikit-learn': '1.6.0', 'scipy': '1.13.1'}
+    assert stack_mismatches(recorded, dict(recorded, python='3.9.20', platform='other')) == []
+    assert stack_mismatches(recorded, dict(recorded, python='3.11.7', numpy='2.4.6')) == [
+        'python: 3.9.18 -> 3.11.7', 'numpy: 1.26.4 -> 2.4.6']
+    assert set(STACK_KEYS) <= set(machine_info())
+
+
+def test_parse_args_defaults_to_every_scale_and_stage(monkeypatch):
+    monkeypatch.setenv('BENCHMARK_THRESHOLD', '0.5')
+    args = parse_args([])
+    assert args.scales == '1,10,100,1000' and args.stages.split(',') == list(STAGES)
+    assert args.threshold == 0.5 and not args.save_baseline
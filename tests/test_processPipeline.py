@@ -0,0 +1,174 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chartPayload import plot_series
+from datasetCache import DatasetCache, appended_version
+from datasetSource import InMemoryDatasetSource
+from jobControl import JobBoard, JobCancelled
+from mineralWeights import StubWeightsProvider
+from processPipeline import (FEATURE_COLUMNS, FUTURE_ENTRIES, clean_column, dataset_ref, fit_target_model,
+                             forecast_columns, forecast_ensemble, init_worker, load_dataset_ref, pipeline_columns,
+                             prepare_column, rolling_features, run_process_data, score_forecasts, split_columns)
+
+
+def test_run_process_data_times_every_stage_including_sensitivity(soil_frame):
+    init_worker(model_cache_size=4)
+    weights = json.loads(StubWeightsProvider().fetch(pipeline_columns(soil_frame.columns)))
+
+    result = run_process_data(dataset_ref(soil_frame, 'test-v1'), 'pH', weights, {'weight_sets': [weights]})
+
+    stages = [stage for stage, _ in result['timings']]
+    assert stages == ['load', 'features', 'peaks', 'model', 'forecast', 'chart', 'other_peaks',
+                      'synthetic_peaks', 'scores', 'sensitivity']
+    assert all(seconds >= 0 for _, seconds in result['timings'])
+    assert 'sensitivity' in result
+
+
+def test_run_process_data_stops_at_the_first_checkpoint_of_a_cancelled_job(soil_frame):
+    board = JobBoard()
+    try:
+        job = board.start()
+        board.cancel(job.job_id)
+        with pytest.raises(JobCancelled):
+            run_process_data(dataset_ref(soil_frame, 'test-v1'), 'pH', {}, job=job)
+        assert job.step == 0
+    finally:
+        board.close()
+
+
+def test_process_data_reuses_the_model_fitted_for_a_dataset_version(soil_frame, tmp_path):
+    weights = json.loads(StubWeightsProvider().fetch(pipeline_columns(soil_frame.columns)))
+    init_worker(model_cache_size=4, model_cache_dir=str(tmp_path))
+
+    first = run_process_data(dataset_ref(soil_frame, 'test-v1'), 'pH', weights)
+    again = run_process_data(dataset_ref(soil_frame, 'test-v1'), 'pH', weights)
+    assert (first['modelCache']['misses'], again['modelCache']['hits']) == (1, 1)
+    # The in-sample fit is the cached model's; only the synthetic future differs between runs
+    history = [[point for point in result['plot']['data'] if point['actual'] is not None] for result in (first, again)]
+    assert history[0] == history[1] and again['mape'] == first['mape']
+
+    # A restarted worker picks the model up from disk; a new dataset version is fitted again
+    init_worker(model_cache_size=4, model_cache_dir=str(tmp_path))
+    assert run_process_data(dataset_ref(soil_frame, 'test-v1'), 'pH', weights)['modelCache']['disk_hits'] == 1
+    assert run_process_data(dataset_ref(soil_frame, 'test-v2'), 'pH', weights)['modelCache']['misses'] == 1
+
+
+def test_float32_plot_carries_the_same_history_as_the_json_one(soil_frame):
+    init_worker(model_cache_size=4)
+    weights = json.loads(StubWeightsProvider().fetch(pipeline_columns(soil_frame.columns)))
+
+    points = run_process_data(dataset_ref(soil_frame, 'test-v1'), 'pH', weights)['plot']
+    packed = run_process_data(dataset_ref(soil_frame, 'test-v1'), 'pH', weights, {'plot_format': 'float32'})['plot']
+
+    assert packed['column'] == 'pH' and isinstance(packed['buffer'], bytes)
+    rows = packed['rows']
+    for name in ('actual', 'predicted'):
+        np.testing.assert_allclose(plot_series(packed)[name][:rows], plot_series(points)[name][:rows], rtol=1e-6)
+    assert len(plot_series(packed)['predicted']) == len(points['data'])
+
+
+def test_split_columns_deals_every_column_into_non_empty_groups():
+    columns = ['a', 'b', 'c', 'd', 'e']
+    assert split_columns(columns, 2) == [['a', 'c', 'e'], ['b', 'd']]
+    assert split_columns(columns, 8) == [[c] for c in columns]
+    assert split_columns(columns, 0) == [columns]
+
+
+def test_forecast_columns_checkpoints_once_per_column(soil_frame):
+    init_worker(model_cache_size=4)
+    board = JobBoard()
+    try:
+        job = board.start()
+        result = forecast_columns(dataset_ref(soil_frame, 'test-v1'), ['pH', 'Zn ppm'], job=job)
+
+        assert list(result['forecasts']) == ['pH', 'Zn ppm']
+        assert all(len(forecast['future']) == FUTURE_ENTRIES for forecast in result['forecasts'].values())
+        assert board.progress(job.job_id) == {'stage': 'Zn ppm', 'step': 2}
+    finally:
+        board.close()
+
+
+def test_rolling_features_match_the_pandas_training_features():
+    series = np.array([[5.0, 6.5, 4.0, 7.25, 6.0, 5.5, 8.0], [1.0, 1.0, 1.0, 2.0, 0.5, 0.0, 3.0]])
+
+    features = rolling_features(series, last_value=4.5)
+
+    for row, expected in zip(features, series):
+        frame = pd.Series(expected)
+        np.testing.assert_allclose(row[:, 0], np.diff(expected, prepend=4.5))
+        np.testing.assert_allclose(row[:, 1], frame.rolling(window=5, min_periods=1).mean())
+        np.testing.assert_allclose(row[:, 2], frame.rolling(window=5, min_periods=1).std().fillna(0), atol=1e-12)
+
+
+def test_forecast_ensemble_band_contains_the_mean_and_is_seeded(soil_frame):
+    df = soil_frame.copy()
+    prepare_column(df, 'pH')
+    fitted = fit_target_model(df[FEATURE_COLUMNS].values, df['pH'].values.reshape(-1, 1))
+
+    bands = forecast_ensemble(fitted, df['pH'].iloc[-1], 7.5, 25.0, horizon=30, draws=50, seed=3)
+    again = forecast_ensemble(fitted, df['pH'].iloc[-1], 7.5, 25.0, horizon=30, draws=50, seed=3)
+
+    assert bands['mean'].shape == (30,) and bands['draws'] == 50
+    assert np.all(bands['lower'] <= bands['mean']) and np.all(bands['mean'] <= bands['upper'])
+    np.testing.assert_array_equal(bands['mean'], again['mean'])
+
+
+def test_process_data_with_an_ensemble_sends_the_band(soil_frame):
+    init_worker(model_cache_size=4)
+    weights = json.loads(StubWeightsProvider().fetch(pipeline_columns(soil_frame.columns)))
+
+    result = run_process_data(dataset_ref(soil_frame, 'test-v1'), 'pH', weights,
+                              {'horizon': 20, 'ensemble': {'draws': 40, 'seed': 1}})
+
+    future = [point for point in result['plot']['data'] if point['actual'] is None]
+    assert len(future) == 20 == result['futureEntries']
+    assert all(point['lower'] <= point['predicted'] <= point['upper'] for point in future)
+
+
+def test_process_data_on_appended_rows_updates_the_base_model_instead_of_refitting(soil_frame):
+    init_worker(model_cache_size=4)
+    weights = json.loads(StubWeightsProvider().fetch(pipeline_columns(soil_frame.columns)))
+    appended = soil_frame.iloc[-3:].assign(ID=range(len(soil_frame) + 1, len(soil_frame) + 4))
+    df = pd.concat([soil_frame, appended], ignore_index=True)
+
+    run_process_data(dataset_ref(soil_frame, 'test-v1'), 'pH', weights)
+    result = run_process_data(dataset_ref(df, appended_version('test-v1', 3)), 'pH', weights)
+
+    assert result['modelCache']['misses'] == 1 and result['modelCache']['hits'] >= 1
+    history = [point for point in result['plot']['data'] if point['actual'] is not None]
+    assert len(history) == len(df)
+
+
+def test_job_refs_carry_only_the_appended_row_count(tmp_path, soil_frame):
+    cache = DatasetCache(InMemoryDatasetSource(soil_frame.to_csv(index=False)), snapshot_root=str(tmp_path))
+    cache.get()
+    cache.append([{'pH': 5.5}])
+    df, version = cache.get(with_version=True)
+
+    ref = dataset_ref(df, version, cache.snapshot_dir)
+    assert ref['appended_rows'] == 1 and not any(isinstance(value, pd.DataFrame) for value in ref.values())
+    assert load_dataset_ref(ref)['pH'].iloc[-1] == pytest.approx(5.5)
+
+    # A later job reads only the new append, and an older ref still sees its own rows
+    cache.append([{'pH': 6.5}, {'pH': 7.5}])
+    df, version = cache.get(with_version=True)
+    assert load_dataset_ref(dataset_ref(df, version, cache.snapshot_dir))['pH'].tolist()[-3:] == pytest.approx(
+        [5.5, 6.5, 7.5])
+    assert len(load_dataset_ref(ref)) == len(soil_frame) + 1
+
+
+def test_score_forecasts_takes_the_stats_of_the_cleaned_columns(soil_frame):
+    raw = soil_frame[['ID', 'pH', 'Zn ppm']].astype({'pH': object})
+    raw.loc[:2, 'pH'] = 'n/a'
+    raw.loc[5:8, 'Zn ppm'] = np.nan
+    cleaned = raw.copy()
+    for column in ['pH', 'Zn ppm']:
+        clean_column(cleaned, column)
+    forecasts = {column: {'future': cleaned[column].values[-FUTURE_ENTRIES:][::-1]} for column in ['pH', 'Zn ppm']}
+    weights = {'pH': 0.7, 'Zn ppm': 0.3}
+
+    assert (score_forecasts(raw, forecasts, weights, 'pH', 'raw-v1')
+            == score_forecasts(cleaned, forecasts, weights, 'pH', 'cleaned-v1'))
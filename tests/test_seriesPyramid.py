@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from seriesPyramid import MAX_WIDTH, MinMaxPyramid, PyramidCache, range_options, range_payload
+
+
+def series(rows=10000, seed=0):
+    return np.cumsum(np.random.default_rng(seed).standard_normal(rows)).astype(np.float32)
+
+
+def test_small_ranges_return_every_row():
+    values = series(100)
+    level, index, points = MinMaxPyramid(values).query(10, 60, width=50)
+    assert level == 0
+    assert index.tolist() == list(range(10, 60))
+    np.testing.assert_array_equal(points, values[10:60])
+
+
+@pytest.mark.parametrize('start,stop', [(0, 10000), (1, 9999), (37, 8123), (4095, 4097 + 3000), (5000, 10000)])
+def test_query_keeps_range_extremes_and_stays_in_range(start, stop):
+    values = series()
+    level, index, points = MinMaxPyramid(values).query(start, stop, width=200)
+
+    assert level > 0
+    assert (index >= start).all() and (index < stop).all()
+    assert (np.diff(index) > 0).all()
+    np.testing.assert_array_equal(points, values[index])
+    assert points.min() == values[start:stop].min()
+    assert points.max() == values[start:stop].max()
+    assert len(index) <= 2 * (200 * 2 + 2)
+
+
+def test_spikes_in_partial_edge_buckets_survive():
+    values = np.zeros(10000, dtype=np.float32)
+    values[1001] = 50
+    values[8998] = -50
+    # Bigger spikes just outside the range win their buckets at every coarse level
+    values[999] = 100
+    values[9001] = -100
+    pyramid = MinMaxPyramid(values)
+
+    level, index, points = pyramid.query(1000, 9000, width=100)
+
+    assert level > 0
+    assert 1001 in index.tolist() and 8998 in index.tolist()
+    assert points.max() == 50 and points.min() == -50
+
+
+def test_every_bucket_of_a_random_range_is_represented():
+    rng = np.random.default_rng(1)
+    values = rng.standard_normal(50000).astype(np.float32)
+    pyramid = MinMaxPyramid(values)
+    for _ in range(20):
+        start, stop = sorted(rng.integers(0, 50000, size=2))
+        if stop - start < 10:
+            continue
+        level, index, points = pyramid.query(start, stop, width=64)
+        size = 1 << level
+        # Rows of each bucket (clipped to the range) keep their own extremes
+        for bucket_start in range(start - start % size, stop, size):
+            lo, hi = max(bucket_start, start), min(bucket_start + size, stop)
+            inside = (index >= lo) & (index < hi)
+            assert points[inside].max() == values[lo:hi].max()
+            assert points[inside].min() == values[lo:hi].min()
+
+
+@pytest.mark.parametrize('start,stop', [(10, 20), (0, 100), (3, 97), (60, 65)])
+def test_a_range_without_a_whole_bucket_is_reduced_once(start, stop):
+    values = series(100)
+    level, index, points = MinMaxPyramid(values).query(start, stop, width=1)
+
+    assert (np.diff(index) > 0).all() and len(index) <= 2
+    assert (index >= start).all() and (index < stop).all()
+    assert points.min() == values[start:stop].min() and points.max() == values[start:stop].max()
+
+
+def test_nan_rows_never_replace_numbers():
+    values = np.arange(4096, dtype=np.float32)
+    values[::2] = np.nan
+    level, index, points = MinMaxPyramid(values).query(0, 4096, width=16)
+    assert level > 0
+    assert not np.isnan(points).any()
+    assert points.max() == 4095 and points.min() == 1
+
+
+def test_pyramid_cache_is_lru_and_discards_by_version():
+    cache = PyramidCache(max_entries=2)
+    built = []
+
+    def values():
+        built.append(1)
+        return series(100)
+
+    first = cache.get('v1', 'pH', values)
+    assert cache.get('v1', 'pH', values) is first
+    cache.get('v1', 'Zn', values)
+    cache.get('v2', 'pH', values)
+    assert len(built) == 3
+    cache.get('v1', 'pH', values)
+    assert len(built) == 4
+    cache.discard('v1')
+    cache.get('v2', 'pH', values)
+    assert len(built) == 4
+
+
+def test_range_payload_json_and_binary_agree():
+    pyramids = {'pH': MinMaxPyramid(series(5000))}
+    options = range_options({'start': 100, 'stop': 4000, 'width': 50})
+    as_json = range_payload(pyramids, options['start'], options['stop'], options['width'])
+    as_binary = range_payload(pyramids, options['start'], options['stop'], options['width'], binary=True)
+
+    assert as_json['rows'] == 5000 and as_json['stop'] == 4000
+    index = np.frombuffer(as_binary['series']['pH']['index'], dtype='<i4')
+    values = np.frombuffer(as_binary['series']['pH']['values'], dtype='<f4')
+    assert index.tolist() == as_json['series']['pH']['index']
+    np.testing.assert_allclose(values, as_json['series']['pH']['values'], rtol=1e-6)
+
+
+def test_range_options_clamp_to_valid_values():
+    assert range_options(None) == {'start': 0, 'stop': None, 'width': 1000, 'binary': False}
+    assert range_options({'start': -5, 'stop': '-1', 'width': 10 ** 9, 'binary': 1}) == {
+        'start': 0, 'stop': 0, 'width': MAX_WIDTH, 'binary': True}
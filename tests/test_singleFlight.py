@@ -0,0 +1,136 @@
+import threading
+
+from singleFlight import SingleFlight, request_key
+
+
+def test_request_key_ignores_option_order_and_separates_versions():
+    assert request_key('v1', 'pH', {'a': 1, 'b': [2]}) == request_key('v1', 'pH', {'b': [2], 'a': 1})
+    assert request_key('v1', 'pH', None) == request_key('v1', 'pH', {})
+    assert request_key('v1', 'pH', {}) != request_key('v2', 'pH', {})
+    assert request_key('v1', 'pH', {}) != request_key('v1', 'Zn ppm', {})
+    assert request_key('v1', 'pH', {'horizon': 10}) != request_key('v1', 'pH', {'horizon': 20})
+
+
+def test_a_session_joining_a_running_call_shares_it():
+    flight = SingleFlight('p')
+    call, leader, previous = flight.join('k', 'a', timing=True)
+    assert leader and previous is None and call.room == f"p:{call.id}"
+
+    joined, leader, previous = flight.join('k', 'b')
+
+    assert joined is call and not leader and previous is None
+    assert call.members == {'a', 'b'} and call.timing == {'a'}
+    assert flight.stats() == {'in_flight': 1, 'waiting_sessions': 2, 'started': 1, 'joined': 1, 'cancelled': 0}
+
+
+def test_same_session_asking_again_does_not_leave_its_call():
+    flight = SingleFlight()
+    call, _, _ = flight.join('k', 'a')
+    again, leader, previous = flight.join('k', 'a')
+    assert again is call and not leader and previous is None
+    assert not call.cancelled.is_set()
+
+
+def test_last_session_leaving_cancels_the_call():
+    flight = SingleFlight()
+    call, _, _ = flight.join('k', 'a')
+    flight.join('k', 'b')
+
+    assert flight.leave('a') is call
+    assert not call.cancelled.is_set()
+    assert flight.leave('b') is call
+    assert call.cancelled.is_set()
+    assert flight.leave('b') is None
+
+    # A cancelled call takes no new members; the next request starts over
+    fresh, leader, _ = flight.join('k', 'c')
+    assert leader and fresh is not call
+    assert flight.stats()['cancelled'] == 1
+
+
+def test_moving_to_another_request_leaves_and_cancels_the_previous_call():
+    flight = SingleFlight()
+    first, _, _ = flight.join('k1', 'a')
+
+    second, leader, previous = flight.join('k2', 'a')
+
+    assert leader and previous is first
+    assert first.cancelled.is_set() and first.members == set()
+    assert not second.cancelled.is_set()
+
+
+def test_finish_hands_out_waiters_and_later_requests_start_a_new_call():
+    flight = SingleFlight()
+    call, _, _ = flight.join('k', 'a')
+    flight.join('k', 'b')
+
+    assert flight.finish(call) == {'a', 'b'}
+    after, leader, previous = flight.join('k', 'c')
+
+    assert leader and after is not call and previous is None
+    assert call.members == {'a', 'b'}
+    # Until the call is closed its sessions still belong to it
+    moved, _, previous = flight.join('k', 'a')
+    assert moved is after and previous is call
+    flight.close(call)
+    assert flight.leave('b') is None
+
+
+def test_leaving_a_finished_call_marks_it_cancelled_without_counting_it():
+    flight = SingleFlight()
+    call, _, _ = flight.join('k', 'a')
+    flight.finish(call)
+    flight.leave('a')
+    # The analysis stream of a finished call stops once nobody is left to read it
+    assert call.cancelled.is_set()
+    assert flight.stats()['cancelled'] == 0
+
+
+def test_concurrent_joins_elect_one_leader_per_key():
+    flight = SingleFlight()
+    leaders = []
+    barrier = threading.Barrier(16)
+
+    def request(i):
+        barrier.wait()
+        _, leader, _ = flight.join('k', f"s{i}")
+        if leader:
+            leaders.append(i)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(leaders) == 1
+    assert flight.stats()['waiting_sessions'] == 16
+
+
+def test_finish_racing_with_join_never_loses_a_session():
+    # Every join lands either in the finished call's waiters or in a new call
+    for _ in range(50):
+        flight = SingleFlight()
+        call, _, _ = flight.join('k', 'leader')
+        barrier = threading.Barrier(2)
+        finished, joined = [], []
+
+        def finish():
+            barrier.wait()
+            finished.append(flight.finish(call))
+
+        def join():
+            barrier.wait()
+            joined.append(flight.join('k', 'late')[0])
+
+        threads = [threading.Thread(target=finish), threading.Thread(target=join)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if joined[0] is call:
+            assert 'late' in finished[0]
+        else:
+            assert 'late' not in finished[0]
+            assert joined[0].members == {'late'}
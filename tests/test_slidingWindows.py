@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from slidingWindows import (batch_count, create_dataset, flatten_windows, loop_create_dataset, validation_split,
+                            window_batches)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    return rng.random((60, 4)), rng.random((60, 1))
+
+
+def test_windows_match_the_original_loop_without_copying(data):
+    features, target = data
+
+    windows, targets = create_dataset(features, target, look_back=7)
+    loop_windows, loop_targets = loop_create_dataset(features, target, look_back=7)
+
+    assert windows.shape == (53, 7, 4) and targets.shape == (53, 1)
+    np.testing.assert_array_equal(windows, loop_windows.astype(np.float32))
+    np.testing.assert_array_equal(targets, loop_targets.astype(np.float32))
+    # Every window is a view on one float32 copy of the features
+    assert windows.base is not None and not windows.flags.writeable
+    assert np.shares_memory(windows[0], windows[1])
+
+
+def test_too_few_rows_give_no_windows(data):
+    features, target = data
+    windows, targets = create_dataset(features[:5], target[:5], look_back=7)
+    assert windows.shape == (0, 7, 4) and targets.shape == (0, 1)
+
+
+def test_flat_windows_are_overlapping_views(data):
+    features, target = data
+    windows, _ = create_dataset(features, target, look_back=7)
+
+    flat = flatten_windows(windows)
+
+    np.testing.assert_array_equal(flat, windows.reshape(len(windows), -1))
+    assert np.shares_memory(flat, windows)
+    # Windows in another layout are still flattened correctly, by copying
+    np.testing.assert_array_equal(flatten_windows(windows[::2]), windows[::2].reshape(len(windows[::2]), -1))
+
+
+def test_batches_cover_every_window_once_per_pass(data):
+    features, target = data
+    windows, targets = create_dataset(features, target, look_back=7)
+
+    batches = list(window_batches(windows, targets, batch_size=10, shuffle=True, seed=1))
+
+    assert len(batches) == batch_count(len(windows), 10) == 6
+    seen = np.concatenate([batch_targets for _, batch_targets in batches])
+    np.testing.assert_array_equal(np.sort(seen, axis=0), np.sort(targets, axis=0))
+    assert all(batch_windows.flags.owndata for batch_windows, _ in batches)
+
+
+def test_repeated_batches_reshuffle_each_pass(data):
+    features, target = data
+    windows, targets = create_dataset(features, target, look_back=7)
+    batches = window_batches(windows, targets, batch_size=len(windows), shuffle=True, seed=2, repeat=True)
+
+    first, second = next(batches)[1], next(batches)[1]
+
+    assert not np.array_equal(first, second)
+    np.testing.assert_array_equal(np.sort(first, axis=0), np.sort(second, axis=0))
+
+
+def test_validation_split_takes_the_last_windows(data):
+    features, target = data
+    windows, targets = create_dataset(features, target, look_back=7)
+
+    (train, train_y), (val, val_y) = validation_split(windows, targets, 0.2)
+
+    assert len(train) == 42 and len(val) == 11
+    np.testing.assert_array_equal(val_y, targets[42:])
@@ -0,0 +1,97 @@
+import json
+import os
+
+import numpy as np
+
+from conftest import SOIL_CSV
+from datasetSource import InMemoryDatasetSource
+from soilSnapshot import (SCHEMA_FILE, dataset_version, ingest_csv, is_snapshot, json_values, load_dataset,
+                          load_snapshot, read_dataset)
+
+
+def test_snapshot_keeps_integer_columns_and_column_order(tmp_path, soil_frame):
+    snapshot_dir = str(tmp_path / 'snap')
+    schema = ingest_csv(SOIL_CSV, snapshot_dir, version='v1')
+
+    frame = load_snapshot(snapshot_dir)
+
+    assert schema['integer_columns'][0] == 'ID'
+    assert frame.columns.tolist() == [' '.join(c.split()) for c in soil_frame.columns]
+    assert frame['ID'].dtype == np.int64
+    assert frame['ID'].tolist() == soil_frame['ID'].tolist()
+    assert frame['pH'].dtype == np.float32
+
+
+def test_older_snapshot_formats_are_not_reused(tmp_path):
+    snapshot_dir = str(tmp_path / 'snap')
+    ingest_csv(SOIL_CSV, snapshot_dir)
+    with open(os.path.join(snapshot_dir, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    schema['format'] = 1
+    with open(os.path.join(snapshot_dir, SCHEMA_FILE), 'w') as f:
+        json.dump(schema, f)
+
+    assert not is_snapshot(snapshot_dir)
+
+
+def test_json_values_prints_float32_as_the_source_decimal():
+    values = np.array([5.16, 0.274, 1115, -3.78, 0.0, 1e-7, 999.9999], dtype=np.float32)
+    assert json_values(values) == [5.16, 0.274, 1115.0, -3.78, 0.0, 1e-7, 999.9999]
+
+
+def test_json_values_round_trips_every_float32():
+    values = np.random.default_rng(0).standard_normal(10000).astype(np.float32) * 1000
+    assert (np.array(json_values(values), dtype=np.float32) == values).all()
+
+
+def test_json_values_keeps_integers_nan_and_float64():
+    assert json_values(np.array([1, 2, 3])) == [1, 2, 3]
+    assert isinstance(json_values(np.array([7]))[0], int)
+    assert np.isnan(json_values(np.array([np.nan], dtype=np.float32))[0])
+    assert json_values(np.array([5.159999847412109])) == [5.159999847412109]
+
+
+def test_unparseable_values_become_nan(tmp_path):
+    csv = tmp_path / 'soil.csv'
+    csv.write_text("ID,pH,Zn ppm \n1,5.16,n/a\n2,6.07,3.66\n")
+
+    ingest_csv(str(csv), str(tmp_path / 'snap'))
+    frame = load_snapshot(str(tmp_path / 'snap'))
+
+    assert frame.columns.tolist() == ['ID', 'pH', 'Zn ppm']
+    assert np.isnan(frame['Zn ppm'].iloc[0]) and frame['Zn ppm'].iloc[1] == np.float32(3.66)
+
+
+def test_edits_to_a_loaded_snapshot_stay_in_the_process(tmp_path):
+    snapshot_dir = str(tmp_path / 'snap')
+    ingest_csv(SOIL_CSV, snapshot_dir)
+
+    frame = load_snapshot(snapshot_dir)
+    original = float(frame['pH'].iloc[0])
+    frame.iloc[0, frame.columns.get_loc('pH')] = 99.0
+
+    assert float(load_snapshot(snapshot_dir)['pH'].iloc[0]) == original
+
+
+def test_load_dataset_ingests_each_version_once(tmp_path):
+    with open(SOIL_CSV, 'rb') as f:
+        source = InMemoryDatasetSource(f.read())
+    fetches = []
+    fetch = source.fetch
+    source.fetch = lambda if_none_match=None: fetches.append(1) or fetch(if_none_match)
+
+    first, version = load_dataset(source, str(tmp_path))
+    again, same = load_dataset(source, str(tmp_path))
+
+    assert fetches == [1]
+    assert version == same == source.version()
+    assert again.equals(first)
+
+
+def test_read_dataset_and_version_accept_snapshots_and_csvs(tmp_path, soil_frame):
+    snapshot_dir = str(tmp_path / 'snap')
+    ingest_csv(SOIL_CSV, snapshot_dir, version='etag-1')
+
+    assert read_dataset(snapshot_dir).shape == read_dataset(SOIL_CSV).shape == soil_frame.shape
+    assert dataset_version(snapshot_dir) == 'etag-1'
+    assert dataset_version(SOIL_CSV) == dataset_version(SOIL_CSV) != 'etag-1'
@@ -0,0 +1,82 @@
+import pytest
+
+from stageTimings import Histogram, MetricsRegistry, Timings
+
+
+def test_histogram_counts_each_duration_in_its_upper_bucket():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(seconds)
+    assert histogram.counts == [2, 1, 1] and histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+
+
+def test_render_writes_cumulative_buckets_per_label_set():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.describe('stage_seconds', "Time per stage.")
+    registry.observe('stage_seconds', 0.05, stage='load')
+    registry.observe('stage_seconds', 0.5, stage='load')
+    registry.observe('stage_seconds', 5.0, stage='model')
+    registry.observe('bare_seconds', 0.2)
+
+    assert registry.render().splitlines() == [
+        '# TYPE bare_seconds histogram',
+        'bare_seconds_bucket{le="0.1"} 0',
+        'bare_seconds_bucket{le="1.0"} 1',
+        'bare_seconds_bucket{le="+Inf"} 1',
+        'bare_seconds_sum 0.2',
+        'bare_seconds_count 1',
+        '# HELP stage_seconds Time per stage.',
+        '# TYPE stage_seconds histogram',
+        'stage_seconds_bucket{stage="load",le="0.1"} 1',
+        'stage_seconds_bucket{stage="load",le="1.0"} 2',
+        'stage_seconds_bucket{stage="load",le="+Inf"} 2',
+        'stage_seconds_sum{stage="load"} 0.55',
+        'stage_seconds_count{stage="load"} 2',
+        'stage_seconds_bucket{stage="model",le="0.1"} 0',
+        'stage_seconds_bucket{stage="model",le="1.0"} 0',
+        'stage_seconds_bucket{stage="model",le="+Inf"} 1',
+        'stage_seconds_sum{stage="model"} 5.0',
+        'stage_seconds_count{stage="model"} 1',
+    ]
+
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry(buckets=(1.0,))
+    registry.observe('calls', 0.1, service='s3 "eu"\\west\n')
+    assert 'calls_count{service="s3 \\"eu\\"\\\\west\\n"} 1' in registry.render().splitlines()
+
+
+def test_time_observes_blocks_that_raise():
+    registry = MetricsRegistry(buckets=(1.0,))
+    with pytest.raises(ValueError):
+        with registry.time('calls', service='openai'):
+            raise ValueError()
+    assert 'calls_count{service="openai"} 1' in registry.render()
+
+
+def test_spans_are_recorded_in_order_and_broken_down_in_milliseconds():
+    timings = Timings([('queue', 0.25)])
+    with timings.span('load'):
+        pass
+    timings[-1] = ('load', 0.0015)
+
+    assert timings.breakdown() == {'stages': [{'stage': 'queue', 'ms': 250.0}, {'stage': 'load', 'ms': 1.5}],
+                                   'totalMs': 251.5}
+    assert Timings().breakdown() == {'stages': [], 'totalMs': 0}
+
+
+def test_a_raising_checkpoint_skips_the_stage():
+    def on_stage(stage):
+        if stage == 'model':
+            raise RuntimeError(stage)
+
+    timings = Timings(on_stage=on_stage)
+    ran = []
+    with timings.span('load'):
+        ran.append('load')
+    with pytest.raises(RuntimeError):
+        with timings.span('model'):
+            ran.append('model')
+
+    assert ran == ['load'] and [stage for stage, _ in timings] == ['load']
@@ -0,0 +1,61 @@
+import os
+import runpy
+
+import pytest
+
+from startupBenchmark import HERE, IMPORT_PROBE, parse_args, probe_env, run_probe
+
+WARM_UP_PROBE = """
+import json, sys
+import app
+app.warm_up()
+print(json.dumps([m for m in app.LAZY_MODULES if m not in sys.modules]))
+"""
+
+
+@pytest.fixture
+def env(tmp_path):
+    return probe_env(str(tmp_path))
+
+
+def test_importing_app_leaves_the_heavy_modules_for_later(env):
+    assert run_probe(IMPORT_PROBE, env)['heavy'] == []
+
+
+def test_warm_up_imports_every_lazy_module(env):
+    assert run_probe(WARM_UP_PROBE, env) == []
+
+
+@pytest.mark.parametrize('value, preload', [(None, False), ('0', False), ('1', True)])
+def test_gunicorn_preloads_only_when_asked(monkeypatch, value, preload):
+    if value is None:
+        monkeypatch.delenv('GUNICORN_PRELOAD', raising=False)
+    else:
+        monkeypatch.setenv('GUNICORN_PRELOAD', value)
+    assert runpy.run_path(os.path.join(HERE, 'gunicorn.conf.py'))['preload_app'] is preload
+
+
+def test_parse_args_reads_the_budgets_from_the_environment(monkeypatch):
+    monkeypatch.setenv('STARTUP_IMPORT_BUDGET', '0.5')
+    args = parse_args(['--top', '3'])
+    assert args.import_budget == 0.5 and args.connect_budget == 4.0 and args.top == 3
+
+
+GUNICORN_PROBE = """
+import json, os, runpy, sys
+hooks = runpy.run_path('gunicorn.conf.py')
+hooks['when_ready'](None)
+import app
+board_dir = app.job_board.state_dir
+hooks['post_worker_init'](None)
+print(json.dumps({'preload': hooks['preload_app'], 'board_dir_kept': os.path.isdir(board_dir),
+                  'cold': [m for m in app.LAZY_MODULES if m not in sys.modules]}))
+"""
+
+
+@pytest.mark.parametrize('preload', ['0', '1'])
+def test_gunicorn_workers_warm_up_and_a_preloading_master_drops_its_job_board(env, preload, tmp_path):
+    env.update(GUNICORN_PRELOAD=preload, TMPDIR=str(tmp_path))
+    # Without preload the master never imported app, so the board seen here is the worker's own
+    assert run_probe(GUNICORN_PROBE, env) == {'preload': preload == '1', 'board_dir_kept': preload == '0',
+                                             'cold': []}
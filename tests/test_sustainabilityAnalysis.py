@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from sustainabilityAnalysis import (STUB_ANALYSIS, StubAnalysisProvider, analysis_messages, analysis_provider_from_env,
+                                    stream_analysis)
+
+
+class ListProvider:
+    """Yields fixed tokens and remembers whether the stream was closed."""
+
+    def __init__(self, tokens, on_token=None):
+        self.tokens = tokens
+        self.on_token = on_token
+        self.closed = False
+
+    def stream(self, messages, timeout):
+        try:
+            for token in self.tokens:
+                if self.on_token is not None:
+                    self.on_token(token)
+                yield token
+        finally:
+            self.closed = True
+
+
+def collect():
+    updates = []
+    return updates, lambda text, delta, status: updates.append((text, delta, status))
+
+
+def test_updates_are_coalesced_and_their_deltas_rebuild_the_text():
+    updates, on_update = collect()
+
+    text = stream_analysis(StubAnalysisProvider(delay=0), [], on_update, budget=30, flush_interval=3600)
+
+    assert text == STUB_ANALYSIS
+    # Nothing is flushed before the end when the interval never elapses
+    assert updates == [(STUB_ANALYSIS, STUB_ANALYSIS, 'complete')]
+
+
+def test_every_token_is_flushed_with_a_zero_interval():
+    updates, on_update = collect()
+    stream_analysis(ListProvider(['Yes', ',', ' continue']), [], on_update, budget=30, flush_interval=0)
+
+    assert ''.join(delta for _, delta, _ in updates) == 'Yes, continue'
+    assert [status for _, _, status in updates] == [None, None, None, 'complete']
+
+
+def test_cancelling_stops_the_stream_and_closes_the_provider():
+    cancelled = threading.Event()
+    provider = ListProvider(['a', 'b', 'c', 'd'], on_token=lambda token: token == 'b' and cancelled.set())
+    updates, on_update = collect()
+
+    text = stream_analysis(provider, [], on_update, budget=30, cancelled=cancelled)
+
+    assert text == 'ab'
+    assert updates[-1] == ('ab', 'ab', 'cancelled')
+    assert provider.closed
+
+
+def test_running_out_of_budget_ends_with_timeout():
+    provider = ListProvider(['a', 'b'])
+    updates, on_update = collect()
+    stream_analysis(provider, [], on_update, budget=0)
+    assert updates[-1][2] == 'timeout' and provider.closed
+
+
+def test_messages_and_provider_selection(monkeypatch):
+    messages = analysis_messages('pH', 12.5, ['pH', 'Zn ppm'], 100)
+    assert messages[0]['role'] == 'system'
+    assert 'Target column analyzed: pH' in messages[1]['content']
+
+    monkeypatch.setenv('ANALYSIS_PROVIDER', 'stub')
+    monkeypatch.setenv('ANALYSIS_STUB_DELAY', '0')
+    assert analysis_provider_from_env(None).delay == 0
+    monkeypatch.setenv('ANALYSIS_PROVIDER', 'other')
+    with pytest.raises(Exception, match='Unknown ANALYSIS_PROVIDER'):
+        analysis_provider_from_env(None)
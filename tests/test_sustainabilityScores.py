@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from processPipeline import calculate_sustainability_scores, sensitivity_scores
+from sustainabilityScores import HistoricalStats, column_stats, score_windows
+
+
+def loop_scores(all_predictions, historical_data, weights, num_scores=25, points_per_score=4):
+    """The scorer as it was before vectorizing: one window and one mineral at a time."""
+    scores = []
+    for score_index in range(num_scores):
+        start_idx = score_index * points_per_score
+        point_score = 0
+        total_weight = 0
+        for mineral, weight in weights.items():
+            if mineral not in all_predictions:
+                continue
+            hist_mean = np.nanmean(historical_data[mineral])
+            hist_std = np.nanstd(historical_data[mineral])
+            avg_predicted_value = np.mean(all_predictions[mineral][start_idx:start_idx + points_per_score])
+            z_score = abs((avg_predicted_value - hist_mean) / (hist_std if hist_std != 0 else 1))
+            point_score += max(1, min(10, 10 * (1 - (z_score / 3)))) * weight
+            total_weight += weight
+        scores.append(round(10 - (point_score / total_weight) if total_weight > 0 else 1, 2))
+    return scores
+
+
+@pytest.fixture
+def scenario():
+    rng = np.random.default_rng(7)
+    history = pd.DataFrame({
+        'pH': rng.normal(7, 0.5, 200),
+        'Zn ppm': rng.normal(2, 1, 200),
+        'Flat': np.full(200, 3.0)
+    })
+    history.loc[5, 'Zn ppm'] = np.nan
+    predictions = {'pH': rng.normal(7.2, 0.8, 100), 'Zn ppm': rng.normal(2.5, 2, 100), 'Flat': np.full(100, 3.5)}
+    weights = {'pH': 0.5, 'Zn ppm': 0.3, 'Flat': 0.2, 'Unpredicted': 0.9}
+    return predictions, history, weights
+
+
+def test_vectorized_scores_match_the_loop(scenario):
+    predictions, history, weights = scenario
+
+    scores = calculate_sustainability_scores(predictions, history, weights)
+
+    assert [score['score'] for score in scores] == loop_scores(predictions, history, weights)
+    assert scores[0]['points_considered'] == '1-4' and scores[-1]['time_period'] == 25
+
+
+def test_sensitivity_rows_match_scoring_each_weight_set_alone(scenario):
+    predictions, history, weights = scenario
+    weight_sets = [weights, {'pH': 1.0}, {'Zn ppm': 0.0}]
+
+    results = sensitivity_scores(predictions, history, weight_sets)
+
+    assert [row['scores'] for row in results[:2]] == [
+        [score['score'] for score in calculate_sustainability_scores(predictions, history, w)] for w in weight_sets[:2]]
+    # A weight set with no weight scores 1 everywhere, as the loop did
+    assert results[2]['scores'] == [1.0] * 25
+
+
+def test_score_windows_keeps_only_the_axes_it_was_given():
+    predictions = np.ones((3, 8, 2))
+    assert score_windows(predictions, [1, 1], [1, 1], [[1, 0], [0, 1]]).shape == (3, 2, 2)
+    assert score_windows(predictions[0], [1, 1], [1, 1], [1, 1]).shape == (2,)
+    with pytest.raises(ValueError):
+        score_windows(np.ones((3, 2)), [1, 1], [1, 1], [1, 1])
+
+
+def test_historical_stats_are_computed_once_per_version_and_scope():
+    stats = HistoricalStats(max_entries=2)
+    assert stats.get('v1', 'pH', [1.0, 3.0]) == (2.0, 1.0)
+    # Cached: different values under the same key give the first answer
+    assert stats.get('v1', 'pH', [10.0, 30.0]) == (2.0, 1.0)
+    assert stats.get('v1', 'pH', [10.0, 30.0], scope='Zn ppm') == (20.0, 10.0)
+    assert stats.get('v2', 'pH', [4.0]) == (4.0, 1.0)
+    # The oldest entry was evicted
+    assert stats.get('v1', 'pH', [10.0, 30.0]) == (20.0, 10.0)
+    assert column_stats([5.0, 5.0, np.nan]) == (5.0, 1.0)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from syntheticPeaks import synthetic_peaks_batch
+
+
+def per_peak_reference(length, heights, distances, draws, seed):
+    """One full-length Gaussian per peak, using the same random peak heights as the batch."""
+    rng = np.random.default_rng(seed)
+    scales = 1 + rng.normal(0, 0.2, size=(draws, len(heights), length))
+    steps = np.arange(length)
+    series = np.zeros((draws, len(heights), length))
+    for draw in range(draws):
+        for m, (height, distance) in enumerate(zip(heights, distances)):
+            sigma = distance / 5
+            for peak in range(0, length, distance):
+                series[draw, m] += height * scales[draw, m, peak] * np.exp(-(steps - peak) ** 2 / (2 * sigma ** 2))
+    return series
+
+
+def test_batch_matches_one_gaussian_per_peak():
+    heights, distances = [5.0, 120.0, 0.8], [20, 7, 33]
+
+    batch = synthetic_peaks_batch(150, heights, distances, n_draws=3, noise_level=0.0, seed=4)
+
+    assert batch.shape == (3, 3, 150)
+    np.testing.assert_allclose(batch, per_peak_reference(150, heights, distances, 3, seed=4),
+                               atol=1e-3 * max(heights))
+
+
+def test_seeded_batches_are_reproducible_and_draws_differ():
+    first = synthetic_peaks_batch(50, [5.0], [10], n_draws=4, seed=1)
+    again = synthetic_peaks_batch(50, [5.0], [10], n_draws=4, seed=np.random.default_rng(1))
+
+    np.testing.assert_array_equal(first, again)
+    assert not np.allclose(first[0], first[1])
+
+
+def test_noise_scales_with_the_peak_height():
+    quiet = synthetic_peaks_batch(2000, [1.0], [2000], noise_level=0.2, seed=0)[0, 0]
+    loud = synthetic_peaks_batch(2000, [100.0], [2000], noise_level=0.2, seed=0)[0, 0]
+    # Away from the single peak at step 0 only the noise is left
+    assert 0.15 < np.std(quiet[500:]) < 0.25
+    assert 15 < np.std(loud[500:]) < 25